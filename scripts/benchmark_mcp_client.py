@@ -0,0 +1,83 @@
+"""Benchmark MCP tool call latency: one connection per call vs session pool."""
+
+import asyncio
+import logging
+import statistics
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamable_http_client
+
+from agent.config import MCP_SERVER_URL
+from agent.mcp_pool import MCPSessionPool
+
+logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("mcp").setLevel(logging.WARNING)
+
+
+def call_per_connection(tool_name: str, arguments: dict[str, Any]) -> None:
+    """Previous client behavior: connect, initialize and call, every time."""
+
+    async def call() -> None:
+        async with streamable_http_client(MCP_SERVER_URL) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await session.call_tool(tool_name, arguments)
+
+    asyncio.run(call())
+
+
+def measure(
+    call: Callable[[str, dict[str, Any]], Any],
+    arguments: dict[str, Any],
+    n_calls: int,
+    concurrency: int,
+) -> list[float]:
+    """Latencies in ms of n calls to `calls_emails`, with some concurrency."""
+
+    def timed(_: int) -> float:
+        start = time.perf_counter()
+        call("calls_emails", arguments)
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(timed, range(n_calls)))
+
+
+def run_benchmark(account_id: int, n_calls: int, concurrency: int) -> None:
+    """Compare p50/p95 call latency of both clients."""
+    pool = MCPSessionPool(MCP_SERVER_URL, size=concurrency)
+
+    def call_pooled(tool_name: str, arguments: dict[str, Any]) -> None:
+        pool.run(pool.call_tool(tool_name, arguments))
+
+    arguments = {"account_id": account_id}
+    logging.info(f"{n_calls} calls to calls_emails, concurrency {concurrency}")
+    logging.info(f"{'client':<16} {'p50 ms':>8} {'p95 ms':>8} {'total s':>8}")
+    for name, call in [("per-call", call_per_connection), ("pooled", call_pooled)]:
+        # Warm up (server cache, pool sessions)
+        measure(call, arguments, concurrency, concurrency)
+        start = time.perf_counter()
+        latencies = measure(call, arguments, n_calls, concurrency)
+        total = time.perf_counter() - start
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        logging.info(
+            f"{name:<16} {statistics.median(latencies):>8.1f} {p95:>8.1f} {total:>8.2f}"
+        )
+    logging.info(f"pool: {pool.stats()}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark MCP client latency")
+    parser.add_argument("--account-id", type=int, default=1)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+    run_benchmark(args.account_id, args.calls, args.concurrency)
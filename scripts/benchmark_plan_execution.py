@@ -0,0 +1,91 @@
+"""Benchmark serial vs parallel plan execution to find the crossover point."""
+
+import logging
+import random
+import statistics
+import time
+
+from synthetic_data import make_interactions
+
+from agent.config import PlanSeries, ToolCall
+from agent.indexes import AccountIndex
+from agent.nodes.plan_executer import evaluate_branch
+from agent.nodes.planner import ALLOWED_TOPICS
+from agent.parallel import ExecutionMode, map_branches
+from agent.plan_optimizer import optimize_plans
+
+logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+# Per-step logs of the executer would dominate the timings
+logging.getLogger().setLevel(logging.WARNING)
+
+MODES: list[ExecutionMode] = ["serial", "threads", "processes"]
+
+
+def make_plans(
+    index: AccountIndex, n_plans: int, rng: random.Random
+) -> list[PlanSeries]:
+    """Independent plans mixing topic, keyword and date filters.
+
+    Keywords are drawn from the account's tokens, so lookups are cold.
+    """
+    tokens = list(index.keywords.postings)
+    return [
+        PlanSeries(
+            title=f"Plan {i}",
+            steps=[
+                ToolCall(
+                    tool="filter_by_topics",
+                    params={"topics": rng.sample(ALLOWED_TOPICS, k=3)},
+                ),
+                ToolCall(
+                    tool="filter_by_keywords",
+                    params={"keywords": [rng.choice(tokens)[:4] for _ in range(2)]},
+                ),
+                ToolCall(
+                    tool="filter_by_date",
+                    params={"operator": ">", "date": f"2022-0{i % 9 + 1}-01"},
+                ),
+            ],
+        )
+        for i in range(n_plans)
+    ]
+
+
+def run_benchmark(sizes: list[int], n_plans: int, words: int, repeats: int) -> None:
+    """Time each execution mode on growing synthetic accounts."""
+    rng = random.Random(0)  # noqa: S311 - reproducible benchmark
+    logging.warning(f"{n_plans} plans, {words} words per interaction")
+    logging.warning(
+        f"{'interactions':>12} " + " ".join(f"{mode + ' ms':>13}" for mode in MODES)
+    )
+    for size in sizes:
+        index = AccountIndex(*make_interactions(size, words_per_interaction=words))
+        timings: dict[ExecutionMode, list[float]] = {mode: [] for mode in MODES}
+        for repeat in range(repeats + 1):
+            for mode in MODES:
+                # New plans for each mode, no mode reuses memoized lookups
+                plans = make_plans(index, n_plans, rng)
+                branches = list(optimize_plans(plans, index).children.values())
+                start = time.perf_counter()
+                map_branches(evaluate_branch, index, branches, mode)
+                # The first round starts the workers and exports the index
+                if repeat:
+                    timings[mode].append((time.perf_counter() - start) * 1000)
+        logging.warning(
+            f"{size:>12} "
+            + " ".join(f"{statistics.median(timings[mode]):>13.1f}" for mode in MODES)
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark parallel plan execution")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000, 200_000]
+    )
+    parser.add_argument("--plans", type=int, default=6)
+    parser.add_argument("--words", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.plans, args.words, args.repeats)
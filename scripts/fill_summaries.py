@@ -0,0 +1,110 @@
+"""Precompute a compact summary of every call and email.
+
+Sibling of `fill_topics.py`: each interaction gets a `compact_summary` and
+the `compact_summary_hash` of the content it summarizes, in its account file.
+Reruns only summarize the interactions that are new or whose content changed,
+and the MCP server only serves summaries whose hash matches the content.
+"""
+
+import json
+import logging
+from typing import Any
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from tqdm import tqdm
+
+from agent.config import LLM_PROVIDER
+from agent.llm_utils import get_llm
+from mcp_server.server import DATA_DIR
+from mcp_server.store import content_hash
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+# Interactions summarized concurrently
+MAX_CONCURRENCY = 8
+
+llm = get_llm(
+    llm_provider=LLM_PROVIDER,
+    model_name="gpt-4o-mini",
+    reasoning_effort="none",
+    streaming=False,
+)
+
+prompt_template = """You are an AI assistant that summarizes sales interactions (emails or calls).
+
+Write a compact summary of the following {interaction_type}, in at most 3 sentences.
+Keep every fact a sales team could ask about: names and roles, amounts, dates and
+deadlines, products and competitors, decisions, concerns and next steps.
+Return only the summary, no preamble.
+
+{interaction_type}:
+\"\"\"
+{content}
+\"\"\"
+"""
+prompt = PromptTemplate(
+    input_variables=["interaction_type", "content"], template=prompt_template
+)
+chain = prompt | llm | StrOutputParser()
+
+
+def pending_interactions(
+    account_data: dict[str, Any],
+) -> list[tuple[dict[str, Any], str, str]]:
+    """Interactions without a summary of their current content.
+
+    Returns:
+        Each interaction's record, type and content.
+    """
+    pending = []
+    for kind, records, field in (
+        ("call", account_data.get("calls", []), "transcript"),
+        ("email", account_data.get("emails", []), "content"),
+    ):
+        for record in records:
+            content = record.get(field) or ""
+            if content and record.get("compact_summary_hash") != content_hash(content):
+                pending.append((record, kind, content))
+    return pending
+
+
+def fill_account_summaries(account_data: dict[str, Any]) -> int:
+    """Summarize the pending interactions of an account, in place.
+
+    Returns:
+        The number of interactions summarized.
+    """
+    pending = pending_interactions(account_data)
+    if not pending:
+        return 0
+    responses = chain.batch(
+        [
+            {"interaction_type": kind, "content": content}
+            for _, kind, content in pending
+        ],
+        config={"max_concurrency": MAX_CONCURRENCY},
+        return_exceptions=True,
+    )
+    summarized = 0
+    for (record, _, content), response in zip(pending, responses, strict=True):
+        if isinstance(response, Exception):
+            logging.warning(f"Summary failed, left for the next run: {response}")
+            continue
+        record["compact_summary"] = response.strip()
+        record["compact_summary_hash"] = content_hash(content)
+        summarized += 1
+    return summarized
+
+
+if __name__ == "__main__":
+    total = 0
+    for account_file in tqdm(sorted(DATA_DIR.glob("account_*.json"))):
+        with open(account_file) as f:
+            account_data = json.load(f)
+        summarized = fill_account_summaries(account_data)
+        if summarized:
+            with open(account_file, "w") as f:
+                json.dump(account_data, f, indent=2)
+        total += summarized
+    logging.info(f"Summarized {total} interactions")
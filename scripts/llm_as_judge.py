@@ -5,7 +5,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
 
 from agent.llm_utils import get_llm
-from mcp_server.server import load_account_data
+from mcp_server.server import account_store
 
 
 class Evaluation(BaseModel):
@@ -62,7 +62,7 @@ def concatenate_context(account_data: dict[str, Any]) -> str:
     """Concatenate account data into a single context string."""
     context_list = []
     for call in account_data["calls"]:
-        context_list.append(f"Call on {call['date']}: {call['transcript']}")
+        context_list.append(f"Call on {call['date']}: {call['content']}")
     for email in account_data["emails"]:
         context_list.append(f"Email on {email['date']}: {email['content']}")
     return "\n".join(context_list)
@@ -79,7 +79,7 @@ def main(
         if account_id not in baseline_results:
             continue
         baseline_account_result = baseline_results.get(account_id)
-        account_data = load_account_data(int(account_id))
+        account_data = account_store.get(int(account_id))
         context = concatenate_context(account_data)  # type: ignore[arg-type]
         user_question = agent_account_result["question"]  # type: ignore[index]
         answer_a = agent_account_result["response"]  # type: ignore[index]
@@ -7,6 +7,7 @@ from pathlib import Path
 from langchain_core.callbacks import get_usage_metadata_callback
 from tqdm import tqdm
 
+from agent.context import context_stats
 from agent.graph import create_agent_graph
 from agent.main import run_agent
 from mcp_server.server import DATA_DIR
@@ -44,6 +45,7 @@ def run_agent_on_all_accounts(baseline_mode: bool, output_path: str) -> None:
             continue
         question = question_map[account_id - 1]
         start = time.time()
+        saved_before = context_stats.stats()["deduplicated_tokens"]
         try:
             with get_usage_metadata_callback() as usage_cb:
                 result = run_agent(
@@ -56,11 +58,20 @@ def run_agent_on_all_accounts(baseline_mode: bool, output_path: str) -> None:
                 "response": result,
                 "llm_usage": llm_usage,
                 "time_taken": end - start,
+                # Context tokens saved by writing repeated interactions once
+                "context_tokens_saved": context_stats.stats()["deduplicated_tokens"]
+                - saved_before,
             }
         except Exception as e:
             logging.log(logging.ERROR, f"Error processing account {account_id}: {e}")
     with output_json_path.open("w") as f:
         json.dump(results, f, indent=2)
+    stats = context_stats.stats()
+    logging.info(
+        f"Context: {stats['deduplicated_interactions']} repeated interactions"
+        f" written once, ~{stats['deduplicated_tokens']} tokens saved"
+        f" over {stats['contexts']} contexts"
+    )
 
 
 if __name__ == "__main__":
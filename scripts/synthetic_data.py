@@ -0,0 +1,67 @@
+"""Synthetic account data used by the benchmark scripts."""
+
+import random
+from datetime import date, timedelta
+
+from agent.config import Call, Email
+from agent.nodes.planner import ALLOWED_TOPICS
+
+DOMAIN_TERMS = [
+    "pricing",
+    "contract",
+    "renewal",
+    "budget approval",
+    "security review",
+    "onboarding",
+    "invoice",
+    "AWS",
+    "Azure",
+    "GCP",
+    "Salesforce",
+    "HubSpot",
+    "ROI",
+    "CFO",
+    "DPA",
+    "SSO",
+    "procurement",
+    "churn",
+    "integration",
+    "dashboard",
+]
+
+
+def _make_vocabulary(rng: random.Random, size: int) -> list[str]:
+    syllables = ["ka", "lo", "mi", "ne", "ra", "su", "ti", "po", "de", "va", "ch", "or"]
+    return ["".join(rng.choices(syllables, k=rng.randint(1, 4))) for _ in range(size)]
+
+
+def make_interactions(
+    n_interactions: int, words_per_interaction: int = 400, seed: int = 0
+) -> tuple[list[Call], list[Email]]:
+    """Generate chronologically ordered calls and emails of a fake account.
+
+    Words follow a Zipf-like distribution over a generated vocabulary, with
+    domain terms sprinkled in so keyword filters have realistic selectivity.
+    """
+    rng = random.Random(seed)  # noqa: S311 - reproducible fake data
+    vocabulary = _make_vocabulary(rng, 20_000)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    start = date(2022, 1, 1)
+    days = sorted(rng.randrange(1200) for _ in range(n_interactions))
+
+    calls: list[Call] = []
+    emails: list[Email] = []
+    for i, day in enumerate(days):
+        words = rng.choices(vocabulary, weights=weights, k=words_per_interaction)
+        for _ in range(rng.randint(0, 3)):
+            words[rng.randrange(len(words))] = rng.choice(DOMAIN_TERMS)
+        fields = {
+            "date": (start + timedelta(days=day)).isoformat(),
+            "content": " ".join(words) + ".",
+            "topics": rng.sample(ALLOWED_TOPICS, k=rng.randint(0, 3)),
+        }
+        if i % 3 == 0:
+            calls.append(Call(**fields))
+        else:
+            emails.append(Email(**fields))
+    return calls, emails
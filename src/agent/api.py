@@ -6,7 +6,7 @@ Supports both streaming and non-streaming responses.
 
 import json
 import os
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Mapping
 from contextlib import asynccontextmanager
 from typing import Any
 
@@ -16,9 +16,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from agent.context import context_stats
 from agent.graph import create_agent_graph
-from agent.main import run_agent, stream_agent
-from agent.nodes.mcp import mcp_client
+from agent.main import arun_agent, stream_agent
+from agent.nodes.final_answer import answer_cache
+from agent.nodes.mcp import (
+    account_cache,
+    account_fetches,
+    aload_account,
+    mcp_client,
+    version_checks,
+)
+from agent.nodes.planner import plan_cache, planner_calls, planner_paths
 
 host = os.getenv("APP_HOST", "127.0.0.1")
 port = int(os.getenv("APP_PORT", 8001))
@@ -63,13 +72,53 @@ async def health_check() -> dict[str, str]:
     return {"status": "healthy"}
 
 
+@app.get("/api/stats")
+async def get_stats() -> dict[str, Mapping[str, int | float]]:
+    """Cache, request coalescing, context and MCP session counters."""
+    return {
+        "account_cache": account_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        **{
+            flight.name: flight.stats()
+            for flight in (account_fetches, version_checks, planner_calls)
+        },
+        "plan_cache": plan_cache.stats() if plan_cache is not None else {},
+        "planner_paths": planner_paths.stats(),
+        "context": context_stats.stats(),
+        "mcp_pool": mcp_client.pool.stats(),
+    }
+
+
 @app.get("/api/accounts")
-async def get_accounts() -> dict[str, list[dict[str, str | int]]]:
-    """Get list of available accounts for the dropdown."""
-    accounts = mcp_client.call_tool("fetch_accounts", arguments={})
+async def get_accounts(
+    offset: int = 0, limit: int | None = None, name_prefix: str | None = None
+) -> dict[str, list[dict[str, Any]]]:
+    """Get list of available accounts for the dropdown.
+
+    Supports pagination with offset/limit and search by name prefix.
+    """
+    accounts = await mcp_client.acall_tool(
+        "fetch_accounts",
+        arguments={"offset": offset, "limit": limit, "name_prefix": name_prefix},
+    )
     return {"accounts": json.loads(accounts)}
 
 
+@app.post("/api/accounts/{account_id}/warm")
+async def warm_account(account_id: int) -> dict[str, int]:
+    """Prefetch and index an account before it is queried.
+
+    Called when an account is selected, so the first question about it is
+    answered from the account cache instead of waiting for the MCP fetch.
+    """
+    data = await aload_account(account_id)
+    if data is None:
+        raise HTTPException(
+            status_code=404, detail=f"No data found for account_id: {account_id}"
+        )
+    return {"account_id": account_id, "interactions": len(data.index)}
+
+
 @app.post("/api/query", response_model=QueryResponse)
 async def query_agent(request: QueryRequest) -> QueryResponse:
     """Query the agent with a user question about an account.
@@ -78,7 +127,7 @@ async def query_agent(request: QueryRequest) -> QueryResponse:
     """
     try:
         agent = app.state.agent
-        response = run_agent(
+        response = await arun_agent(
             agent=agent, user_query=request.user_query, account_id=request.account_id
         )
 
@@ -0,0 +1,126 @@
+"""In-Process Caches.
+
+LRU cache bounded by an estimate of the memory its entries use, whose entries
+expire after a time-to-live. An expired entry is not returned by `get` but is
+kept until evicted, so a caller holding a version of the cached data can
+revalidate it cheaply (`entry`, then `touch`) instead of fetching it again.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class CacheEntry[V]:
+    """A cached value with its size estimate and the version it was read at."""
+
+    value: V
+    size: int
+    version: str | None = None
+    stored_at: float = field(default_factory=time.monotonic)
+
+    def fresh(self, ttl: float) -> bool:
+        """Whether the entry was stored or revalidated less than `ttl` ago."""
+        return time.monotonic() - self.stored_at < ttl
+
+
+class TTLCache[K, V]:
+    """Thread-safe LRU cache with a memory cap and a time-to-live.
+
+    Args:
+        max_bytes: Cap on the summed sizes of the entries, 0 disables the cache
+        ttl: Seconds an entry is returned by `get` after it was stored
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[K, CacheEntry[V]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key: K) -> V | None:
+        """Return the value of a fresh entry, None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if not entry.fresh(self.ttl):
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def entry(self, key: K) -> CacheEntry[V] | None:
+        """Return the entry of a key, even expired, without counting a hit."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def touch(self, key: K) -> V | None:
+        """Mark an entry as fresh again after revalidating it."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.stored_at = time.monotonic()
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: K, value: V, size: int = 1, version: str | None = None) -> None:
+        """Store a value, evicting the least recently used entries over the cap.
+
+        Values larger than the cap are not stored.
+        """
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = CacheEntry(value, size, version)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def pop(self, key: K) -> None:
+        """Drop the entry of a key, if any."""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int | float]:
+        """Return hit/miss/expiration counters and current memory usage."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def _remove(self, key: K) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
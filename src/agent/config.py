@@ -2,7 +2,7 @@
 # pylint: disable=line-too-long
 
 import os
-from typing import Annotated, Literal
+from typing import Annotated, Any, Literal, cast
 
 from langchain_core.messages import BaseMessage
 from langgraph.graph import MessagesState, add_messages
@@ -11,9 +11,90 @@ from pydantic import BaseModel
 # LLM settings
 # TODO: Build LLM settings config in another file
 
+# Provider of the agent's LLMs: "openai", or "stub" for an offline model
+# with simulated latency (benchmarks, load tests)
+LLM_PROVIDER = cast(
+    Literal["google", "openai", "stub"], os.getenv("LLM_PROVIDER", "openai")
+)
+
+# Stub provider: time to first token, output speed, fraction of failed calls
+# and length of the answers
+STUB_LLM_TTFT_SECONDS = float(os.getenv("STUB_LLM_TTFT_SECONDS", 0.3))
+STUB_LLM_TOKENS_PER_SECOND = float(os.getenv("STUB_LLM_TOKENS_PER_SECOND", 50))
+STUB_LLM_FAILURE_RATE = float(os.getenv("STUB_LLM_FAILURE_RATE", 0))
+STUB_LLM_ANSWER_TOKENS = int(os.getenv("STUB_LLM_ANSWER_TOKENS", 60))
+
 # MCP Server settings
 MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:8002/mcp")
 
+# MCP sessions kept open and reused across tool calls (max concurrent calls),
+# pinged when idle for the keep-alive interval
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", 4))
+MCP_KEEPALIVE_SECONDS = float(os.getenv("MCP_KEEPALIVE_SECONDS", 30))
+MCP_CALL_TIMEOUT_SECONDS = float(os.getenv("MCP_CALL_TIMEOUT_SECONDS", 60))
+
+# Execute plans on the MCP server when it advertises `execute_plans` ("auto"),
+# or always fetch all calls and emails and filter them locally ("off")
+MCP_PUSHDOWN = os.getenv("MCP_PUSHDOWN", "auto")
+
+# Fetched accounts (validated calls/emails and their index) kept in memory:
+# used without any MCP call for the TTL, then revalidated against the server's
+# data version; 0 bytes disables the cache
+ACCOUNT_CACHE_TTL_SECONDS = float(os.getenv("ACCOUNT_CACHE_TTL_SECONDS", 60))
+ACCOUNT_CACHE_MAX_BYTES = int(os.getenv("ACCOUNT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Start the planner concurrently with the mcp node ("on"), instead of after it ("off")
+PARALLEL_PLANNING = os.getenv("PARALLEL_PLANNING", "on")
+
+# Final answers cached by account, data version, normalized question and
+# context; 0 bytes disables the cache
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 3600))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Answer without the final LLM call when every plan ends in a count or in the
+# latest interactions ("on"/"off"), if each of those is at most this long
+TEMPLATED_ANSWERS = os.getenv("TEMPLATED_ANSWERS", "on")
+TEMPLATED_ANSWER_MAX_CHARS = int(os.getenv("TEMPLATED_ANSWER_MAX_CHARS", 500))
+
+# Plan the questions matching the interpretation rules without the LLM ("on"/"off")
+PLANNER_RULES = os.getenv("PLANNER_RULES", "on")
+
+# Planner outputs cached by normalized question: "memory", "sqlite" (shared by
+# workers, survives restarts) or "off"
+PLAN_CACHE_BACKEND = os.getenv("PLAN_CACHE_BACKEND", "memory")
+PLAN_CACHE_PATH = os.getenv("PLAN_CACHE_PATH", "plan_cache.sqlite3")
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", 10_000))
+PLAN_CACHE_TTL_SECONDS = float(os.getenv("PLAN_CACHE_TTL_SECONDS", 24 * 3600))
+
+# Token budget of the final answer's context: beyond it, only the interactions
+# most relevant to the question are kept; 0 keeps them all
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 8000))
+
+# Context of broad plans ("summaries"): interactions are written as their
+# precomputed summaries, except those matched by a narrow plan (keywords,
+# latest, or at most CONTEXT_NARROW_MAX_INTERACTIONS results); "full" always
+# writes their content
+CONTEXT_MODE = os.getenv("CONTEXT_MODE", "summaries")
+CONTEXT_NARROW_MAX_INTERACTIONS = int(os.getenv("CONTEXT_NARROW_MAX_INTERACTIONS", 5))
+
+# Interactions of at least this many characters matched by keyword or topic
+# plans are cut to their matching passages ("on"/"off"), with this many
+# sentences or chunks of surrounding context
+CONTEXT_SNIPPETS = os.getenv("CONTEXT_SNIPPETS", "on")
+CONTEXT_SNIPPET_MIN_CHARS = int(os.getenv("CONTEXT_SNIPPET_MIN_CHARS", 500))
+CONTEXT_SNIPPET_AROUND = int(os.getenv("CONTEXT_SNIPPET_AROUND", 1))
+
+# Plan execution settings
+# "auto" picks serial, threads or processes from the account size and the
+# number of independent plan branches; "serial", "threads" or "processes" force one
+PLAN_EXECUTION_MODE = os.getenv("PLAN_EXECUTION_MODE", "auto")
+# Account sizes from which "auto" uses threads or processes, 0 never. Off by
+# default: no crossover was measured yet (scripts/benchmark_plan_execution.py
+# on a multi-core host tells where to set them)
+PLAN_THREADS_MIN_INTERACTIONS = int(os.getenv("PLAN_THREADS_MIN_INTERACTIONS", 0))
+PLAN_PROCESSES_MIN_INTERACTIONS = int(os.getenv("PLAN_PROCESSES_MIN_INTERACTIONS", 0))
+PLAN_WORKERS = int(os.getenv("PLAN_WORKERS", min(os.cpu_count() or 1, 8)))
+
 
 class Message(BaseModel):
     """Message structure for chat."""
@@ -34,6 +115,7 @@ ToolName = Literal[
     "filter_by_date",
     "take_last_element",
     "compute_len",
+    "semantic_search",
 ]
 
 
@@ -44,6 +126,8 @@ class Call(BaseModel):
     content: str
     topics: list[str]
     interaction_type: str = "call"
+    # Precomputed compact summary, None if there is none
+    summary: str | None = None
 
 
 class Email(BaseModel):
@@ -53,13 +137,15 @@ class Email(BaseModel):
     content: str
     topics: list[str]
     interaction_type: str = "email"
+    # Precomputed compact summary, None if there is none
+    summary: str | None = None
 
 
 class ToolCall(BaseModel):
     """A single tool call in a plan."""
 
     tool: ToolName
-    params: dict[str, str | list[str]] | None = None
+    params: dict[str, str | int | list[str]] | None = None
 
 
 class PlanSeries(BaseModel):
@@ -89,12 +175,24 @@ class AgentState(MessagesState):
     calls: list[Call]
     emails: list[Email]
 
+    # agent.indexes.AccountIndex over the calls and emails, built when they are fetched
+    index: Any
+
+    # True if plans are executed by the MCP server instead of on calls/emails
+    pushdown: bool
+
+    # Version of the account's data on the MCP server, None if unknown
+    data_version: str | None
+
     # Planning Agent's results for filtering calls and emails to get relevant context
     plans: list[PlanSeries]
 
     # Retrieved context
     context: str
 
+    # Answer built from the plan results without the LLM, None if not possible
+    templated_answer: str | None
+
     # Variable to indicate end of execution when no data found in MCP
     end: bool
 
@@ -0,0 +1,528 @@
+"""Context Assembly.
+
+Turns the plan results into the final answer's context, within a token
+budget (`CONTEXT_TOKEN_BUDGET`). When all the matched interactions fit, they
+are all kept; otherwise they are ranked by relevance to the question and the
+best ones are kept until the budget is filled:
+- BM25 of the interaction against the question's terms and the plans'
+  keywords and search queries;
+- topic match: the interaction has a topic the plans filter on or the
+  question names;
+- recency, relative to the other matched interactions.
+
+Kept interactions stay in their plan, in date order, and each plan notes how
+many of its interactions were left out. Counts and plan titles are always
+kept. Tokens are estimated from the text length, so no tokenizer has to be
+downloaded.
+
+Long interactions matched by keyword or search plans are cut down to their
+passages (`extract_passages`): the chunks mentioning the plans' keywords,
+search queries or topics or the question's terms, with
+`CONTEXT_SNIPPET_AROUND` chunks around them, the rest elided with "[...]"
+markers. An interaction mentioning none of the plans' keywords or search
+queries is kept whole.
+
+With `CONTEXT_MODE=summaries`, interactions matched only by broad plans
+(`is_narrow`) are written as their precomputed summary
+(`scripts/fill_summaries.py`) when they have one.
+
+An interaction matched by several plans is written once, tagged with its
+stable ID (`interaction_id`), where it first appears; the later plans only
+refer to the ID. The interactions and tokens dropped and saved this way are
+counted in `context_stats`.
+"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+from agent.config import (
+    CONTEXT_MODE,
+    CONTEXT_NARROW_MAX_INTERACTIONS,
+    CONTEXT_SNIPPET_AROUND,
+    CONTEXT_SNIPPET_MIN_CHARS,
+    CONTEXT_SNIPPETS,
+    CONTEXT_TOKEN_BUDGET,
+    Call,
+    Email,
+    PlanSeries,
+)
+from agent.indexes import date_ordinal
+from agent.questions import fold
+from agent.rule_planner import FILLER_WORDS, TOPIC_PHRASES
+
+# Characters per token of the estimate
+CHARS_PER_TOKEN = 4
+
+# Longest chunk of a passage, in words, for content without sentence breaks
+SNIPPET_CHUNK_WORDS = 25
+
+# Marker of elided content
+ELISION = "[...]"
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Weights of the relevance signals, each scaled to [0, 1]
+BM25_WEIGHT = 0.6
+TOPIC_WEIGHT = 0.25
+RECENCY_WEIGHT = 0.15
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimated number of tokens of a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def interaction_key(item: Call | Email) -> tuple[str, str, str]:
+    """What makes an interaction the same in several plans' results."""
+    return item.interaction_type, item.date, item.content
+
+
+def interaction_id(item: Call | Email) -> str:
+    """Stable ID of an interaction, from its type, date and content.
+
+    Only written in the context: 64 bits, so that two interactions of a
+    context practically never share it. Entries are deduplicated by
+    `interaction_key`.
+    """
+    digest = hashlib.blake2b(
+        "|".join(interaction_key(item)).encode(), digest_size=8
+    ).hexdigest()
+    return f"{item.interaction_type[0].upper()}-{digest}"
+
+
+def render_interaction(
+    item: Call | Email, tag: str = "", label: str = "Content", text: str | None = None
+) -> str:
+    """Context lines of an interaction, prefixed by a tag (e.g. its ID).
+
+    Args:
+        item: The interaction
+        tag: Prefix of the interaction's line
+        label: What the text is, e.g. "Excerpts" or "Summary"
+        text: Written instead of the content, None for the content
+    """
+    body = item.content if text is None else text
+    return f"   {tag}{item.interaction_type} Date: {item.date}\n{label}: {body}\n"
+
+
+def render_reference(item: Call | Email, tag: str) -> str:
+    """Context line referring to an interaction written in an earlier plan."""
+    return f"   {tag}{item.interaction_type} Date: {item.date} (content above)\n"
+
+
+@dataclass(slots=True)
+class _Entry:
+    """An interaction matched by the plans, as a candidate for the context."""
+
+    item: Call | Email
+    # (plan, position in the plan's result) of each match
+    placements: list[tuple[int, int]] = field(default_factory=list)
+    score: float = 0.0
+    # Excerpts or summary written instead of the content, if any
+    label: str = "Content"
+    body: str | None = None
+    text: str = ""
+    reference: str = ""
+
+    def render(self) -> None:
+        """Render the interaction, tagged with its ID if matched several times."""
+        tag = f"[{interaction_id(self.item)}] " if len(self.placements) > 1 else ""
+        self.text = render_interaction(self.item, tag, self.label, self.body)
+        self.reference = render_reference(self.item, tag) if tag else ""
+
+    @property
+    def tokens(self) -> int:
+        """Tokens of the interaction and of its references."""
+        return estimate_tokens(self.text) + (len(self.placements) - 1) * (
+            estimate_tokens(self.reference)
+        )
+
+    @property
+    def saved_tokens(self) -> int:
+        """Tokens saved by referring to the interaction instead of repeating it."""
+        return (len(self.placements) - 1) * (
+            estimate_tokens(self.text) - estimate_tokens(self.reference)
+        )
+
+
+@dataclass
+class ContextStats:
+    """Interactions and tokens left out of, or saved in, the built contexts."""
+
+    contexts: int = 0
+    dropped_interactions: int = 0
+    dropped_tokens: int = 0
+    deduplicated_interactions: int = 0
+    deduplicated_tokens: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(
+        self, dropped: int, dropped_tokens: int, deduplicated: int, saved_tokens: int
+    ) -> None:
+        """Count a built context."""
+        with self._lock:
+            self.contexts += 1
+            self.dropped_interactions += dropped
+            self.dropped_tokens += dropped_tokens
+            self.deduplicated_interactions += deduplicated
+            self.deduplicated_tokens += saved_tokens
+
+    def stats(self) -> dict[str, int]:
+        """Return the counters."""
+        with self._lock:
+            return {
+                "contexts": self.contexts,
+                "dropped_interactions": self.dropped_interactions,
+                "dropped_tokens": self.dropped_tokens,
+                "deduplicated_interactions": self.deduplicated_interactions,
+                "deduplicated_tokens": self.deduplicated_tokens,
+            }
+
+
+context_stats = ContextStats()
+
+
+def _list_param(plans: list[PlanSeries], tool: str, name: str) -> list[str]:
+    """Values of a parameter of a tool, over all the plans' steps.
+
+    List values are flattened, string values (e.g., a search query) kept whole.
+    """
+    values: list[str] = []
+    for plan in plans:
+        for step in plan.steps:
+            value = (step.params or {}).get(name)
+            if step.tool != tool:
+                continue
+            if isinstance(value, list):
+                values.extend(value)
+            elif isinstance(value, str):
+                values.append(value)
+    return values
+
+
+def query_terms(question: str, plans: list[PlanSeries]) -> set[str]:
+    """Search terms of a question and of the plans' keywords and queries."""
+    keywords = _list_param(plans, "filter_by_keywords", "keywords")
+    keywords += _list_param(plans, "semantic_search", "query")
+    words = fold(" ".join([question, *keywords])).split()
+    return {word for word in words if len(word) > 1 and word not in FILLER_WORDS}
+
+
+def query_topics(question: str, plans: list[PlanSeries]) -> set[str]:
+    """Topics the plans filter on or the question names."""
+    topics = set(_list_param(plans, "filter_by_topics", "topics"))
+    text = f" {fold(question)} "
+    for pattern, phrase_topics in TOPIC_PHRASES:
+        if re.search(rf" (?:{pattern}) ", text):
+            topics.update(phrase_topics)
+    return topics
+
+
+def _chunks(content: str) -> list[str]:
+    """Sentences or lines of a content, long ones split in word chunks."""
+    chunks = []
+    for sentence in re.split(r"(?<=[.!?])\s+|\n+", content):
+        words = sentence.split()
+        for start in range(0, len(words), SNIPPET_CHUNK_WORDS):
+            chunks.append(" ".join(words[start : start + SNIPPET_CHUNK_WORDS]))
+    return chunks
+
+
+def extract_passages(
+    content: str, pattern: re.Pattern[str], around: int = CONTEXT_SNIPPET_AROUND
+) -> str | None:
+    """Passages of a content matching a pattern, the rest elided.
+
+    Args:
+        content: The interaction's content
+        pattern: What a passage must mention
+        around: Chunks kept before and after each matching chunk
+
+    Returns:
+        The passages, joined by elision markers, None if no chunk matches or
+        nothing would be elided.
+    """
+    chunks = _chunks(content)
+    hits = [position for position, chunk in enumerate(chunks) if pattern.search(chunk)]
+    kept = sorted(
+        {
+            position
+            for hit in hits
+            for position in range(
+                max(hit - around, 0), min(hit + around + 1, len(chunks))
+            )
+        }
+    )
+    if not kept or len(kept) == len(chunks):
+        return None
+    parts = []
+    previous = -1
+    for position in kept:
+        if position != previous + 1:
+            parts.append(ELISION)
+        parts.append(chunks[position])
+        previous = position
+    if previous != len(chunks) - 1:
+        parts.append(ELISION)
+    return " ".join(parts)
+
+
+@dataclass(frozen=True, slots=True)
+class PassagePattern:
+    """What the passages of a plan's interactions mention, as regex sources."""
+
+    # The plan's keywords and search query words: an interaction mentioning
+    # none of them matched on something else, and is kept whole
+    anchors: list[str]
+    # Topic phrases of the plan and the question's terms
+    related: list[str]
+
+
+def passage_pattern(plan: PlanSeries, terms: set[str]) -> PassagePattern | None:
+    """What the passages of a plan's interactions must mention.
+
+    Keywords match as substrings, like in `filter_by_keywords`; query words,
+    topic phrases and the question's terms as whole words.
+
+    Returns:
+        The plan's patterns, None if the plan neither filters on keywords nor
+        searches (its interactions are kept whole).
+    """
+    keywords = _list_param([plan], "filter_by_keywords", "keywords")
+    searches = _list_param([plan], "semantic_search", "query")
+    if not keywords and not searches:
+        return None
+    topics = set(_list_param([plan], "filter_by_topics", "topics"))
+    query_words = query_terms(" ".join(searches), [])
+    anchors = [re.escape(keyword) for keyword in keywords if keyword.strip()]
+    anchors += [rf"\b{re.escape(word)}\b" for word in sorted(query_words)]
+    related = [
+        rf"\b(?:{pattern})\b"
+        for pattern, phrase_topics in TOPIC_PHRASES
+        if topics.intersection(phrase_topics)
+    ]
+    related += [rf"\b{re.escape(term)}\b" for term in sorted(terms - query_words)]
+    return PassagePattern(anchors, related)
+
+
+def _bm25(entries: list[_Entry], terms: set[str]) -> list[float]:
+    """BM25 of each entry against the terms, document lengths in characters.
+
+    Terms are counted as case-insensitive substrings, like the keywords of
+    `filter_by_keywords`.
+    """
+    if not terms or not entries:
+        return [0.0] * len(entries)
+    counts: list[dict[str, int]] = []
+    for entry in entries:
+        text = entry.item.content.lower()
+        counts.append({term: n for term in terms if (n := text.count(term))})
+    lengths = [len(entry.item.content) for entry in entries]
+    average_length = sum(lengths) / len(lengths) or 1.0
+    frequencies = Counter(term for count in counts for term in count)
+    idf = {
+        term: math.log(1 + (len(entries) - df + 0.5) / (df + 0.5))
+        for term, df in frequencies.items()
+    }
+    return [
+        sum(
+            idf[term]
+            * tf
+            * (BM25_K1 + 1)
+            / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+            for term, tf in count.items()
+        )
+        for count, length in zip(counts, lengths, strict=True)
+    ]
+
+
+def _ordinal(item: Call | Email) -> int:
+    try:
+        return date_ordinal(item.date)
+    except ValueError:
+        return 0
+
+
+def rank_entries(
+    entries: list[_Entry], terms: set[str], topics: set[str]
+) -> list[_Entry]:
+    """Score the entries by relevance and return them best first."""
+    bm25 = _bm25(entries, terms)
+    top_bm25 = max(bm25, default=0.0) or 1.0
+    ordinals = [_ordinal(entry.item) for entry in entries]
+    oldest, newest = min(ordinals, default=0), max(ordinals, default=0)
+    for entry, score, ordinal in zip(entries, bm25, ordinals, strict=True):
+        recency = (ordinal - oldest) / (newest - oldest) if newest > oldest else 1.0
+        topic = 1.0 if topics.intersection(entry.item.topics) else 0.0
+        entry.score = (
+            BM25_WEIGHT * score / top_bm25
+            + TOPIC_WEIGHT * topic
+            + RECENCY_WEIGHT * recency
+        )
+    return sorted(entries, key=lambda entry: entry.score, reverse=True)
+
+
+def is_narrow(plan: PlanSeries, result: list[Call | Email]) -> bool:
+    """Whether a plan pinpoints its interactions, whose content then matters.
+
+    Keyword, search and latest-interaction plans are narrow, and so is any plan with
+    at most `CONTEXT_NARROW_MAX_INTERACTIONS` results.
+    """
+    return len(result) <= CONTEXT_NARROW_MAX_INTERACTIONS or any(
+        step.tool in {"filter_by_keywords", "semantic_search", "take_last_element"}
+        for step in plan.steps
+    )
+
+
+def _summarize_entries(
+    plans: list[PlanSeries],
+    plan_results: list[list[Call | Email] | int],
+    entries: list[_Entry],
+) -> None:
+    """Write the entries matched only by broad plans as their summaries."""
+    narrow = [
+        isinstance(result, list) and is_narrow(plan, result)
+        for plan, result in zip(plans, plan_results, strict=True)
+    ]
+    summarized = saved = 0
+    for entry in entries:
+        summary = entry.item.summary
+        if not summary or any(narrow[plan_id] for plan_id, _ in entry.placements):
+            continue
+        entry.label, entry.body = "Summary", summary
+        summarized += 1
+        saved += estimate_tokens(entry.item.content) - estimate_tokens(summary)
+    if summarized:
+        logging.info(
+            f"Context: {summarized} interactions of broad plans written as their"
+            f" summaries, ~{saved} tokens saved"
+        )
+
+
+def _window_entries(
+    question: str, plans: list[PlanSeries], entries: list[_Entry]
+) -> None:
+    """Set the passages of the long entries matched only by keyword or search plans.
+
+    Entries already written as their summaries are left as they are.
+    """
+    terms = query_terms(question, [])
+    patterns = [passage_pattern(plan, terms) for plan in plans]
+    windowed = saved = 0
+    for entry in entries:
+        if (
+            entry.body is not None
+            or len(entry.item.content) < CONTEXT_SNIPPET_MIN_CHARS
+        ):
+            continue
+        entry_patterns = [patterns[plan_id] for plan_id, _ in entry.placements]
+        if any(pattern is None for pattern in entry_patterns):
+            # A plan without keywords or search matched it as a whole
+            continue
+        anchors = [a for p in entry_patterns if p is not None for a in p.anchors]
+        related = [r for p in entry_patterns if p is not None for r in p.related]
+        if not anchors or not re.search(
+            "|".join(anchors), entry.item.content, re.IGNORECASE
+        ):
+            # Only incidental mentions of the question's terms or topics
+            continue
+        pattern = re.compile("|".join(anchors + related), re.IGNORECASE)
+        passages = extract_passages(entry.item.content, pattern)
+        if passages is not None:
+            entry.label, entry.body = "Excerpts", passages
+            windowed += 1
+            saved += estimate_tokens(entry.item.content) - estimate_tokens(passages)
+    if windowed:
+        logging.info(
+            f"Context: {windowed} interactions cut to their matching passages,"
+            f" ~{saved} tokens saved"
+        )
+
+
+def build_context(
+    question: str,
+    plans: list[PlanSeries],
+    plan_results: list[list[Call | Email] | int],
+    budget: int = CONTEXT_TOKEN_BUDGET,
+) -> str:
+    """Build the context of the final answer from the plan results.
+
+    Args:
+        question: The user's question, to rank the interactions
+        plans: The executed plans
+        plan_results: The result of each plan, interactions or a count
+        budget: Maximum number of context tokens, 0 for no limit
+
+    Returns:
+        The context, one section per plan.
+    """
+    header_tokens = 0
+    entries: dict[tuple[str, str, str], _Entry] = {}
+    for plan_id, (plan, result) in enumerate(zip(plans, plan_results, strict=True)):
+        if not isinstance(result, list):
+            header_tokens += estimate_tokens(f"{plan.title}: \n   {result}")
+            continue
+        header_tokens += estimate_tokens(plan.title)
+        for position, item in enumerate(result):
+            entry = entries.setdefault(interaction_key(item), _Entry(item))
+            entry.placements.append((plan_id, position))
+    if CONTEXT_MODE == "summaries":
+        _summarize_entries(plans, plan_results, list(entries.values()))
+    if CONTEXT_SNIPPETS == "on":
+        _window_entries(question, plans, list(entries.values()))
+    for entry in entries.values():
+        entry.render()
+
+    total_tokens = header_tokens + sum(entry.tokens for entry in entries.values())
+    kept = list(entries.values())
+    used = total_tokens
+    if budget and total_tokens > budget:
+        kept = []
+        used = header_tokens
+        terms, topics = query_terms(question, plans), query_topics(question, plans)
+        for entry in rank_entries(list(entries.values()), terms, topics):
+            if used + entry.tokens <= budget:
+                kept.append(entry)
+                used += entry.tokens
+        logging.info(
+            f"Context: kept {len(kept)}/{len(entries)} interactions (~{used} tokens),"
+            f" dropped {len(entries) - len(kept)} interactions"
+            f" (~{total_tokens - used} tokens) over the {budget}-token budget"
+        )
+    deduplicated = [entry for entry in kept if len(entry.placements) > 1]
+    saved_tokens = sum(entry.saved_tokens for entry in deduplicated)
+    if deduplicated:
+        logging.info(
+            f"Context: {len(deduplicated)} interactions matched by several plans"
+            f" written once, ~{saved_tokens} tokens saved"
+        )
+    context_stats.record(
+        len(entries) - len(kept), total_tokens - used, len(deduplicated), saved_tokens
+    )
+
+    selected: list[list[tuple[int, _Entry]]] = [[] for _ in plans]
+    for entry in kept:
+        for plan_id, position in entry.placements:
+            selected[plan_id].append((position, entry))
+    written: set[int] = set()
+    parts = []
+    for plan, result, matches in zip(plans, plan_results, selected, strict=True):
+        if not isinstance(result, list):
+            parts.append(f"{plan.title}: \n   {result}")
+            continue
+        lines = []
+        for _, entry in sorted(matches, key=lambda match: match[0]):
+            lines.append(entry.reference if id(entry) in written else entry.text)
+            written.add(id(entry))
+        if len(matches) < len(result):
+            omitted = len(result) - len(matches)
+            lines.append(f"   ({omitted} less relevant interactions omitted)\n")
+        parts.append(f"{plan.title}\n{'\n'.join(lines)}")
+    return "\n".join(parts)
@@ -4,17 +4,28 @@
 This module defines the LangGraph workflow for the agent.
 The graph follows the structure:
 __start__ → mcp → planner → plan_executer → final_answer → __end__
+
+With PARALLEL_PLANNING, a single mcp_planner node runs both concurrently, so
+the MCP round-trip overlaps with the planner LLM call, which is cancelled if
+the account has no data:
+__start__ → mcp_planner (mcp ∥ planner) → plan_executer → final_answer → __end__
+
+When the plan results determine the answer (counts, short latest
+interactions), plan_executer routes to templated_answer instead of
+final_answer, skipping the LLM call.
 """
 
 from langgraph.graph import END, START, StateGraph
 
-from agent.config import AgentState
+from agent.config import LLM_PROVIDER, PARALLEL_PLANNING, AgentState
 from agent.llm_utils import get_llm
 from agent.nodes import (
     create_final_answer_node,
     create_mcp_node,
+    create_mcp_planner_node,
     create_plan_executer_node,
     create_planner_node,
+    create_templated_answer_node,
 )
 
 
@@ -32,20 +43,20 @@ def create_agent_graph(streaming: bool) -> StateGraph:
     """
     # Initialize LLM
     openai_llm = get_llm(
-        llm_provider="openai",
+        llm_provider=LLM_PROVIDER,
         model_name="gpt-4o-mini",
         reasoning_effort="none",
         streaming=False,
     )
     openai_reasoning_llm = get_llm(
-        llm_provider="openai",
+        llm_provider=LLM_PROVIDER,
         model_name="gpt-5-mini",
         reasoning_effort="low",
         streaming=False,
     )
 
     openai_llm_stream = get_llm(
-        llm_provider="openai",
+        llm_provider=LLM_PROVIDER,
         model_name="gpt-4o-mini",
         reasoning_effort="none",
         streaming=True,
@@ -56,9 +67,19 @@ def create_agent_graph(streaming: bool) -> StateGraph:
 
     # # Add nodes
     # workflow.add_node(node="question_router", action=create_question_router_node(openai_llm))
-    workflow.add_node(node="mcp", action=create_mcp_node())
-    workflow.add_node(node="planner", action=create_planner_node(openai_reasoning_llm))
+    mcp_node = create_mcp_node()
+    planner_node = create_planner_node(openai_reasoning_llm)
+    if PARALLEL_PLANNING == "on":
+        workflow.add_node(
+            node="mcp_planner", action=create_mcp_planner_node(mcp_node, planner_node)
+        )
+    else:
+        workflow.add_node(node="mcp", action=mcp_node)
+        workflow.add_node(node="planner", action=planner_node)
     workflow.add_node(node="plan_executer", action=create_plan_executer_node())
+    workflow.add_node(
+        node="templated_answer", action=create_templated_answer_node(streaming)
+    )
     workflow.add_node(
         node="final_answer",
         action=create_final_answer_node(
@@ -68,16 +89,28 @@ def create_agent_graph(streaming: bool) -> StateGraph:
 
     # # Define the edges
     # workflow.add_edge(start_key=START, end_key="question_router")
-    workflow.add_edge(start_key=START, end_key="mcp")
+    if PARALLEL_PLANNING == "on":
+        workflow.add_edge(start_key=START, end_key="mcp_planner")
+        routed = "mcp_planner"
+    else:
+        workflow.add_edge(start_key=START, end_key="mcp")
+        workflow.add_conditional_edges(
+            "mcp",
+            lambda state: state.get("end"),
+            path_map={True: END, False: "planner"},
+        )
+        routed = "planner"
     workflow.add_conditional_edges(
-        "mcp", lambda state: state.get("end"), path_map={True: END, False: "planner"}
-    )
-    workflow.add_conditional_edges(
-        "planner",
+        routed,
         lambda state: state.get("end"),
         path_map={True: END, False: "plan_executer"},
     )
-    workflow.add_edge(start_key="plan_executer", end_key="final_answer")
+    workflow.add_conditional_edges(
+        "plan_executer",
+        lambda state: state.get("templated_answer") is not None,
+        path_map={True: "templated_answer", False: "final_answer"},
+    )
+    workflow.add_edge(start_key="templated_answer", end_key=END)
     workflow.add_edge(start_key="final_answer", end_key=END)
     # Compile the graph
     graph = workflow.compile()
@@ -0,0 +1,497 @@
+"""Account Indexes.
+
+Columnar view of an account's calls and emails, built once when they are
+loaded, so plan tools compose boolean masks instead of rescanning and copying
+interaction lists on every request.
+"""
+
+import calendar
+import datetime
+import re
+import threading
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from functools import cached_property
+
+import numpy as np
+import numpy.typing as npt
+from scipy import sparse  # type: ignore[import-untyped]
+
+from agent.config import Call, Email
+
+Mask = npt.NDArray[np.bool_]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Number of keyword lookups memoized per index
+_MAX_CACHED_LOOKUPS = 1024
+
+# Selections up to this many rows are verified directly instead of looked up
+_MAX_SCANNED_ROWS = 1024
+
+# Type codes of the interactions
+INTERACTION_TYPES = ("call", "email")
+CALL, EMAIL = range(len(INTERACTION_TYPES))
+
+
+def date_ordinal(value: str) -> int:
+    """Proleptic Gregorian ordinal of an ISO date, ValueError if it isn't one."""
+    return datetime.date.fromisoformat(value[:10]).toordinal()
+
+
+MAX_DATE_ORDINAL = datetime.date.max.toordinal()
+
+_MONTH_PATTERN = re.compile(r"(\d{4})-(\d{2})")
+_YEAR_PATTERN = re.compile(r"\d{4}")
+
+
+def period_ordinals(value: str) -> tuple[int, int]:
+    """First and last date ordinals of an ISO date, month (YYYY-MM) or year (YYYY).
+
+    ValueError if the value is none of them.
+    """
+    value = value.strip()
+    if _YEAR_PATTERN.fullmatch(value):
+        year = int(value)
+        return (
+            datetime.date(year, 1, 1).toordinal(),
+            datetime.date(year, 12, 31).toordinal(),
+        )
+    if match := _MONTH_PATTERN.fullmatch(value):
+        year, month = int(match[1]), int(match[2])
+        first = datetime.date(year, month, 1)
+        return first.toordinal(), first.toordinal() + (
+            calendar.monthrange(year, month)[1] - 1
+        )
+    ordinal = date_ordinal(value)
+    return ordinal, ordinal
+
+
+def date_bounds(
+    operator: str,
+    date: str | None = None,
+    end_date: str | None = None,
+    days: str | int | None = None,
+) -> tuple[int, int]:
+    """Resolve a date filter to an inclusive range of date ordinals.
+
+    Dates can also be months (YYYY-MM) or years (YYYY), covering all their days.
+
+    Operators:
+        "=", "<", ">": compared to `date`.
+        "between": from `date` to `end_date`, both included.
+        "last_n_days": the `days` days ending on `date` (default: today).
+    """
+
+    def period(value: str | None) -> tuple[int, int]:
+        try:
+            return period_ordinals(value or "")
+        except ValueError as e:
+            raise ValueError(f"Invalid date: {value}") from e
+
+    if operator == "=":
+        return period(date)
+    if operator == "<":
+        # Malformed dates are stored as 0, before any valid date
+        return 0, period(date)[0] - 1
+    if operator == ">":
+        return period(date)[1] + 1, MAX_DATE_ORDINAL
+    if operator == "between":
+        return period(date)[0], period(end_date)[1]
+    if operator == "last_n_days":
+        last = period(date)[1] if date else datetime.date.today().toordinal()
+        try:
+            n_days = int(days or "")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid number of days: {days}") from e
+        return last - n_days + 1, last
+    raise ValueError(f"Invalid operator: {operator}")
+
+
+class KeywordIndex:
+    """Inverted token index answering case-insensitive substring lookups.
+
+    A keyword matches a document when it is a substring of the lowercased
+    content, like the `in` check of `filter_by_keywords`. Candidates are found
+    by posting-list intersection and only they are verified with `in`:
+    - a single-token keyword can match inside any token containing it;
+    - in a phrase, the first token must end a document token, the last token
+      must start one and the tokens in between must match exactly.
+    """
+
+    def __init__(self, contents: Sequence[str]):
+        self._texts = [content.lower() for content in contents]
+        postings: dict[str, list[int]] = {}
+        for doc_id, text in enumerate(self._texts):
+            for token in set(_TOKEN_PATTERN.findall(text)):
+                postings.setdefault(token, []).append(doc_id)
+        self._set_postings(
+            {
+                token: np.array(doc_ids, dtype=np.int32)
+                for token, doc_ids in postings.items()
+            }
+        )
+
+    @classmethod
+    def from_postings(
+        cls, texts: list[str], postings: dict[str, npt.NDArray[np.int32]]
+    ) -> "KeywordIndex":
+        """Rebuild an index from the lowercased texts and postings of another."""
+        index = cls.__new__(cls)
+        index._texts = texts
+        index._set_postings(postings)
+        return index
+
+    def _set_postings(self, postings: dict[str, npt.NDArray[np.int32]]) -> None:
+        self.postings = postings
+        self._vocabulary = list(postings)
+        self._lookups: dict[str, npt.NDArray[np.int32]] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    @property
+    def texts(self) -> list[str]:
+        """Lowercased contents of the documents."""
+        return self._texts
+
+    def search(self, keywords: Iterable[str], within: Mask | None = None) -> Mask:
+        """Return the mask of the documents containing any of the keywords.
+
+        When `within` selects few documents, keywords that weren't looked up
+        yet are checked on those documents only.
+        """
+        mask = np.zeros(len(self._texts), dtype=bool)
+        rows = None
+        if within is not None and np.count_nonzero(within) <= _MAX_SCANNED_ROWS:
+            rows = np.flatnonzero(within)
+        for keyword in keywords:
+            keyword = keyword.lower()
+            if rows is None or keyword in self._lookups:
+                mask[self.lookup(keyword)] = True
+            else:
+                mask[[row for row in rows if keyword in self._texts[row]]] = True
+        if within is not None:
+            mask &= within
+        return mask
+
+    def lookup(self, keyword: str) -> npt.NDArray[np.int32]:
+        """Return the ids of the documents containing the keyword."""
+        keyword = keyword.lower()
+        # Not `in` + `[]`: another thread may clear the memo in between
+        doc_ids = self._lookups.get(keyword)
+        if doc_ids is None:
+            if len(self._lookups) >= _MAX_CACHED_LOOKUPS:
+                self._lookups.clear()
+            candidates = np.flatnonzero(self._candidates(keyword))
+            doc_ids = self._lookups[keyword] = np.array(
+                [doc_id for doc_id in candidates if keyword in self._texts[doc_id]],
+                dtype=np.int32,
+            )
+        return doc_ids
+
+    def _candidates(self, keyword: str) -> Mask:
+        tokens = _TOKEN_PATTERN.findall(keyword)
+        if not tokens:
+            # Nothing to look up (e.g., punctuation only), verify every document
+            return np.ones(len(self._texts), dtype=bool)
+
+        if len(tokens) == 1:
+            return self._union(t for t in self._vocabulary if tokens[0] in t)
+
+        mask = self._union(t for t in self._vocabulary if t.endswith(tokens[0]))
+        mask &= self._union(t for t in self._vocabulary if t.startswith(tokens[-1]))
+        for token in tokens[1:-1]:
+            mask &= self._union([token] if token in self.postings else [])
+        return mask
+
+    def _union(self, tokens: Iterable[str]) -> Mask:
+        mask = np.zeros(len(self._texts), dtype=bool)
+        for token in tokens:
+            mask[self.postings[token]] = True
+        return mask
+
+
+class SemanticIndex:
+    """TF-IDF vectors of documents, ranked by cosine similarity to a query.
+
+    Each document is a row of a sparse matrix: sublinear term frequencies
+    (1 + log tf) weighted by smoothed inverse document frequencies, normalized
+    to unit length. A query is weighted the same way, so the product of the
+    matrix with the query vector gives the cosine similarity of every document
+    while only touching the columns of the query terms.
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        self.vocabulary: dict[str, int] = {}
+        term_ids: list[int] = []
+        frequencies: list[int] = []
+        lengths = np.zeros(len(texts), dtype=np.int64)
+        for doc_id, text in enumerate(texts):
+            counts = Counter(_TOKEN_PATTERN.findall(text.lower()))
+            term_ids.extend(
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+                for token in counts
+            )
+            frequencies.extend(counts.values())
+            lengths[doc_id] = len(counts)
+
+        matrix = sparse.csr_matrix(
+            (
+                np.array(frequencies, dtype=np.float64),
+                np.array(term_ids, dtype=np.int64),
+                np.concatenate([[0], np.cumsum(lengths)]),
+            ),
+            shape=(len(texts), len(self.vocabulary)),
+        )
+
+        document_frequencies = np.bincount(
+            matrix.indices, minlength=len(self.vocabulary)
+        )
+        self.idf = np.log((1 + len(texts)) / (1 + document_frequencies)) + 1
+        matrix.data = (1 + np.log(matrix.data)) * self.idf[matrix.indices]
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        # Columns are sliced by query term, CSC keeps that cheap
+        self.matrix = sparse.csc_matrix(sparse.diags(1 / norms) @ matrix)
+
+    def __len__(self) -> int:
+        return int(self.matrix.shape[0])
+
+    def scores(self, query: str) -> npt.NDArray[np.float64]:
+        """Cosine similarity of every document to the query."""
+        counts: dict[int, int] = {}
+        for token in _TOKEN_PATTERN.findall(query.lower()):
+            term_id = self.vocabulary.get(token)
+            if term_id is not None:
+                counts[term_id] = counts.get(term_id, 0) + 1
+        if not counts:
+            return np.zeros(len(self))
+        term_ids = np.array(list(counts))
+        weights = (1 + np.log(list(counts.values()))) * self.idf[term_ids]
+        weights /= np.linalg.norm(weights)
+        return np.asarray(self.matrix[:, term_ids] @ weights).ravel()
+
+    def search(self, query: str, k: int, within: Mask | None = None) -> Mask:
+        """Return the mask of the (at most) k documents most similar to the query.
+
+        Documents sharing no term with the query are never returned. If given,
+        only the documents of `within` are ranked.
+        """
+        scores = self.scores(query)
+        if within is not None:
+            scores[~within] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if k < candidates.size:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        mask = np.zeros(len(self), dtype=bool)
+        mask[candidates] = True
+        return mask
+
+
+class TopicVocabulary:
+    """Interns topic names to small integer IDs.
+
+    Topics come from a small closed vocabulary, so one process-wide instance
+    gives every account the same IDs. Indexes are built concurrently, so new
+    topics are assigned under a lock.
+    """
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self.names: list[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, topic: str) -> int:
+        """Return the ID of a topic, assigning a new one if unseen."""
+        topic_id = self._ids.get(topic)
+        if topic_id is None:
+            with self._lock:
+                topic_id = self._ids.get(topic)
+                if topic_id is None:
+                    # Name appended first: an ID read without the lock is valid
+                    self.names.append(topic)
+                    topic_id = self._ids[topic] = len(self.names) - 1
+        return topic_id
+
+    def get(self, topic: str) -> int | None:
+        """Return the ID of a topic, or None if it was never interned."""
+        return self._ids.get(topic)
+
+
+TOPIC_VOCABULARY = TopicVocabulary()
+
+
+class AccountIndex:
+    """Columnar representation of the interactions of an account.
+
+    Rows are the calls and emails sorted by date, once, when the index is
+    built. Dates are stored as ordinals, interaction types as codes and topics
+    as one bitmask per row (bit t set when the row has the topic of ID t),
+    while contents stay in the `Call`/`Email` objects and are only referenced.
+    A selection of rows is a boolean mask, turned back into objects with
+    `select`. Since dates are sorted, date ranges are found by binary search
+    and the latest interaction of each type is known up front.
+    """
+
+    def __init__(
+        self,
+        calls: list[Call],
+        emails: list[Email],
+        vocabulary: TopicVocabulary = TOPIC_VOCABULARY,
+    ):
+        interactions: list[Call | Email] = [*calls, *emails]
+        types = np.array([CALL] * len(calls) + [EMAIL] * len(emails), np.int8)
+        dates = np.zeros(len(interactions), dtype=np.int32)
+        for row, item in enumerate(interactions):
+            try:
+                dates[row] = date_ordinal(item.date)
+            except ValueError:
+                # Malformed dates sort before any valid one, like "" did
+                dates[row] = 0
+
+        # Stable, so calls stay before emails of the same day
+        order = np.argsort(dates, kind="stable")
+        self.interactions = [interactions[row] for row in order]
+
+        topic_masks = np.zeros((len(interactions), 1), dtype=np.uint64)
+        for row, item in enumerate(self.interactions):
+            for topic_id in map(vocabulary.intern, item.topics):
+                if topic_id // 64 >= topic_masks.shape[1]:
+                    extra = topic_id // 64 + 1 - topic_masks.shape[1]
+                    topic_masks = np.pad(topic_masks, ((0, 0), (0, extra)))
+                topic_masks[row, topic_id // 64] |= np.uint64(1 << topic_id % 64)
+
+        self._set_columns(
+            dates[order],
+            types[order],
+            topic_masks,
+            KeywordIndex([item.content for item in self.interactions]),
+            vocabulary,
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        dates: npt.NDArray[np.int32],
+        types: npt.NDArray[np.int8],
+        topic_masks: npt.NDArray[np.uint64],
+        keywords: KeywordIndex,
+        vocabulary: TopicVocabulary = TOPIC_VOCABULARY,
+    ) -> "AccountIndex":
+        """Build an index from the (date sorted) columns of another one.
+
+        The `Call`/`Email` objects aren't available, so `select` can't be used:
+        this is meant for workers that only compute masks.
+        """
+        index = cls.__new__(cls)
+        index.interactions = []
+        index._set_columns(dates, types, topic_masks, keywords, vocabulary)
+        return index
+
+    def _set_columns(
+        self,
+        dates: npt.NDArray[np.int32],
+        types: npt.NDArray[np.int8],
+        topic_masks: npt.NDArray[np.uint64],
+        keywords: KeywordIndex,
+        vocabulary: TopicVocabulary,
+    ) -> None:
+        self.dates = dates
+        self.types = types
+        self.topic_masks = topic_masks
+        self.vocabulary = vocabulary
+
+        self._everything = np.ones(len(dates), dtype=bool)
+        self._everything.flags.writeable = False
+        self._type_rows = [np.flatnonzero(types == code) for code in (CALL, EMAIL)]
+        used_bits = np.bitwise_or.reduce(topic_masks, axis=0)
+        self._topic_ids = [
+            word * 64 + bit
+            for word, bits in enumerate(used_bits.tolist())
+            for bit in range(64)
+            if bits >> bit & 1
+        ]
+
+        self.keywords = keywords
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def all(self) -> Mask:
+        """Read-only mask selecting every interaction."""
+        return self._everything
+
+    def select(self, mask: Mask) -> list[Call | Email]:
+        """Materialize the interactions of a mask, in chronological order."""
+        return [self.interactions[row] for row in np.flatnonzero(mask)]
+
+    def date_range(self, first: int, last: int) -> Mask:
+        """Mask of the interactions dated between two ordinals (inclusive)."""
+        mask = np.zeros(len(self.dates), dtype=bool)
+        start = np.searchsorted(self.dates, first, side="left")
+        stop = np.searchsorted(self.dates, last, side="right")
+        mask[start:stop] = True
+        return mask
+
+    def last_row(self, type_code: int, mask: Mask) -> int | None:
+        """Row of the latest interaction of a type within a mask, if any."""
+        rows = self._type_rows[type_code]
+        if mask is not self._everything:
+            rows = rows[mask[rows]]
+        return int(rows[-1]) if rows.size else None
+
+    def topic_mask(self, topics: Iterable[str]) -> Mask:
+        """Mask of the interactions having any of the topics."""
+        query = np.zeros(self.topic_masks.shape[1], dtype=np.uint64)
+        for topic in topics:
+            topic_id = self.vocabulary.get(topic)
+            if topic_id is not None and topic_id // 64 < len(query):
+                query[topic_id // 64] |= np.uint64(1 << topic_id % 64)
+        return np.any(self.topic_masks & query, axis=1)
+
+    def keyword_mask(self, keywords: Iterable[str], within: Mask | None = None) -> Mask:
+        """Mask of the interactions whose content contains any of the keywords.
+
+        If given, only the interactions of `within` are kept.
+        """
+        return self.keywords.search(keywords, within)
+
+    @cached_property
+    def semantic(self) -> SemanticIndex:
+        """TF-IDF index of the contents, for `semantic_mask`.
+
+        Built on the first search, so accounts never searched don't pay for it.
+        """
+        return SemanticIndex(self.keywords.texts)
+
+    def semantic_mask(self, query: str, k: int, within: Mask | None = None) -> Mask:
+        """Mask of the k interactions most similar to the query (TF-IDF cosine).
+
+        If given, only the interactions of `within` are ranked.
+        """
+        return self.semantic.search(query, k, within)
+
+    def date_count(self, first: int, last: int) -> int:
+        """Number of interactions dated between two ordinals (inclusive)."""
+        start = np.searchsorted(self.dates, first, side="left")
+        stop = np.searchsorted(self.dates, last, side="right")
+        return max(int(stop - start), 0)
+
+    @cached_property
+    def topic_frequencies(self) -> dict[str, int]:
+        """Number of interactions of each topic in the account."""
+        return self.topic_counts()
+
+    def topic_counts(self, mask: Mask | None = None) -> dict[str, int]:
+        """Count the interactions of each topic, within a mask if given."""
+        counts = {}
+        for topic_id in self._topic_ids:
+            column = self.topic_masks[:, topic_id // 64] >> np.uint64(topic_id % 64)
+            has_topic = (column & np.uint64(1)).astype(bool)
+            if mask is not None:
+                has_topic &= mask
+            count = int(np.count_nonzero(has_topic))
+            if count:
+                counts[self.vocabulary.names[topic_id]] = count
+        return counts
@@ -1,21 +1,38 @@
 import logging
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Any, Literal
 
 from langchain_core.callbacks import get_usage_metadata_callback
 from langchain_core.language_models import BaseChatModel
-from langchain_core.runnables import RunnableSequence
+from langchain_core.runnables import Runnable
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 
+from agent.config import (
+    STUB_LLM_ANSWER_TOKENS,
+    STUB_LLM_FAILURE_RATE,
+    STUB_LLM_TOKENS_PER_SECOND,
+    STUB_LLM_TTFT_SECONDS,
+)
+from agent.stub_llm import StubChatModel
+
 
 def get_llm(
-    llm_provider: Literal["google", "openai"],
+    llm_provider: Literal["google", "openai", "stub"],
     model_name: str,
     reasoning_effort: Literal["none", "minimal", "low", "medium", "high"],
     streaming: bool,
 ) -> BaseChatModel:
     """Get the LLM based on the configured provider."""
+    if llm_provider == "stub":
+        return StubChatModel(
+            model_name=f"stub-{model_name}",
+            streaming=streaming,
+            ttft_seconds=STUB_LLM_TTFT_SECONDS,
+            tokens_per_second=STUB_LLM_TOKENS_PER_SECOND,
+            failure_rate=STUB_LLM_FAILURE_RATE,
+            answer_tokens=STUB_LLM_ANSWER_TOKENS,
+        )
     if llm_provider == "google":
         return ChatGoogleGenerativeAI(
             model=model_name, temperature=0, streaming=streaming
@@ -31,9 +48,7 @@ def get_llm(
         )
 
 
-def safe_run_llm(
-    llm: BaseChatModel | RunnableSequence, llm_inputs: Any
-) -> tuple[Any, bool]:
+def safe_run_llm(llm: Runnable[Any, Any], llm_inputs: Any) -> tuple[Any, bool]:
     """Invoke LLM with usage tracking and error handling."""
     llm_success = False
     try:
@@ -46,8 +61,21 @@ def safe_run_llm(
     return response, llm_success
 
 
+async def safe_arun_llm(llm: Runnable[Any, Any], llm_inputs: Any) -> tuple[Any, bool]:
+    """Async version of `safe_run_llm`."""
+    llm_success = False
+    try:
+        with get_usage_metadata_callback() as usage_cb:
+            response = await llm.ainvoke(llm_inputs)
+            logging.info(f"LLM usage: {usage_cb.usage_metadata}")
+        llm_success = True
+    except Exception:
+        response = "Error during LLM invocation"
+    return response, llm_success
+
+
 def safe_stream_llm(  # type: ignore[return]
-    llm: BaseChatModel | RunnableSequence, llm_inputs: Any
+    llm: Runnable[Any, Any], llm_inputs: Any
 ) -> Generator[Any | None, None, dict[str, Any]]:
     """Stream LLM output token by token with usage tracking.
 
@@ -65,3 +93,18 @@ def safe_stream_llm(  # type: ignore[return]
     except (RuntimeError, ValueError):
         # Yield error message once
         yield None
+
+
+async def safe_astream_llm(
+    llm: Runnable[Any, Any], llm_inputs: Any
+) -> AsyncGenerator[Any | None]:
+    """Async version of `safe_stream_llm`."""
+    try:
+        with get_usage_metadata_callback() as usage_cb:
+            async for chunk in llm.astream(llm_inputs):
+                for token in chunk:
+                    yield token
+            logging.info(f"LLM usage: {usage_cb.usage_metadata}")
+    except (RuntimeError, ValueError):
+        # Yield error message once
+        yield None
@@ -4,7 +4,6 @@
 This module provides the main interface to run the agent.
 """
 
-import asyncio
 import logging
 from collections.abc import AsyncGenerator
 
@@ -31,6 +30,28 @@ class AgentOutput(BaseModel):
     response: str
 
 
+def create_initial_state(
+    user_query: str, account_id: int, baseline: bool = False
+) -> AgentState:
+    """Create the state the agent starts from."""
+    return AgentState(
+        user_query=user_query,
+        account_id=account_id,
+        baseline=baseline,
+        calls=[],
+        emails=[],
+        index=None,
+        pushdown=False,
+        data_version=None,
+        plans=[],
+        context="",
+        templated_answer=None,
+        end=False,
+        final_response="",
+        messages=[],
+    )
+
+
 def run_agent(
     agent: StateGraph, user_query: str, account_id: int, baseline: bool = False
 ) -> str:
@@ -45,24 +66,22 @@ def run_agent(
     Returns:
         The agent's response as a string
     """
-    initial_state = AgentState(
-        user_query=user_query,
-        account_id=account_id,
-        baseline=baseline,
-        calls=[],
-        emails=[],
-        plans=[],
-        context="",
-        end=False,
-        final_response="",
-        messages=[],
-    )
+    initial_state = create_initial_state(user_query, account_id, baseline)
 
     # Run the agent
     result = agent.invoke(initial_state)
     return result["final_response"]  # type: ignore[no-any-return]
 
 
+async def arun_agent(
+    agent: StateGraph, user_query: str, account_id: int, baseline: bool = False
+) -> str:
+    """Async version of `run_agent`, which doesn't block the event loop."""
+    initial_state = create_initial_state(user_query, account_id, baseline)
+    result = await agent.ainvoke(initial_state)  # type: ignore[attr-defined]
+    return result["final_response"]  # type: ignore[no-any-return]
+
+
 async def stream_agent(
     agent: StateGraph, user_query: str, account_id: int, baseline: bool = False
 ) -> AsyncGenerator[str]:  # type: ignore[type-arg]
@@ -76,23 +95,18 @@ async def stream_agent(
     Yields:
         Tokens from the agent's response as they are generated
     """
-    initial_state = AgentState(
-        user_query=user_query,
-        account_id=account_id,
-        baseline=baseline,
-        calls=[],
-        emails=[],
-        plans=[],
-        context="",
-        end=False,
-        final_response="",
-        messages=[],
-    )
-
-    # Stream tokens from the agent
-    for msg_chunk, metadata in agent.stream(initial_state, stream_mode="messages"):
+    initial_state = create_initial_state(user_query, account_id, baseline)
+
+    # Stream tokens from the agent: LLM tokens, or a cached answer replayed
+    async for mode, chunk in agent.astream(  # type: ignore[attr-defined]
+        initial_state, stream_mode=["messages", "custom"]
+    ):
+        if mode == "custom":
+            if "answer_token" in chunk:
+                yield chunk["answer_token"]
+            continue
+        msg_chunk, metadata = chunk
         for token in msg_chunk.content:
             if metadata.get("langgraph_node") != "final_answer":
                 continue
             yield token.get("text", "")
-            await asyncio.sleep(0)
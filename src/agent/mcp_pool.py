@@ -0,0 +1,262 @@
+"""MCP Session Pool.
+
+Keeps initialized MCP client sessions open and reuses them across tool calls,
+instead of connecting and running the `initialize` handshake on every call.
+All sessions live on one event loop running in a background thread, so sync
+code (LangGraph nodes, scripts) and coroutines on other loops (FastAPI) can
+call tools without creating an event loop or a thread per call.
+
+- bounded concurrency: at most `size` sessions, callers wait for a free one;
+- keep-alive: idle sessions are pinged every `keepalive_interval` seconds;
+- health checks: a session whose connection ended, whose ping failed or whose
+  call raised is closed, and a fresh one is opened (reconnect) for the retry.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, Coroutine
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamable_http_client
+from mcp.types import CallToolResult
+
+
+@dataclass
+class _Session:
+    """An open session and the task holding its connection."""
+
+    session: ClientSession
+    task: asyncio.Task[None]
+    # Set to make the holding task close the connection
+    closing: asyncio.Event
+    last_used: float = field(default_factory=time.monotonic)
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the connection is still open."""
+        return not self.task.done() and not self.closing.is_set()
+
+
+class MCPSessionPool:
+    """Pool of MCP client sessions owned by a background event loop."""
+
+    def __init__(
+        self,
+        server_url: str,
+        size: int = 4,
+        keepalive_interval: float = 30,
+        timeout: float = 60,
+    ):
+        self.server_url = server_url
+        self.size = size
+        self.keepalive_interval = keepalive_interval
+        self.timeout = timeout
+        self._idle: deque[_Session] = deque()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._keepalive_future: Future[None] | None = None
+        self._start_lock = threading.Lock()
+        self.calls = 0
+        self.connects = 0
+        self.reconnects = 0
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The pool's event loop, started on first use."""
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=loop.run_forever, name="mcp-session-pool", daemon=True
+                )
+                self._thread.start()
+                self._loop = loop
+                self._keepalive_future = asyncio.run_coroutine_threadsafe(
+                    self._keepalive(), loop
+                )
+        return self._loop
+
+    def run[T](self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the pool's loop and wait for its result."""
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("MCPSessionPool.run called from the pool's loop")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def arun[T](self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the pool's loop from any event loop and await it."""
+        loop = self.loop
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def call_tool(
+        self, tool_name: str, arguments: dict[str, Any]
+    ) -> CallToolResult:
+        """Call a tool, retrying once on a new session if the call fails.
+
+        Must run on the pool's loop (see `run` and `arun`).
+        """
+        self.calls += 1
+        try:
+            return await self._call_tool(tool_name, arguments)
+        except Exception as e:
+            logging.info(f"MCP call {tool_name} failed ({e!r}), reconnecting")
+            self.reconnects += 1
+        return await self._call_tool(tool_name, arguments)
+
+    async def _call_tool(
+        self, tool_name: str, arguments: dict[str, Any]
+    ) -> CallToolResult:
+        async with self._lease() as entry:
+            return await self._request(
+                entry, entry.session.call_tool(tool_name, arguments)
+            )
+
+    async def _request[T](self, entry: _Session, request: Coroutine[Any, Any, T]) -> T:
+        """Await a request, failing as soon as the session's connection ends."""
+        task = asyncio.ensure_future(request)
+        done, _ = await asyncio.wait(
+            {task, entry.task},
+            timeout=self.timeout,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if task not in done:
+            task.cancel()
+            if entry.task in done:
+                raise ConnectionError("MCP connection closed")
+            raise TimeoutError(f"MCP request timed out after {self.timeout}s")
+        return task.result()
+
+    async def list_tools(self) -> set[str]:
+        """Names of the tools advertised by the server."""
+        async with self._lease() as entry:
+            result = await self._request(entry, entry.session.list_tools())
+        return {tool.name for tool in result.tools}
+
+    def stats(self) -> dict[str, int]:
+        """Return call/connection counters and the number of idle sessions."""
+        return {
+            "calls": self.calls,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "idle_sessions": len(self._idle),
+            "size": self.size,
+        }
+
+    def close(self) -> None:
+        """Close all sessions and stop the background loop."""
+        if self._loop is None:
+            return
+        if self._keepalive_future is not None:
+            # Cancelled on the loop before the sessions are closed
+            self._keepalive_future.cancel()
+        with suppress(Exception):
+            self.run(self._close_idle())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Semaphore bounding the sessions in use, created on the pool's loop."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        return self._slots
+
+    @asynccontextmanager
+    async def _lease(self) -> AsyncGenerator[_Session]:
+        """Borrow a healthy session, opening one if none is idle.
+
+        The session is closed instead of returned if the caller raised.
+        """
+        async with self._semaphore():
+            entry = None
+            while self._idle and entry is None:
+                entry = self._idle.pop()
+                if not entry.healthy:
+                    await self._close(entry)
+                    entry = None
+            if entry is None:
+                entry = await self._open()
+            try:
+                yield entry
+            except BaseException:
+                await self._close(entry)
+                raise
+            entry.last_used = time.monotonic()
+            self._idle.append(entry)
+
+    async def _open(self) -> _Session:
+        """Connect and initialize a session in a task that keeps it open.
+
+        The connection's context managers must be exited by the task that
+        entered them, so a holding task owns them until asked to close.
+        """
+        ready: asyncio.Future[ClientSession] = (
+            asyncio.get_running_loop().create_future()
+        )
+        closing = asyncio.Event()
+
+        async def hold() -> None:
+            try:
+                async with streamable_http_client(self.server_url) as (read, write, _):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        ready.set_result(session)
+                        await closing.wait()
+            except Exception as e:
+                if not ready.done():
+                    ready.set_exception(e)
+                else:
+                    logging.info(f"MCP session closed: {e!r}")
+
+        task = asyncio.create_task(hold())
+        try:
+            session = await asyncio.wait_for(asyncio.shield(ready), self.timeout)
+        except BaseException:
+            closing.set()
+            task.cancel()
+            raise
+        self.connects += 1
+        return _Session(session=session, task=task, closing=closing)
+
+    async def _close(self, entry: _Session) -> None:
+        entry.closing.set()
+        with suppress(Exception, asyncio.CancelledError):
+            await asyncio.wait_for(entry.task, self.timeout)
+
+    async def _close_idle(self) -> None:
+        while self._idle:
+            await self._close(self._idle.pop())
+
+    async def _keepalive(self) -> None:
+        """Ping the sessions idle for a keep-alive interval, drop dead ones."""
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            now = time.monotonic()
+            for entry in list(self._idle):
+                if now - entry.last_used < self.keepalive_interval:
+                    continue
+                # A slot, so pings count toward the concurrency bound
+                async with self._semaphore():
+                    if entry not in self._idle:
+                        # Leased while waiting for the slot
+                        continue
+                    self._idle.remove(entry)
+                    try:
+                        if not entry.healthy:
+                            raise ConnectionError("connection closed")
+                        await self._request(entry, entry.session.send_ping())
+                    except Exception as e:
+                        logging.info(f"MCP session failed health check: {e!r}")
+                        await self._close(entry)
+                        continue
+                    entry.last_used = time.monotonic()
+                    self._idle.append(entry)
@@ -2,12 +2,16 @@
 
 from .final_answer import create_final_answer_node
 from .mcp import create_mcp_node
+from .mcp_planner import create_mcp_planner_node
 from .plan_executer import create_plan_executer_node
 from .planner import create_planner_node
+from .templated_answer import create_templated_answer_node
 
 __all__ = [
     "create_final_answer_node",
     "create_mcp_node",
+    "create_mcp_planner_node",
     "create_planner_node",
     "create_plan_executer_node",
+    "create_templated_answer_node",
 ]
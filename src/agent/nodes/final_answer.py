@@ -3,17 +3,32 @@
 
 This node receives the user query and retrieved context,
 then uses GPT-4o-mini to generate the final response.
+
+Answers are cached by account, data version, normalized question and a hash
+of the context (`answer_cache`): a new version of the account's data makes
+its cached answers unreachable. On a hit the LLM is skipped, and a streaming
+node replays the answer word by word on the graph's "custom" stream.
 """
 
-from collections.abc import Callable
+import hashlib
+import re
 from typing import Any
 
 from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+from langgraph.config import get_stream_writer
 
-from agent.config import AgentState
-from agent.llm_utils import safe_run_llm, safe_stream_llm
+from agent.cache import TTLCache
+from agent.config import ANSWER_CACHE_MAX_BYTES, ANSWER_CACHE_TTL_SECONDS, AgentState
+from agent.llm_utils import (
+    safe_arun_llm,
+    safe_astream_llm,
+    safe_run_llm,
+    safe_stream_llm,
+)
+from agent.questions import normalize_question
 
 # System prompt for the final answer LLM
 FINAL_ANSWER_SYSTEM_PROMPT = """You are a helpful assistant that answers questions about accounts based on their interaction history.
@@ -27,10 +42,51 @@ If the information needed to answer the question is not available in the context
 """
 
 
+ERROR_UPDATE = {
+    "final_response": "Error: Unable to generate plan at this time.",
+    "end": True,
+}
+
+PROMPT = ChatPromptTemplate.from_messages(
+    [("system", FINAL_ANSWER_SYSTEM_PROMPT), ("human", "User's question: {user_query}")]
+)
+
+
+AnswerKey = tuple[int, str | None, str, str]
+
+# Final answers, by `answer_key`
+answer_cache: TTLCache[AnswerKey, str] = TTLCache(
+    max_bytes=ANSWER_CACHE_MAX_BYTES, ttl=ANSWER_CACHE_TTL_SECONDS
+)
+
+
+def answer_key(state: AgentState) -> AnswerKey:
+    """Cache key of the answer: account, data version, question and context."""
+    text, dates = normalize_question(state["user_query"])
+    return (
+        state["account_id"],
+        state.get("data_version"),
+        " ".join([text, *dates]),
+        hashlib.sha256(state["context"].encode()).hexdigest(),
+    )
+
+
+def cache_answer(key: AnswerKey, response: str) -> None:
+    """Cache an answer, its size estimated from the texts it holds."""
+    answer_cache.put(key, response, size=len(response) + len(key[2]) + 256)
+
+
+def replay_answer(response: str) -> None:
+    """Stream a cached answer word by word, as "answer_token" custom chunks."""
+    writer = get_stream_writer()
+    for token in re.findall(r"\S+\s*|\s+", response):
+        writer({"answer_token": token})
+
+
 def create_final_answer_node(
     llm: BaseChatModel, streaming: bool
-) -> Callable[[AgentState], dict[str, Any]]:
-    """Create the final answer node function."""
+) -> RunnableLambda[AgentState, dict[str, Any]]:
+    """Create the final answer node, runnable with both `invoke` and `ainvoke`."""
 
     def final_answer_node(state: AgentState) -> dict[str, Any]:
         """Final answer node - generates the response using GPT-4o-mini.
@@ -48,19 +104,19 @@ def create_final_answer_node(
         """
         user_query = state["user_query"]
         context = state["context"]
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", FINAL_ANSWER_SYSTEM_PROMPT),
-                ("human", "User's question: {user_query}"),
-            ]
-        )
+        key = answer_key(state)
+        cached = answer_cache.get(key)
+        if cached is not None:
+            if streaming:
+                replay_answer(cached)
+            return {"final_response": cached}
         if streaming:
-            chain = llm | StrOutputParser()
+            chain: Runnable[Any, str] = llm | StrOutputParser()
             tokens = []
             llm_success = True
             for token in safe_stream_llm(
                 chain,
-                prompt.format_prompt(
+                PROMPT.format_prompt(
                     context=context, user_query=user_query
                 ).to_messages(),
             ):
@@ -70,16 +126,51 @@ def create_final_answer_node(
                 tokens.append(token)
             response = "".join(tokens)
         else:
-            chain = prompt | llm | StrOutputParser()
+            chain = PROMPT | llm | StrOutputParser()
             response, llm_success = safe_run_llm(
                 chain, llm_inputs={"context": context, "user_query": user_query}
             )
         if not llm_success:
             # If LLM failed, return an error response and end the agent workflow
-            return {
-                "final_response": "Error: Unable to generate plan at this time.",
-                "end": True,
-            }
+            return {**ERROR_UPDATE}
+        cache_answer(key, response)
+        return {"final_response": response}
+
+    async def afinal_answer_node(state: AgentState) -> dict[str, Any]:
+        """Async version of `final_answer_node`."""
+        user_query = state["user_query"]
+        context = state["context"]
+        key = answer_key(state)
+        cached = answer_cache.get(key)
+        if cached is not None:
+            if streaming:
+                replay_answer(cached)
+            return {"final_response": cached}
+        if streaming:
+            chain: Runnable[Any, str] = llm | StrOutputParser()
+            tokens = []
+            llm_success = True
+            async for token in safe_astream_llm(
+                chain,
+                PROMPT.format_prompt(
+                    context=context, user_query=user_query
+                ).to_messages(),
+            ):
+                if token is None:
+                    llm_success = False
+                    break
+                tokens.append(token)
+            response = "".join(tokens)
+        else:
+            chain = PROMPT | llm | StrOutputParser()
+            response, llm_success = await safe_arun_llm(
+                chain, llm_inputs={"context": context, "user_query": user_query}
+            )
+        if not llm_success:
+            return {**ERROR_UPDATE}
+        cache_answer(key, response)
         return {"final_response": response}
 
-    return final_answer_node
+    return RunnableLambda(
+        final_answer_node, afunc=afinal_answer_node, name="final_answer"
+    )
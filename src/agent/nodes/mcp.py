@@ -5,96 +5,413 @@ This node is the first entrypoint of the agent. It:
 1. Uses the pre-determined plan to fetch all calls and emails
 2. Calls the MCP tools directly to retrieve the context
 3. Passes control to the final_answer node
+
+Fetched accounts are cached with the server's data version (`account_cache`):
+a cached account is used while its TTL lasts, then revalidated with the cheap
+`account_version` tool and re-fetched only if the data changed. Concurrent
+fetches and revalidations of the same account are coalesced.
 """
 
 import asyncio
 import json
 import logging
-from collections.abc import Callable, Coroutine
-from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Any
 
-from mcp import ClientSession
-from mcp.client.streamable_http import streamable_http_client
-
-from agent.config import MCP_SERVER_URL, AgentState, Call, Email
+from langchain_core.runnables import RunnableLambda
 
-# Thread pool for running async code from sync context
-_executor = ThreadPoolExecutor(max_workers=4)
+from agent.cache import TTLCache
+from agent.config import (
+    ACCOUNT_CACHE_MAX_BYTES,
+    ACCOUNT_CACHE_TTL_SECONDS,
+    MCP_CALL_TIMEOUT_SECONDS,
+    MCP_KEEPALIVE_SECONDS,
+    MCP_POOL_SIZE,
+    MCP_PUSHDOWN,
+    MCP_SERVER_URL,
+    AgentState,
+    Call,
+    Email,
+    PlanSeries,
+)
+from agent.indexes import AccountIndex
+from agent.mcp_pool import MCPSessionPool
+from agent.singleflight import SingleFlight
 
 logging.basicConfig(level=logging.INFO)
 
 
-def _run_async(coro: Coroutine[Any, Any, str]) -> str:
-    """Run async coroutine from sync context, handling existing event loops."""
-    try:
-        _ = asyncio.get_running_loop()
-    except RuntimeError:
-        # No running loop, safe to use asyncio.run()
-        return asyncio.run(coro)
-
-    # There's a running loop (e.g., FastAPI), run in a new thread
-
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(lambda: asyncio.run(coro))
-        return future.result()
-
-
 class MCPClient:
-    """Simple MCP client wrapper for tool calls using streamable_http."""
+    """MCP client wrapper for tool calls using streamable_http.
+
+    Calls go through a pool of persistent sessions (see `MCPSessionPool`).
+    """
 
     def __init__(self, server_url: str):
         self.server_url = server_url
+        self.pool = MCPSessionPool(
+            server_url,
+            size=MCP_POOL_SIZE,
+            keepalive_interval=MCP_KEEPALIVE_SECONDS,
+            timeout=MCP_CALL_TIMEOUT_SECONDS,
+        )
+        self._tools: set[str] | None = None
 
     async def _call_tool(self, tool_name: str, arguments: dict[str, Any]) -> str:
-        """Async method to call an MCP tool."""
-        async with streamable_http_client(self.server_url) as (read, write, _):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                result = await session.call_tool(tool_name, arguments)
-
-                # Extract text from result
-                if result.content:
-                    return "\n".join(
-                        block.text for block in result.content if hasattr(block, "text")
-                    )
-                return ""
+        """Async method to call an MCP tool, on the pool's event loop."""
+        result = await self.pool.call_tool(tool_name, arguments)
+
+        # Extract text from result
+        if result.content:
+            return "\n".join(
+                block.text for block in result.content if hasattr(block, "text")
+            )
+        return ""
 
     def call_tool(self, tool_name: str, arguments: dict[str, Any]) -> str:
         """Sync wrapper to call an MCP tool."""
         try:
-            return _run_async(self._call_tool(tool_name, arguments))
+            return self.pool.run(self._call_tool(tool_name, arguments))
+        except Exception as e:
+            return f"Error calling {tool_name}: {str(e)}"
+
+    async def acall_tool(self, tool_name: str, arguments: dict[str, Any]) -> str:
+        """Call an MCP tool from any event loop."""
+        try:
+            return await self.pool.arun(self._call_tool(tool_name, arguments))
         except Exception as e:
             return f"Error calling {tool_name}: {str(e)}"
 
+    def has_tool(self, tool_name: str) -> bool:
+        """Check whether the server advertises a tool.
+
+        The tool list is fetched once, and again on the next call if it failed.
+        """
+        if self._tools is None:
+            try:
+                self._tools = self.pool.run(self.pool.list_tools())
+            except Exception as e:
+                logging.info(f"Could not list MCP tools: {e}")
+                return False
+        return tool_name in self._tools
+
+    async def ahas_tool(self, tool_name: str) -> bool:
+        """Async version of `has_tool`."""
+        if self._tools is None:
+            try:
+                self._tools = await self.pool.arun(self.pool.list_tools())
+            except Exception as e:
+                logging.info(f"Could not list MCP tools: {e}")
+                return False
+        return tool_name in self._tools
+
 
 # Initialize MCP client
 mcp_client = MCPClient(MCP_SERVER_URL)
 
 
-def create_mcp_node() -> Callable[[AgentState], dict[str, Any]]:
-    """Create the MCP node function."""
+@dataclass(slots=True)
+class AccountData:
+    """The validated calls and emails of an account and their index."""
+
+    calls: list[Call]
+    emails: list[Email]
+    index: AccountIndex
+    # Version of the server's data they were fetched at, None if unknown
+    version: str | None = None
+
+
+# Fetched accounts, by account ID, with the data version they were fetched at
+account_cache: TTLCache[int, AccountData] = TTLCache(
+    max_bytes=ACCOUNT_CACHE_MAX_BYTES, ttl=ACCOUNT_CACHE_TTL_SECONDS
+)
+
+# Concurrent requests for the same account share one fetch/revalidation
+account_fetches: SingleFlight[int, AccountData | None] = SingleFlight("account_fetch")
+version_checks: SingleFlight[int, str | None] = SingleFlight("account_version")
+
+
+def _account_bytes(calls: list[Call], emails: list[Email]) -> int:
+    """Rough memory footprint of a fetched account.
+
+    The texts are held by the models and the keyword index, plus a fixed
+    overhead per interaction for the objects and index columns.
+    """
+    interactions: list[Call | Email] = [*calls, *emails]
+    return sum(2 * len(item.content) + 512 for item in interactions)
+
+
+def _parse_interactions(raw: str) -> tuple[list[Call], list[Email], str | None]:
+    """Validate the calls and emails of a `calls_emails` response."""
+    mcp_data = json.loads(raw)
+    calls = [Call.model_validate(v) for v in mcp_data.get("calls") or []]
+    emails = [Email.model_validate(v) for v in mcp_data.get("emails") or []]
+    return calls, emails, mcp_data.get("version")
+
+
+def _parse_version(raw: str) -> str | None:
+    """Version of an `account_version` response, None if unknown."""
+    try:
+        return json.loads(raw).get("version")  # type: ignore[no-any-return]
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
+def _index_account(
+    account_id: int, calls: list[Call], emails: list[Email], version: str | None
+) -> AccountData | None:
+    """Index fetched calls and emails and cache them, None if there are none."""
+    if not calls and not emails:
+        account_cache.pop(account_id)
+        return None
+    data = AccountData(calls, emails, AccountIndex(calls, emails), version)
+    account_cache.put(
+        account_id, data, size=_account_bytes(calls, emails), version=version
+    )
+    return data
+
+
+def _revalidated(account_id: int, version: str | None) -> AccountData | None:
+    """The cached account if it is still at `version`, else drop it."""
+    entry = account_cache.entry(account_id)
+    if entry is not None and version is not None and entry.version == version:
+        return account_cache.touch(account_id)
+    account_cache.pop(account_id)
+    return None
+
+
+def cached_account(account_id: int) -> AccountData | None:
+    """Return the cached account if it is still current, without fetching it.
+
+    A fresh entry is used as is. An expired one is revalidated by comparing its
+    version with the server's `account_version`, which doesn't transfer data.
+    """
+    data = account_cache.get(account_id)
+    if data is not None:
+        return data
+    entry = account_cache.entry(account_id)
+    if entry is None or entry.version is None:
+        return None
+    if not mcp_client.has_tool("account_version"):
+        return None
+    version = version_checks.do(
+        account_id,
+        lambda: _parse_version(
+            mcp_client.call_tool("account_version", {"account_id": account_id})
+        ),
+    )
+    return _revalidated(account_id, version)
+
+
+async def acached_account(account_id: int) -> AccountData | None:
+    """Async version of `cached_account`."""
+    data = account_cache.get(account_id)
+    if data is not None:
+        return data
+    entry = account_cache.entry(account_id)
+    if entry is None or entry.version is None:
+        return None
+    if not await mcp_client.ahas_tool("account_version"):
+        return None
+
+    async def check() -> str | None:
+        return _parse_version(
+            await mcp_client.acall_tool("account_version", {"account_id": account_id})
+        )
+
+    version = await version_checks.ado(account_id, check)
+    return _revalidated(account_id, version)
+
+
+def fetch_account(account_id: int) -> AccountData | None:
+    """Fetch, validate, index and cache all calls and emails of an account.
+
+    Concurrent fetches of the same account are coalesced into one.
+
+    Returns:
+        The account data, None if the account has no calls or emails.
+    """
+
+    def fetch() -> AccountData | None:
+        return _index_account(
+            account_id,
+            *_parse_interactions(
+                mcp_client.call_tool("calls_emails", {"account_id": account_id})
+            ),
+        )
+
+    return account_fetches.do(account_id, fetch)
+
+
+async def afetch_account(account_id: int) -> AccountData | None:
+    """Async version of `fetch_account`, indexing off the event loop."""
+
+    async def fetch() -> AccountData | None:
+        calls, emails, version = _parse_interactions(
+            await mcp_client.acall_tool("calls_emails", {"account_id": account_id})
+        )
+        return await asyncio.to_thread(
+            _index_account, account_id, calls, emails, version
+        )
+
+    return await account_fetches.ado(account_id, fetch)
+
+
+def load_account(account_id: int) -> AccountData | None:
+    """Return the cached account if current, else fetch it."""
+    return cached_account(account_id) or fetch_account(account_id)
+
+
+async def aload_account(account_id: int) -> AccountData | None:
+    """Async version of `load_account`."""
+    return await acached_account(account_id) or await afetch_account(account_id)
+
+
+def pushdown_available() -> bool:
+    """Whether plans should be executed by the MCP server."""
+    return MCP_PUSHDOWN != "off" and mcp_client.has_tool("execute_plans")
+
+
+async def apushdown_available() -> bool:
+    """Async version of `pushdown_available`."""
+    return MCP_PUSHDOWN != "off" and await mcp_client.ahas_tool("execute_plans")
+
+
+def _execute_plans_arguments(
+    account_id: int, plans: list[PlanSeries]
+) -> dict[str, Any]:
+    return {"account_id": account_id, "plans": [plan.model_dump() for plan in plans]}
+
+
+def _parse_plan_results(raw: str) -> list[list[Call | Email] | int] | None:
+    """Validate an `execute_plans` response, None if the server failed."""
+    try:
+        mcp_data = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    if mcp_data.get("results") is None:
+        logging.info(f"Server-side plan execution failed: {mcp_data.get('error')}")
+        return None
+
+    plan_results: list[list[Call | Email] | int] = []
+    for result in mcp_data["results"]:
+        if "count" in result:
+            plan_results.append(result["count"])
+        else:
+            plan_results.append(
+                [
+                    Call.model_validate(v)
+                    if v["interaction_type"] == "call"
+                    else Email.model_validate(v)
+                    for v in result["interactions"]
+                ]
+            )
+    return plan_results
+
+
+def execute_plans_remote(
+    account_id: int, plans: list[PlanSeries]
+) -> list[list[Call | Email] | int] | None:
+    """Execute plans on the MCP server.
+
+    Returns:
+        One result per plan (the interactions or the count), or None if the
+        server could not execute the plans.
+    """
+    return _parse_plan_results(
+        mcp_client.call_tool(
+            "execute_plans", _execute_plans_arguments(account_id, plans)
+        )
+    )
+
+
+async def aexecute_plans_remote(
+    account_id: int, plans: list[PlanSeries]
+) -> list[list[Call | Email] | int] | None:
+    """Async version of `execute_plans_remote`."""
+    return _parse_plan_results(
+        await mcp_client.acall_tool(
+            "execute_plans", _execute_plans_arguments(account_id, plans)
+        )
+    )
+
+
+NOT_FOUND = {"final_response": "data not found for the given account id.", "end": True}
+
+
+def _account_data(data: AccountData | None) -> dict[str, Any]:
+    """State update with the account's calls, emails and index."""
+    if data is None:
+        return {**NOT_FOUND}
+    return {
+        "calls": data.calls,
+        "emails": data.emails,
+        "index": data.index,
+        "data_version": data.version,
+        "end": False,
+    }
+
+
+def create_mcp_node() -> RunnableLambda[AgentState, dict[str, Any]]:
+    """Create the MCP node, runnable with both `invoke` and `ainvoke`."""
+
+    def fetch(state: AgentState) -> dict[str, Any]:
+        account_id = state["account_id"]
+        cached = cached_account(account_id)
+        if cached is not None:
+            return _account_data(cached)
+        if pushdown_available():
+            # Running no plan only tells whether the account has data
+            mcp_data = json.loads(
+                mcp_client.call_tool(
+                    "execute_plans", {"account_id": account_id, "plans": []}
+                )
+            )
+            if not mcp_data.get("found"):
+                return {**NOT_FOUND}
+            return {
+                "pushdown": True,
+                "data_version": mcp_data.get("version"),
+                "end": False,
+            }
+
+        return _account_data(fetch_account(account_id))
+
+    async def afetch(state: AgentState) -> dict[str, Any]:
+        account_id = state["account_id"]
+        cached = await acached_account(account_id)
+        if cached is not None:
+            return _account_data(cached)
+        if await apushdown_available():
+            mcp_data = json.loads(
+                await mcp_client.acall_tool(
+                    "execute_plans", {"account_id": account_id, "plans": []}
+                )
+            )
+            if not mcp_data.get("found"):
+                return {**NOT_FOUND}
+            return {
+                "pushdown": True,
+                "data_version": mcp_data.get("version"),
+                "end": False,
+            }
+
+        return _account_data(await afetch_account(account_id))
 
     def mcp_node(state: AgentState) -> dict[str, Any]:
         """Supervisor node - orchestrates the agent execution.
 
         This node:
-        1. Uses the fixed plan (fetch all calls and emails)
+        1. Uses the cached account when it is still current, or else only
+           checks the account has data when plans can be executed by the MCP
+           server, or else fetches all calls and emails (and caches them)
         2. Calls the MCP tools to retrieve data
         3. Stores the retrieved context in state
         """
-        account_id = state["account_id"]
-        mcp_data = json.loads(
-            mcp_client.call_tool("calls_emails", {"account_id": account_id})
-        )
-        calls = [Call.model_validate(v) for v in mcp_data.get("calls", [])]
-        emails = [Email.model_validate(v) for v in mcp_data.get("emails", [])]
+        return fetch(state)
 
-        if not calls and not emails:
-            return {
-                "final_response": "data not found for the given account id.",
-                "end": True,
-            }
-        return {"calls": calls, "emails": emails, "end": False}
+    async def amcp_node(state: AgentState) -> dict[str, Any]:
+        """Async version of `mcp_node`, indexing off the event loop."""
+        return await afetch(state)
 
-    return mcp_node
+    return RunnableLambda(mcp_node, afunc=amcp_node, name="mcp")
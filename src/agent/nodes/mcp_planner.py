@@ -0,0 +1,78 @@
+"""MCP + Planner Node.
+
+With PARALLEL_PLANNING, a single node runs the mcp node's account check and
+the planner concurrently, so the MCP round-trip overlaps with the planner LLM
+call. Both are plain node runnables called with the node's state and config.
+
+When the account has no data, the planner is not needed: the async node
+cancels its task (and with it the in-flight LLM call), the sync one abandons
+the planner's thread, and the run ends with the mcp node's message.
+"""
+
+import asyncio
+import logging
+from typing import Any
+
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from agent.config import AgentState
+
+Node = Runnable[AgentState, dict[str, Any]]
+
+
+def _merge(data_update: dict[str, Any], plan_update: dict[str, Any]) -> dict[str, Any]:
+    """State update of the account data and of the plans.
+
+    A planner failure (`end` with its error response) overrides the data's
+    `end=False`.
+    """
+    return {**data_update, **plan_update}
+
+
+async def _cancel(task: "asyncio.Future[Any]") -> None:
+    """Cancel a task and wait for it, retrieving its exception if any."""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def create_mcp_planner_node(
+    mcp_node: Node, planner_node: Node
+) -> RunnableLambda[AgentState, dict[str, Any]]:
+    """Create a node running the mcp and planner nodes concurrently.
+
+    The node runs with both `invoke` and `ainvoke`.
+    """
+
+    def mcp_planner_node(state: AgentState, config: RunnableConfig) -> dict[str, Any]:
+        executor = ContextThreadPoolExecutor(max_workers=1)
+        planning = executor.submit(planner_node.invoke, state, config)
+        executor.shutdown(wait=False)
+        try:
+            data_update = mcp_node.invoke(state, config)
+        except BaseException:
+            planning.cancel()
+            raise
+        if data_update.get("end"):
+            # A planner call already running can't be interrupted, only discarded
+            planning.cancel()
+            logging.info("No account data, planning discarded.")
+            return data_update
+        return _merge(data_update, planning.result())
+
+    async def amcp_planner_node(
+        state: AgentState, config: RunnableConfig
+    ) -> dict[str, Any]:
+        planning = asyncio.ensure_future(planner_node.ainvoke(state, config))
+        try:
+            data_update = await mcp_node.ainvoke(state, config)
+            if data_update.get("end"):
+                await _cancel(planning)
+                logging.info("No account data, planning cancelled.")
+                return data_update
+            return _merge(data_update, await planning)
+        except BaseException:
+            await _cancel(planning)
+            raise
+
+    return RunnableLambda(mcp_planner_node, afunc=amcp_planner_node, name="mcp_planner")
@@ -1,82 +1,111 @@
+import asyncio
+import logging
+import time
 from collections.abc import Callable
 from typing import Any
 
+import numpy as np
+from langchain_core.runnables import RunnableLambda
+
 from agent.config import AgentState, Call, Email, PlanSeries, ToolCall
+from agent.context import build_context
+from agent.indexes import CALL, EMAIL, AccountIndex, Mask, date_bounds
+from agent.nodes.mcp import (
+    aexecute_plans_remote,
+    aload_account,
+    execute_plans_remote,
+    load_account,
+)
+from agent.nodes.templated_answer import template_answer
+from agent.parallel import choose_mode, map_branches
+from agent.plan_optimizer import PlanNode, optimize_plans
 
 # Tool implementations
+# Each tool takes the account index and the mask of the interactions selected
+# so far, and returns the mask of the interactions it keeps (or a count).
 
 
-def filter_by_topics(
-    calls: list[Call], emails: list[Email], topics: list[str]
-) -> list[Call | Email]:
+def filter_by_topics(index: AccountIndex, mask: Mask, topics: list[str]) -> Mask:
     """Filter interactions by topics."""
-    topics_set = set(topics)
-    return [item for item in (calls + emails) if topics_set.intersection(item.topics)]
+    return mask & index.topic_mask(topics)
 
 
 def filter_by_date(
-    calls: list[Call], emails: list[Email], operator: str, date: str
-) -> list[Call | Email]:
+    index: AccountIndex,
+    mask: Mask,
+    operator: str,
+    date: str | None = None,
+    end_date: str | None = None,
+    days: str | int | None = None,
+) -> Mask:
     """Filter interactions by date with given operator."""
-    if operator not in {"=", "<", ">"}:
-        raise ValueError(f"Invalid operator: {operator}")
-
-    if operator == "=":
-        return [i for i in (calls + emails) if i.date == date]
-
-    if operator == "<":
-        return [i for i in (calls + emails) if i.date < date]
+    first, last = date_bounds(operator, date, end_date, days)
+    return mask & index.date_range(first, last)
 
-    if operator == ">":
-        return [i for i in (calls + emails) if i.date > date]
-    return calls + emails
 
-
-def take_last_element(calls: list[Call], emails: list[Email]) -> list[Call | Email]:
+def take_last_element(index: AccountIndex, mask: Mask) -> Mask:
     """Take the last interaction."""
-    result = []
-    if calls:
-        result.append(calls[-1])
-    if emails:
-        result.append(emails[-1])
+    result = np.zeros(len(index), dtype=bool)
+    for type_code in (CALL, EMAIL):
+        row = index.last_row(type_code, mask)
+        if row is not None:
+            result[row] = True
     return result
 
 
-def filter_by_keywords(
-    calls: list[Call], emails: list[Email], keywords: list[str]
-) -> list[Call | Email]:
+def filter_by_keywords(index: AccountIndex, mask: Mask, keywords: list[str]) -> Mask:
     """Filter interactions by keywords."""
-    keywords_set = set(keywords)
-    return [
-        item
-        for item in (calls + emails)
-        if any(keyword.lower() in item.content.lower() for keyword in keywords_set)
-    ]
+    return index.keyword_mask(keywords, within=mask)
+
+
+def semantic_search(
+    index: AccountIndex, mask: Mask, query: str | list[str], k: str | int = 10
+) -> Mask:
+    """Keep the k interactions most similar to the query."""
+    if isinstance(query, list):
+        query = " ".join(query)
+    try:
+        k = int(k)
+    except ValueError as e:
+        raise ValueError(f"Invalid number of results: {k}") from e
+    return index.semantic_mask(query, max(k, 0), within=mask)
+
+
+def compute_len(index: AccountIndex, mask: Mask) -> int:
+    """Count the interactions."""
+    return int(np.count_nonzero(mask))
 
 
-TOOL_REGISTRY: dict[str, Callable[..., list[Call | Email] | int]] = {
+TOOL_REGISTRY: dict[str, Callable[..., Mask | int]] = {
     "filter_by_topics": filter_by_topics,
     "filter_by_date": filter_by_date,
     "take_last_element": take_last_element,
     "filter_by_keywords": filter_by_keywords,
+    "compute_len": compute_len,
+    "semantic_search": semantic_search,
 }
 
+# Tools the MCP server doesn't implement, plans using them run locally
+LOCAL_ONLY_TOOLS = {"semantic_search"}
 
-def execute_plan_series(
-    calls: list[Call], emails: list[Email], plan_series: list[ToolCall]
-) -> list[Call | Email] | int:
+
+def uses_local_only_tools(plans: list[PlanSeries]) -> bool:
+    """Whether any of the plans needs a tool the MCP server can't run."""
+    return any(step.tool in LOCAL_ONLY_TOOLS for plan in plans for step in plan.steps)
+
+
+def execute_plan_series(index: AccountIndex, plan_series: list[ToolCall]) -> Mask | int:
     """Execute a series of tool calls forming a plan.
 
     Args:
-        calls: List of Call objects
-        emails: List of Email objects
+        index: Columnar view of the account's calls and emails
         plan_series: List of tool call dictionaries
 
     Returns:
-        The result of executing the plan series, either a list of interactions or an integer.
+        The result of executing the plan series, either the mask of the selected
+        interactions or an integer.
     """
-    current_calls = calls
-    current_emails = emails
+    mask = index.all()
 
     for tool_call in plan_series:
         tool_name = tool_call.tool
@@ -87,58 +116,181 @@ def execute_plan_series(
             raise ValueError(f"Tool {tool_name} not found in registry.")
 
         if tool_name == "compute_len":
-            return tool_func(current_calls, current_emails)
-        else:
-            result = tool_func(current_calls, current_emails, **params or {})
-            # Update current calls and emails based on the result
-            current_calls = [item for item in result if item.interaction_type == "call"]  # type: ignore[union-attr]
-            current_emails = [
-                item
-                for item in result  # type: ignore[union-attr]
-                if item.interaction_type == "email"
-            ]
-
-    return current_calls + current_emails
-
-
-def build_context(plan: PlanSeries, plan_result: list[Call | Email] | int) -> str:
-    """Build context string from interactions."""
-    if not isinstance(plan_result, list):
-        return f"{plan.title}: \n   {plan_result}"
-    context_parts = []
-    for item in plan_result:
-        context_parts.append(
-            f"   {item.interaction_type} Date: {item.date}\nContent: {item.content}\n"
-        )
-    return f"{plan.title}\n{'\n'.join(context_parts)}"
-
-
-def create_plan_executer_node() -> Callable[[AgentState], dict[str, Any]]:
-    """Execute the plans to construct the final context using multiprocessing."""
+            return tool_func(index, mask)
+        mask = tool_func(index, mask, **params or {})  # type: ignore[assignment]
 
-    def plan_executer_node(state: AgentState) -> dict[str, Any]:
-        calls = state.get("calls", [])
-        emails = state.get("emails", [])
-        plans = state.get("plans", [])
-        all_results = []
+    return mask
 
-        if not plans:
-            return {
-                "context": build_context(
-                    PlanSeries(steps=[], title="All Interactions"), calls + emails
-                )
-            }
 
-        def run_plan(plan: PlanSeries) -> str:
-            plan_series = plan.steps
-            plan_result = execute_plan_series(calls, emails, plan_series)
-            return build_context(plan, plan_result)
+def evaluate_branch(
+    index: AccountIndex, node: PlanNode, mask: Mask | None = None
+) -> tuple[dict[int, Mask | int], int]:
+    """Evaluate a node of a plan tree and everything below it.
 
-        # dont use multiprocessing
-        for plan in plans:
-            result = run_plan(plan)
-            all_results.append(result)
+    Args:
+        index: Columnar view of the account's calls and emails
+        node: The node to evaluate, its step must not be None
+        mask: Interactions selected by the parent node (default: all)
 
-        return {"context": "\n".join(all_results)}
+    Returns:
+        The results of the plans ending in this branch, by plan index, and the
+        number of steps evaluated.
+    """
+    step = node.step
+    assert step is not None  # Only the root has no step
+    tool_func = TOOL_REGISTRY.get(step.tool)
+    if not tool_func:
+        raise ValueError(f"Tool {step.tool} not found in registry.")
+    if mask is None:
+        mask = index.all()
+
+    start = time.perf_counter()
+    result = tool_func(index, mask, **step.params or {})
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    rows = result if isinstance(result, int) else np.count_nonzero(result)
+    logging.info(
+        f"Plan step {step.tool} {step.params or {}}: "
+        f"{np.count_nonzero(mask)} -> {rows} rows in {elapsed_ms:.2f} ms"
+    )
+
+    results = dict.fromkeys(node.plan_ids, result)
+    evaluated = 1
+    if not isinstance(result, int):
+        for child in node.children.values():
+            child_results, child_evaluated = evaluate_branch(index, child, result)
+            results.update(child_results)
+            evaluated += child_evaluated
+    return results, evaluated
+
+
+def execute_plans(index: AccountIndex, plans: list[PlanSeries]) -> list[Mask | int]:
+    """Execute the plans of a request, sharing their common steps.
+
+    The plans are rewritten and merged into a prefix tree by
+    `optimize_plans`, then each node of the tree is evaluated once. The
+    branches below the root are independent, they run serially or in
+    parallel as chosen by `choose_mode`.
 
-    return plan_executer_node
+    Args:
+        index: Columnar view of the account's calls and emails
+        plans: The plans to execute
+
+    Returns:
+        The result of each plan, in order, either the mask of the selected
+        interactions or an integer.
+    """
+    root = optimize_plans(plans, index)
+    branches = list(root.children.values())
+    mode = choose_mode(len(index), len(branches))
+
+    start = time.perf_counter()
+    results: dict[int, Mask | int] = dict.fromkeys(root.plan_ids, index.all())
+    evaluated = 0
+    for branch_results, branch_evaluated in map_branches(
+        evaluate_branch, index, branches, mode
+    ):
+        results.update(branch_results)
+        evaluated += branch_evaluated
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    logging.info(
+        f"Executed {len(plans)} plans "
+        f"({sum(len(plan.steps) for plan in plans)} steps) in {evaluated} steps, "
+        f"{mode}, {elapsed_ms:.2f} ms"
+    )
+    return [results[plan_id] for plan_id in range(len(plans))]
+
+
+def execute_plans_locally(
+    index: AccountIndex | None,
+    calls: list[Call],
+    emails: list[Email],
+    plans: list[PlanSeries],
+) -> list[list[Call | Email] | int]:
+    """Execute plans on the account index, built from calls/emails if None."""
+    if index is None:
+        index = AccountIndex(calls, emails)
+    return [
+        # Interactions are only materialized for the context
+        result if isinstance(result, int) else index.select(result)
+        for result in execute_plans(index, plans)
+    ]
+
+
+def create_plan_executer_node() -> RunnableLambda[AgentState, dict[str, Any]]:
+    """Execute the plans to construct the final context, in parallel if worth it.
+
+    When the results determine the answer (`template_answer`), it is also set
+    as `templated_answer`, so the LLM can be skipped.
+
+    The node runs with both `invoke` and `ainvoke`.
+    """
+
+    def state_plans(state: AgentState) -> list[PlanSeries]:
+        # Without plans, all data is used without filtering
+        return state.get("plans") or [PlanSeries(steps=[], title="All Interactions")]
+
+    def context_update(
+        state: AgentState,
+        plans: list[PlanSeries],
+        plan_results: list[list[Call | Email] | int],
+    ) -> dict[str, Any]:
+        return {
+            "context": build_context(state["user_query"], plans, plan_results),
+            "templated_answer": template_answer(
+                state["user_query"], plans, plan_results
+            ),
+        }
+
+    def plan_executer_node(state: AgentState) -> dict[str, Any]:
+        calls = state.get("calls", [])
+        emails = state.get("emails", [])
+        index = state.get("index")
+        plans = state_plans(state)
+
+        plan_results = None
+        if state.get("pushdown"):
+            if uses_local_only_tools(plans):
+                logging.info("Plans use local-only tools, executing them locally.")
+            else:
+                plan_results = execute_plans_remote(state["account_id"], plans)
+                if plan_results is None:
+                    logging.info("Falling back to local plan execution.")
+            if plan_results is None:
+                data = load_account(state["account_id"])
+                if data is not None:
+                    calls, emails, index = data.calls, data.emails, data.index
+
+        if plan_results is None:
+            plan_results = execute_plans_locally(index, calls, emails, plans)
+        return context_update(state, plans, plan_results)
+
+    async def aplan_executer_node(state: AgentState) -> dict[str, Any]:
+        calls = state.get("calls", [])
+        emails = state.get("emails", [])
+        index = state.get("index")
+        plans = state_plans(state)
+
+        plan_results = None
+        if state.get("pushdown"):
+            if uses_local_only_tools(plans):
+                logging.info("Plans use local-only tools, executing them locally.")
+            else:
+                plan_results = await aexecute_plans_remote(state["account_id"], plans)
+                if plan_results is None:
+                    logging.info("Falling back to local plan execution.")
+            if plan_results is None:
+                data = await aload_account(state["account_id"])
+                if data is not None:
+                    calls, emails, index = data.calls, data.emails, data.index
+
+        if plan_results is None:
+            # CPU bound, keep it off the event loop
+            plan_results = await asyncio.to_thread(
+                execute_plans_locally, index, calls, emails, plans
+            )
+        return context_update(state, plans, plan_results)
+
+    return RunnableLambda(
+        plan_executer_node, afunc=aplan_executer_node, name="plan_executer"
+    )
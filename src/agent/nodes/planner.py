@@ -1,11 +1,26 @@
 import logging
-from collections.abc import Callable
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
 from typing import Any
 
 from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableLambda
 
-from agent.config import AgentState, PlannerOutput
-from agent.llm_utils import safe_run_llm
+from agent.config import (
+    PLAN_CACHE_BACKEND,
+    PLAN_CACHE_MAX_ENTRIES,
+    PLAN_CACHE_PATH,
+    PLAN_CACHE_TTL_SECONDS,
+    PLANNER_RULES,
+    AgentState,
+    PlannerOutput,
+)
+from agent.llm_utils import safe_arun_llm, safe_run_llm
+from agent.plan_cache import create_plan_cache
+from agent.rule_planner import plan_question
+from agent.singleflight import SingleFlight
 
 ALLOWED_TOPICS = [
     "Budget",
@@ -30,10 +45,11 @@ PARALLEL tool plans.
 
 Available tools:
 - tool 1: 'filter_by_topics'. params: ('topics': list[str]). The list contains only topics from the allowed topic list. the parameter topics must be a valid list of str
-- tool 2: 'filter_by_date'. params: ('operator': Literal["=", "<", ">"], 'date': str). date parameter must be in ISO format YYYY-MM-DD.
+- tool 2: 'filter_by_date'. params: ('operator': Literal["=", "<", ">", "between", "last_n_days"], 'date': str, 'end_date': str, 'days': int). date parameters must be in ISO format YYYY-MM-DD. "=", "<", ">" compare to 'date'. "between" keeps 'date' to 'end_date', both included. "last_n_days" keeps the last 'days' days, 'date' is optional and defaults to today.
 - tool 3: 'take_last_element'. params: ()
 - tool 4. 'filter_by_keywords'. params: ('keywords': list[str]). the parameter keywords must be a valid list of str
 - tool 5: 'compute_len'. params: (). If this tool is used, it must be the last step in the plan.
+- tool 6: 'semantic_search'. params: ('query': str, 'k': int). Keeps the 'k' interactions (default 10) most similar to 'query', for questions about a subject that may be worded in many ways. Filters before it restrict the search.
 
 Rules:
 - You ONLY output structured JSON following the provided schema.
@@ -57,6 +73,8 @@ Interpretation rules:
 - problems/issues → Pain Points
 - before DATE → filter_by_date "<"
 - after DATE → filter_by_date ">"
+- between DATE and DATE, during a month/quarter/year → filter_by_date "between"
+- in the last N days/weeks/months → filter_by_date "last_n_days" with 'days'
 
 Output format:
 {{
@@ -67,21 +85,128 @@ Output format:
 """
 
 
-def create_planner_node(llm: BaseChatModel) -> Callable[[AgentState], dict[str, Any]]:
-    """Create a planner node that generates tool plans based on the user question."""
+# Concurrent requests with the same question share one planner LLM call
+planner_calls: SingleFlight[str, tuple[Any, bool]] = SingleFlight("planner")
 
-    def planner_node(state: AgentState) -> dict[str, Any]:
-        if state["baseline"]:
-            # For baseline, return empty plans, meaning all data will be fetched without filtering
-            return {"plans": []}
-        question = state["user_query"]
+# Plans of already asked questions, None if disabled
+plan_cache = create_plan_cache(
+    PLAN_CACHE_BACKEND,
+    path=PLAN_CACHE_PATH,
+    max_entries=PLAN_CACHE_MAX_ENTRIES,
+    ttl=PLAN_CACHE_TTL_SECONDS,
+    prompt=PLANNER_SYSTEM_PROMPT,
+)
+
+
+@dataclass
+class PlannerPaths:
+    """How the questions were planned and the LLM latency that was saved."""
+
+    counts: Counter[str] = field(default_factory=Counter)
+    # Moving average of the successful LLM planning latency
+    llm_seconds: float = 0.0
+    saved_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, path: str, seconds: float, update: dict[str, Any]) -> None:
+        """Count a planned question and log its path and saved latency."""
+        with self._lock:
+            self.counts[path] += 1
+            if path == "llm":
+                if "plans" in update:
+                    self.llm_seconds = (
+                        seconds
+                        if not self.llm_seconds
+                        else 0.8 * self.llm_seconds + 0.2 * seconds
+                    )
+                saved = 0.0
+            else:
+                saved = max(self.llm_seconds - seconds, 0.0)
+                self.saved_seconds += saved
+        logging.info(
+            f"Planner path: {path} in {seconds * 1000:.1f} ms"
+            f" (~{saved * 1000:.0f} ms saved vs. LLM planning)"
+        )
+
+    def stats(self) -> dict[str, int | float]:
+        """Return the number of questions per path and the latency saved."""
+        with self._lock:
+            return {
+                **{path: self.counts[path] for path in ("rules", "cache", "llm")},
+                "llm_avg_ms": round(self.llm_seconds * 1000, 1),
+                "saved_ms": round(self.saved_seconds * 1000, 1),
+            }
+
+
+planner_paths = PlannerPaths()
+
+
+def create_planner_node(
+    llm: BaseChatModel,
+) -> RunnableLambda[AgentState, dict[str, Any]]:
+    """Create a planner node that generates tool plans based on the user question.
+
+    Questions matching the interpretation rules are planned locally
+    (`rule_planner.py`), plans of already planned questions are reused from
+    `plan_cache`, and the LLM plans the others. The path taken and the
+    latency it saved are logged and counted in `planner_paths`.
+
+    The node runs with both `invoke` and `ainvoke`.
+    """
+
+    def planner_messages(question: str) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": PLANNER_SYSTEM_PROMPT},
+            {"role": "user", "content": question},
+        ]
+
+    def rules_update(question: str) -> tuple[str, dict[str, Any]] | None:
+        if PLANNER_RULES == "on":
+            planned = plan_question(question)
+            if planned is not None:
+                return "rules", {"plans": planned.plans}
+        return None
+
+    def local_update(question: str) -> tuple[str, dict[str, Any]] | None:
+        """Plans without an LLM call and the path that made them, if any."""
+        ruled = rules_update(question)
+        if ruled is not None:
+            return ruled
+        cached = plan_cache.get(question) if plan_cache is not None else None
+        if cached is not None:
+            return "cache", {"plans": cached.plans}
+        return None
+
+    async def alocal_update(question: str) -> tuple[str, dict[str, Any]] | None:
+        """Async `local_update`, keeping plan cache I/O off the event loop."""
+        ruled = rules_update(question)
+        if ruled is not None:
+            return ruled
+        cached = await plan_cache.aget(question) if plan_cache is not None else None
+        if cached is not None:
+            return "cache", {"plans": cached.plans}
+        return None
+
+    def cache_plans(question: str, response: Any, llm_success: bool) -> None:
+        if llm_success and plan_cache is not None:
+            plan_cache.put(question, response)
+
+    def run_planner(question: str) -> tuple[Any, bool]:
         response, llm_success = safe_run_llm(
-            llm.with_structured_output(PlannerOutput),
-            [
-                {"role": "system", "content": PLANNER_SYSTEM_PROMPT},
-                {"role": "user", "content": question},
-            ],
+            llm.with_structured_output(PlannerOutput), planner_messages(question)
         )
+        cache_plans(question, response, llm_success)
+        return response, llm_success
+
+    async def arun_planner(question: str) -> tuple[Any, bool]:
+        response, llm_success = await safe_arun_llm(
+            llm.with_structured_output(PlannerOutput), planner_messages(question)
+        )
+        if llm_success and plan_cache is not None:
+            await plan_cache.aput(question, response)
+        return response, llm_success
+
+    def planner_update(response: Any, llm_success: bool) -> dict[str, Any]:
         if not llm_success:
             # If LLM failed, return an error response and end the agent workflow
             logging.info("Planner LLM failed to generate plans.")
@@ -91,4 +216,35 @@ def create_planner_node(llm: BaseChatModel) -> Callable[[AgentState], dict[str,
             }
         return {"plans": response.plans}
 
-    return planner_node
+    def plan(state: AgentState) -> dict[str, Any]:
+        if state["baseline"]:
+            # For baseline, return empty plans, meaning all data will be fetched without filtering
+            return {"plans": []}
+        question = state["user_query"]
+        start = time.perf_counter()
+        path, update = local_update(question) or (
+            "llm",
+            planner_update(*planner_calls.do(question, lambda: run_planner(question))),
+        )
+        planner_paths.record(path, time.perf_counter() - start, update)
+        return update
+
+    async def aplan(state: AgentState) -> dict[str, Any]:
+        if state["baseline"]:
+            return {"plans": []}
+        question = state["user_query"]
+        start = time.perf_counter()
+        local = await alocal_update(question)
+        if local is not None:
+            path, update = local
+        else:
+            path, update = (
+                "llm",
+                planner_update(
+                    *await planner_calls.ado(question, lambda: arun_planner(question))
+                ),
+            )
+        planner_paths.record(path, time.perf_counter() - start, update)
+        return update
+
+    return RunnableLambda(plan, afunc=aplan, name="planner")
@@ -0,0 +1,90 @@
+"""Templated Answer Node.
+
+When every plan ends in `compute_len` or `take_last_element`, the answer is
+fully determined by the plan results: counts, or the latest interaction. If
+that interaction is short and the only one of its plan, and the question
+doesn't ask for a type of interaction (no tool filters by type, so counts are
+of all interactions and the latest call and email both come back),
+`plan_executer` fills the answer in from a template and the graph routes here
+instead of to `final_answer`, skipping the LLM round-trip. A streaming node
+emits the answer on the graph's "custom" stream, like a cached final answer.
+"""
+
+import re
+from typing import Any
+
+from langchain_core.runnables import RunnableLambda
+
+from agent.config import (
+    TEMPLATED_ANSWER_MAX_CHARS,
+    TEMPLATED_ANSWERS,
+    AgentState,
+    Call,
+    Email,
+    PlanSeries,
+)
+from agent.nodes.final_answer import replay_answer
+
+# Last steps whose results can be templated
+TEMPLATED_TOOLS = {"compute_len", "take_last_element"}
+
+# Words asking for one type of interaction
+_TYPE_PATTERN = re.compile(r"\b(?:calls?|e-?mails?)\b", re.IGNORECASE)
+
+
+def _templated_result(plan: PlanSeries, result: list[Call | Email] | int) -> str:
+    if isinstance(result, int):
+        return f"{plan.title}: {result}"
+    if not result:
+        return f"{plan.title}: no matching interactions."
+    lines = [
+        f"- {item.interaction_type.capitalize()} on {item.date}: {item.content}"
+        for item in result
+    ]
+    return "\n".join([f"{plan.title}:", *lines])
+
+
+def template_answer(
+    question: str, plans: list[PlanSeries], plan_results: list[list[Call | Email] | int]
+) -> str | None:
+    """Answer from the plan results without the LLM.
+
+    Returns:
+        The answer, None if templated answers are off, if the question names
+        a type of interaction, if a plan doesn't end in a templated tool or
+        if a plan returns several interactions or a too long one.
+    """
+    if TEMPLATED_ANSWERS != "on" or not plans or _TYPE_PATTERN.search(question):
+        return None
+    for plan, result in zip(plans, plan_results, strict=True):
+        if not plan.steps or plan.steps[-1].tool not in TEMPLATED_TOOLS:
+            return None
+        if isinstance(result, int):
+            continue
+        if len(result) > 1 or any(
+            len(item.content) > TEMPLATED_ANSWER_MAX_CHARS for item in result
+        ):
+            return None
+    return "\n\n".join(
+        _templated_result(plan, result)
+        for plan, result in zip(plans, plan_results, strict=True)
+    )
+
+
+def create_templated_answer_node(
+    streaming: bool,
+) -> RunnableLambda[AgentState, dict[str, Any]]:
+    """Create the templated answer node, runnable with both `invoke` and `ainvoke`."""
+
+    def templated_answer_node(state: AgentState) -> dict[str, Any]:
+        response = state.get("templated_answer") or ""
+        if streaming:
+            replay_answer(response)
+        return {"final_response": response}
+
+    async def atemplated_answer_node(state: AgentState) -> dict[str, Any]:
+        return templated_answer_node(state)
+
+    return RunnableLambda(
+        templated_answer_node, afunc=atemplated_answer_node, name="templated_answer"
+    )
@@ -0,0 +1,253 @@
+"""Parallel Plan Execution.
+
+Runs independent branches of a plan tree concurrently:
+- threads share the account index in memory, which is enough when the tools
+  spend their time in NumPy;
+- processes attach to the index columns and keyword postings exported once to
+  shared memory, for accounts large enough that Python-level keyword
+  verification dominates.
+"""
+
+import logging
+import multiprocessing
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Literal
+
+import numpy as np
+import numpy.typing as npt
+
+from agent.config import (
+    PLAN_EXECUTION_MODE,
+    PLAN_PROCESSES_MIN_INTERACTIONS,
+    PLAN_THREADS_MIN_INTERACTIONS,
+    PLAN_WORKERS,
+)
+from agent.indexes import TOPIC_VOCABULARY, AccountIndex, KeywordIndex
+
+ExecutionMode = Literal["serial", "threads", "processes"]
+
+# Accounts kept attached by each worker process
+_MAX_ATTACHED_ACCOUNTS = 4
+
+
+def choose_mode(n_interactions: int, n_branches: int) -> ExecutionMode:
+    """Pick how to run the branches of a plan tree.
+
+    Args:
+        n_interactions: Number of interactions of the account
+        n_branches: Number of independent branches of the plan tree
+
+    Returns:
+        The configured mode, or in "auto" mode: serial for a single branch or a
+        small account, threads for a medium one and processes for a large one,
+        where the thresholds are set (serial otherwise).
+    """
+    if PLAN_EXECUTION_MODE in {"serial", "threads", "processes"}:
+        return PLAN_EXECUTION_MODE  # type: ignore[return-value]
+    if n_branches < 2 or PLAN_WORKERS < 2:
+        return "serial"
+    if 0 < PLAN_PROCESSES_MIN_INTERACTIONS <= n_interactions:
+        return "processes"
+    if 0 < PLAN_THREADS_MIN_INTERACTIONS <= n_interactions:
+        return "threads"
+    return "serial"
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """Location of a NumPy array in a shared memory block."""
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+@dataclass(frozen=True)
+class SharedStrings:
+    """Strings encoded in UTF-8 and concatenated in a shared memory block."""
+
+    data: SharedArray
+    # Offset of each string in `data`, plus the end of the last one
+    offsets: SharedArray
+
+
+@dataclass(frozen=True)
+class SharedColumns:
+    """The columns and keyword index of an account index in shared memory."""
+
+    dates: SharedArray
+    types: SharedArray
+    topic_masks: SharedArray
+    texts: SharedStrings
+    # Tokens of the keyword index and their concatenated posting lists
+    tokens: SharedStrings
+    postings: SharedArray
+    posting_offsets: SharedArray
+    topic_names: list[str]
+
+
+def _share(array: npt.NDArray[Any], blocks: list[SharedMemory]) -> SharedArray:
+    block = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    blocks.append(block)
+    return SharedArray(block.name, array.shape, array.dtype.str)
+
+
+def _offsets(lengths: Sequence[int]) -> npt.NDArray[np.int64]:
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _share_strings(strings: Sequence[str], blocks: list[SharedMemory]) -> SharedStrings:
+    encoded = [string.encode() for string in strings]
+    return SharedStrings(
+        data=_share(np.frombuffer(b"".join(encoded), np.uint8), blocks),
+        offsets=_share(_offsets([len(data) for data in encoded]), blocks),
+    )
+
+
+def _release(blocks: list[SharedMemory]) -> None:
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+_exports: "weakref.WeakKeyDictionary[AccountIndex, SharedColumns]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def export_index(index: AccountIndex) -> SharedColumns:
+    """Copy the columns of an index to shared memory, once per index.
+
+    The blocks are unlinked when the index is garbage collected.
+    """
+    columns = _exports.get(index)
+    if columns is None:
+        postings = index.keywords.postings
+        blocks: list[SharedMemory] = []
+        columns = SharedColumns(
+            dates=_share(index.dates, blocks),
+            types=_share(index.types, blocks),
+            topic_masks=_share(index.topic_masks, blocks),
+            texts=_share_strings(index.keywords.texts, blocks),
+            tokens=_share_strings(list(postings), blocks),
+            postings=_share(
+                np.concatenate([np.zeros(0, np.int32), *postings.values()]), blocks
+            ),
+            posting_offsets=_share(
+                _offsets([len(doc_ids) for doc_ids in postings.values()]), blocks
+            ),
+            topic_names=list(index.vocabulary.names),
+        )
+        weakref.finalize(index, _release, blocks)
+        _exports[index] = columns
+    return columns
+
+
+# Indexes attached by a worker process, by name of their dates block
+_attached: OrderedDict[str, tuple[AccountIndex, list[SharedMemory]]] = OrderedDict()
+
+
+def _attach(columns: SharedColumns) -> AccountIndex:
+    """Return the index of exported columns, attaching to them if needed."""
+    key = columns.dates.name
+    if key in _attached:
+        _attached.move_to_end(key)
+        return _attached[key][0]
+
+    blocks: list[SharedMemory] = []
+
+    def view(shared: SharedArray) -> npt.NDArray[Any]:
+        block = SharedMemory(name=shared.name)
+        blocks.append(block)
+        return np.ndarray(shared.shape, np.dtype(shared.dtype), buffer=block.buf)
+
+    def strings(shared: SharedStrings) -> list[str]:
+        data, offsets = view(shared.data), view(shared.offsets)
+        return [
+            bytes(data[start:end]).decode()
+            for start, end in zip(offsets[:-1], offsets[1:], strict=True)
+        ]
+
+    postings, offsets = view(columns.postings), view(columns.posting_offsets)
+    keywords = KeywordIndex.from_postings(
+        strings(columns.texts),
+        {
+            token: postings[start:end]
+            for token, start, end in zip(
+                strings(columns.tokens), offsets[:-1], offsets[1:], strict=True
+            )
+        },
+    )
+    # Interning in the same order gives the same topic IDs as the parent
+    for name in columns.topic_names:
+        TOPIC_VOCABULARY.intern(name)
+    index = AccountIndex.from_columns(
+        view(columns.dates), view(columns.types), view(columns.topic_masks), keywords
+    )
+
+    _attached[key] = (index, blocks)
+    while len(_attached) > _MAX_ATTACHED_ACCOUNTS:
+        _, (evicted, old_blocks) = _attached.popitem(last=False)
+        # Views on the blocks must be gone before they can be closed
+        del evicted
+        for block in old_blocks:
+            block.close()
+    return index
+
+
+def _run_attached[B, R](
+    func: Callable[[AccountIndex, B], R], columns: SharedColumns, branch: B
+) -> R:
+    return func(_attach(columns), branch)
+
+
+def _init_worker() -> None:
+    logging.basicConfig(level=logging.INFO)
+
+
+_pools: dict[ExecutionMode, Executor] = {}
+
+
+def _pool(mode: ExecutionMode) -> Executor:
+    """Return the shared pool of a mode, created on first use."""
+    if mode not in _pools:
+        if mode == "processes":
+            _pools[mode] = ProcessPoolExecutor(
+                max_workers=PLAN_WORKERS,
+                # Not fork: the parent runs threads (event loops, pools)
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        else:
+            _pools[mode] = ThreadPoolExecutor(max_workers=PLAN_WORKERS)
+    return _pools[mode]
+
+
+def map_branches[B, R](
+    func: Callable[[AccountIndex, B], R],
+    index: AccountIndex,
+    branches: Sequence[B],
+    mode: ExecutionMode,
+) -> list[R]:
+    """Apply `func` to each branch with the index, serially or in parallel.
+
+    In "processes" mode `func` and the branches must be picklable, and `func`
+    receives an index without the `Call`/`Email` objects.
+    """
+    if mode == "serial" or len(branches) < 2:
+        return [func(index, branch) for branch in branches]
+    if mode == "threads":
+        return list(_pool(mode).map(lambda branch: func(index, branch), branches))
+    columns = export_index(index)
+    futures = [
+        _pool(mode).submit(_run_attached, func, columns, branch) for branch in branches
+    ]
+    return [future.result() for future in futures]
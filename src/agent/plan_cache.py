@@ -0,0 +1,254 @@
+"""Planner Result Cache.
+
+Plans depend only on the question, so the planner's output is cached by a
+normalized form of the question (case, whitespace and sentence punctuation
+folded, symbols such as "+" or "#" kept) and reused across accounts. Date
+literals are replaced by placeholders in both the key and the stored plans,
+so "before 2024-03-01" and "before March 5, 2024" share one entry whose plans
+are instantiated with each question's own dates.
+
+Plans with a date the key doesn't determine (e.g. "this quarter" resolved
+against today) are not cached.
+
+Entries are kept in memory (LRU + TTL) or in a SQLite file, which survives
+restarts and is shared by the workers of a deployment. Async code uses
+`aget`/`aput`, which keep the SQLite queries off the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Protocol
+
+from agent.cache import TTLCache
+from agent.config import PlannerOutput
+from agent.questions import normalize_question
+
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_YEAR = re.compile(r"\b\d{4}\b")
+
+
+def _template(output: PlannerOutput, key: str, dates: list[str]) -> str | None:
+    """Serialize plans with the question's dates replaced by placeholders.
+
+    Returns:
+        The template, None if a date in the plans doesn't come from the key:
+        neither a date literal of the question nor in a year written in it.
+    """
+    years = set(_YEAR.findall(key))
+    data = output.model_dump()
+    for plan in data["plans"]:
+        for step in plan["steps"]:
+            params = step.get("params") or {}
+            for name, value in params.items():
+                if not isinstance(value, str) or not ISO_DATE.match(value):
+                    continue
+                if value in dates:
+                    params[name] = f"<date{dates.index(value)}>"
+                elif value[:4] not in years:
+                    return None
+    return json.dumps(data)
+
+
+def _instantiate(template: str, dates: list[str]) -> PlannerOutput | None:
+    """Plans of a template with the question's dates, None if they don't fit."""
+    data = json.loads(template)
+    for plan in data["plans"]:
+        for step in plan["steps"]:
+            params = step.get("params") or {}
+            for name, value in params.items():
+                match = isinstance(value, str) and re.fullmatch(r"<date(\d+)>", value)
+                if not match:
+                    continue
+                if int(match.group(1)) >= len(dates):
+                    return None
+                params[name] = dates[int(match.group(1))]
+    return PlannerOutput.model_validate(data)
+
+
+class PlanStore(Protocol):
+    """Storage of plan templates by key."""
+
+    # Whether get/put do I/O, to run off the event loop
+    blocking: bool
+
+    def get(self, key: str) -> str | None:
+        """Return the template of a key if it has not expired."""
+        ...
+
+    def put(self, key: str, template: str) -> None:
+        """Store a template, evicting the least recently used over capacity."""
+        ...
+
+
+class MemoryPlanStore:
+    """Plan templates in an in-process LRU cache."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int, ttl: float):
+        # Each entry counts as 1, so the cache is capped at `max_entries`
+        self._cache: TTLCache[str, str] = TTLCache(max_bytes=max_entries, ttl=ttl)
+
+    def get(self, key: str) -> str | None:
+        """Return the template of a key if it has not expired."""
+        return self._cache.get(key)
+
+    def put(self, key: str, template: str) -> None:
+        """Store a template, evicting the least recently used over capacity."""
+        self._cache.put(key, template)
+
+
+class SQLitePlanStore:
+    """Plan templates in a SQLite file, shared by processes and restarts.
+
+    Uses wall-clock times, comparable between processes.
+    """
+
+    blocking = True
+
+    def __init__(self, path: Path, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            path, timeout=5, check_same_thread=False, isolation_level=None
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                " key TEXT PRIMARY KEY, template TEXT NOT NULL,"
+                " stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS plans_used_at ON plans (used_at)"
+            )
+
+    def get(self, key: str) -> str | None:
+        """Return the template of a key if it has not expired."""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT template FROM plans WHERE key = ? AND stored_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE plans SET used_at = ? WHERE key = ?", (now, key)
+            )
+        return row[0]  # type: ignore[no-any-return]
+
+    def put(self, key: str, template: str) -> None:
+        """Store a template, evicting the least recently used over capacity."""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?)",
+                (key, template, now, now),
+            )
+            self._connection.execute(
+                "DELETE FROM plans WHERE stored_at <= ? OR key IN ("
+                " SELECT key FROM plans ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (now - self.ttl, self.max_entries),
+            )
+
+
+class PlanCache:
+    """Planner outputs by normalized question.
+
+    Args:
+        store: Where the plan templates are kept
+        namespace: Prefix of the keys, e.g. a hash of the planner prompt, so
+            plans made by another prompt are not reused
+    """
+
+    def __init__(self, store: PlanStore, namespace: str = ""):
+        self.store = store
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.uncacheable = 0
+
+    def _key(self, question: str) -> tuple[str, list[str]]:
+        key, dates = normalize_question(question, keep_symbols=True)
+        return f"{self.namespace}:{key}", dates
+
+    def get(self, question: str) -> PlannerOutput | None:
+        """Return the cached plans of a question, instantiated with its dates."""
+        key, dates = self._key(question)
+        template = self.store.get(key)
+        output = _instantiate(template, dates) if template is not None else None
+        with self._lock:
+            if output is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if output is not None:
+            logging.info(f"Plan cache hit for {key!r}")
+        return output
+
+    def put(self, question: str, output: PlannerOutput) -> None:
+        """Cache the plans of a question, unless they depend on more than it."""
+        key, dates = self._key(question)
+        template = _template(output, key, dates)
+        with self._lock:
+            if template is None:
+                self.uncacheable += 1
+            else:
+                self.stores += 1
+        if template is None:
+            logging.info(f"Plans for {key!r} depend on the current date, not cached")
+            return
+        self.store.put(key, template)
+
+    async def aget(self, question: str) -> PlannerOutput | None:
+        """Async version of `get`, in a thread if the store blocks."""
+        if self.store.blocking:
+            return await asyncio.to_thread(self.get, question)
+        return self.get(question)
+
+    async def aput(self, question: str, output: PlannerOutput) -> None:
+        """Async version of `put`, in a thread if the store blocks."""
+        if self.store.blocking:
+            await asyncio.to_thread(self.put, question, output)
+        else:
+            self.put(question, output)
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "uncacheable": self.uncacheable,
+            }
+
+
+def create_plan_cache(
+    backend: str, path: str, max_entries: int, ttl: float, prompt: str
+) -> PlanCache | None:
+    """Create the plan cache of a backend ("memory", "sqlite"), None if "off".
+
+    The keys are namespaced by a hash of the planner prompt.
+    """
+    store: PlanStore
+    if backend == "sqlite":
+        store = SQLitePlanStore(Path(path), max_entries=max_entries, ttl=ttl)
+    elif backend == "memory":
+        store = MemoryPlanStore(max_entries=max_entries, ttl=ttl)
+    else:
+        return None
+    namespace = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+    return PlanCache(store, namespace=namespace)
@@ -0,0 +1,152 @@
+"""Plan Optimizer.
+
+Rewrites the plans of a request before they are executed on an account index:
+- filters between two `take_last_element`/`compute_len`/`semantic_search`
+  steps commute (each one only intersects the selection), so duplicates are
+  dropped, date filters are fused into a single range and the rest are
+  reordered: steps shared by more plans first, then the cheapest tools, then
+  the most selective filters;
+- the rewritten plans are merged into a prefix tree, so a prefix shared by
+  several plans is evaluated once.
+"""
+
+import datetime
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+
+from agent.config import PlanSeries, ToolCall
+from agent.indexes import MAX_DATE_ORDINAL, AccountIndex, date_bounds
+
+# Steps that don't commute with the filters around them
+BARRIER_TOOLS = {"take_last_element", "compute_len", "semantic_search"}
+
+# Relative cost of the filters on an account index
+TOOL_COSTS = {
+    "filter_by_date": 0,  # binary search
+    "filter_by_topics": 1,  # bitmap scan
+    "filter_by_keywords": 2,  # text verification
+}
+
+
+@dataclass
+class PlanNode:
+    """A step of the prefix tree, shared by all the plans going through it."""
+
+    step: ToolCall | None
+    children: dict[str, "PlanNode"] = field(default_factory=dict)
+    # Indices of the plans whose result is the output of this node
+    plan_ids: list[int] = field(default_factory=list)
+
+
+def step_key(step: ToolCall) -> str:
+    """Canonical key of a step, equal for steps with the same effect."""
+    return f"{step.tool}:{json.dumps(step.params or {}, sort_keys=True)}"
+
+
+def _fuse_dates(steps: list[ToolCall]) -> list[ToolCall]:
+    """Replace the date filters of a run of filters by one range filter."""
+    dates = [step for step in steps if step.tool == "filter_by_date"]
+    if len(dates) < 2:
+        return steps
+    first, last = 0, MAX_DATE_ORDINAL
+    for step in dates:
+        step_first, step_last = date_bounds(**step.params or {})  # type: ignore[arg-type]
+        first, last = max(first, step_first), min(last, step_last)
+    if first > last:
+        # Nothing can match, an inverted range keeps no interaction
+        first, last = 2, 1
+    others = [step for step in steps if step.tool != "filter_by_date"]
+    if first == 0 and last == MAX_DATE_ORDINAL:
+        return others
+    params: dict[str, str | int | list[str]]
+    if first == 0:
+        params = {
+            "operator": "<",
+            "date": datetime.date.fromordinal(last + 1).isoformat(),
+        }
+    else:
+        params = {
+            "operator": "between",
+            "date": datetime.date.fromordinal(first).isoformat(),
+            "end_date": datetime.date.fromordinal(last).isoformat(),
+        }
+    return [ToolCall(tool="filter_by_date", params=params), *others]
+
+
+def _normalize(steps: list[ToolCall]) -> list[list[ToolCall]]:
+    """Split steps into runs of filters ended by a barrier step.
+
+    Steps after `compute_len` are dropped, duplicate filters within a run and
+    repeated `take_last_element` steps are removed and date filters fused.
+    """
+    segments: list[list[ToolCall]] = []
+    run: dict[str, ToolCall] = {}
+    for step in steps:
+        if step.tool not in BARRIER_TOOLS:
+            run.setdefault(step_key(step), step)
+            continue
+        if (
+            step.tool == "take_last_element"
+            and not run
+            and segments
+            and segments[-1][-1].tool == "take_last_element"
+        ):
+            # The latest of the latest interactions are themselves
+            continue
+        segments.append([*_fuse_dates(list(run.values())), step])
+        run = {}
+        if step.tool == "compute_len":
+            return segments
+    if run:
+        segments.append(_fuse_dates(list(run.values())))
+    return segments
+
+
+def _estimate(step: ToolCall, index: AccountIndex) -> int:
+    """Estimate the number of interactions a filter keeps, alone."""
+    params = step.params or {}
+    if step.tool == "filter_by_date":
+        return index.date_count(*date_bounds(**params))  # type: ignore[arg-type]
+    if step.tool == "filter_by_topics":
+        topics = params.get("topics")
+        if not isinstance(topics, list):
+            return len(index)
+        return sum(index.topic_frequencies.get(topic, 0) for topic in topics)
+    return len(index)
+
+
+def optimize_plans(plans: list[PlanSeries], index: AccountIndex) -> PlanNode:
+    """Rewrite the plans and merge them into a prefix tree.
+
+    Args:
+        plans: The plans of a request
+        index: Columnar view of the account, used to estimate selectivity
+
+    Returns:
+        The root of the prefix tree, its step is None and it selects every
+        interaction. A plan's index is listed on the node producing its result.
+    """
+    normalized = [_normalize(plan.steps) for plan in plans]
+    shared = Counter(
+        step_key(step)
+        for segments in normalized
+        for segment in segments
+        for step in segment
+    )
+
+    def order(step: ToolCall) -> tuple[int, int, int, str]:
+        key = step_key(step)
+        cost = TOOL_COSTS.get(step.tool, len(TOOL_COSTS))
+        return -shared[key], cost, _estimate(step, index), key
+
+    root = PlanNode(step=None)
+    for plan_id, segments in enumerate(normalized):
+        node = root
+        for segment in segments:
+            filters = [step for step in segment if step.tool not in BARRIER_TOOLS]
+            barriers = [step for step in segment if step.tool in BARRIER_TOOLS]
+            for step in [*sorted(filters, key=order), *barriers]:
+                node = node.children.setdefault(step_key(step), PlanNode(step=step))
+        node.plan_ids.append(plan_id)
+    return root
@@ -0,0 +1,124 @@
+"""Question Text Helpers.
+
+Normalization and date-literal parsing shared by the plan cache and the
+rule-based planner.
+"""
+
+import datetime
+import re
+import unicodedata
+
+# Month names and abbreviations, by month number
+MONTHS = {
+    name: number
+    for number, names in enumerate(
+        [
+            ("january", "jan"),
+            ("february", "feb"),
+            ("march", "mar"),
+            ("april", "apr"),
+            ("may",),
+            ("june", "jun"),
+            ("july", "jul"),
+            ("august", "aug"),
+            ("september", "sep", "sept"),
+            ("october", "oct"),
+            ("november", "nov"),
+            ("december", "dec"),
+        ],
+        start=1,
+    )
+    for name in names
+}
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+
+def _month(group: str) -> str:
+    return rf"(?P<{group}>{_MONTH_NAMES})\.?"
+
+
+def _day(group: str) -> str:
+    return rf"(?P<{group}>\d{{1,2}})(?:st|nd|rd|th)?"
+
+
+DATE_LITERAL = re.compile(
+    "|".join(
+        [
+            # 2024-03-05, 2024/03/05
+            r"\b(?P<year>\d{4})[-/](?P<month>\d{1,2})[-/](?P<mday>\d{1,2})\b",
+            # March 5, 2024 / Mar 5th 2024
+            rf"\b{_month('month_name')}\s+{_day('day')},?\s+(?P<year2>\d{{4}})\b",
+            # 5 March 2024 / 5th of March, 2024
+            rf"\b{_day('day2')}\s+(?:of\s+)?{_month('month_name2')},?\s+(?P<year3>\d{{4}})\b",
+        ]
+    ),
+    re.IGNORECASE,
+)
+
+
+def iso_date(match: re.Match[str]) -> str | None:
+    """ISO form of a matched date literal, None if it is not a valid date."""
+    groups = match.groupdict()
+    year = groups["year"] or groups["year2"] or groups["year3"]
+    if groups["month"]:
+        month, day = int(groups["month"]), int(groups["mday"])
+    else:
+        month = MONTHS[(groups["month_name"] or groups["month_name2"]).lower()]
+        day = int(groups["day"] or groups["day2"])
+    try:
+        return datetime.date(int(year), month, day).isoformat()
+    except ValueError:
+        return None
+
+
+# Punctuation that doesn't change what a question asks: sentence marks,
+# brackets, quotes, and commas, periods or apostrophes outside words/numbers
+_SENTENCE_PUNCTUATION = re.compile(
+    r"""[?!;:"“”‘’«»()\[\]{}…]+|(?<!\d),|,(?!\d)|\.(?!\w)|(?<!\w)['.]|'(?!\w)"""
+)
+
+
+def fold(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w]+", " ", text.lower()).split())
+
+
+def fold_symbols(text: str) -> str:
+    """Lowercase, drop sentence punctuation and collapse whitespace.
+
+    Unlike `fold`, symbols that can carry meaning are kept ("C++" and "C#"
+    are not "C", "node.js" is not "node js").
+    """
+    return " ".join(_SENTENCE_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+def normalize_question(
+    question: str, keep_symbols: bool = False
+) -> tuple[str, list[str]]:
+    """Fold a question and replace its date literals by placeholders.
+
+    Args:
+        question: The question
+        keep_symbols: Fold with `fold_symbols` instead of `fold`
+
+    Returns:
+        The normalized text, where each distinct date literal is replaced by a `<dateN>`
+        placeholder, and the ISO dates of the placeholders.
+    """
+    text = unicodedata.normalize("NFKC", question)
+    fold_text = fold_symbols if keep_symbols else fold
+    parts: list[str] = []
+    dates: list[str] = []
+    position = 0
+    for match in DATE_LITERAL.finditer(text):
+        iso = iso_date(match)
+        if iso is None:
+            continue
+        if iso not in dates:
+            dates.append(iso)
+        parts.extend(
+            [fold_text(text[position : match.start()]), f"<date{dates.index(iso)}>"]
+        )
+        position = match.end()
+    parts.append(fold_text(text[position:]))
+    return " ".join(part for part in parts if part), dates
@@ -0,0 +1,219 @@
+"""Rule-Based Planner.
+
+Plans the questions covered by the planner prompt's interpretation rules
+without an LLM call: "how many" → `compute_len`, "latest" →
+`take_last_element`, "before/after/on/between DATE", "in the last N days",
+"in March 2024" → `filter_by_date`, and topic phrases ("budget", "pain
+points", "sentiment", ...) → `filter_by_topics`.
+
+A question is planned only if every word of it is explained by a rule or is
+a filler word ("what", "the", "account", "interactions", ...). Anything else
+(names, products, subjects needing `filter_by_keywords`, unknown phrasing)
+is left to the LLM planner, and so are questions about only calls or only
+emails, since no tool filters by interaction type.
+"""
+
+import datetime
+import re
+
+from agent.config import PlannerOutput, PlanSeries, ToolCall
+from agent.questions import MONTHS, normalize_question
+
+# Topic phrases, by topic; the more specific topics are matched first
+TOPIC_PHRASES: list[tuple[str, list[str]]] = [
+    ("positive sentiment", ["Positive Sentiment"]),
+    ("positive feedback", ["Positive Sentiment"]),
+    ("negative sentiment", ["Negative Sentiment"]),
+    ("negative feedback", ["Negative Sentiment"]),
+    ("sentiments?", ["Positive Sentiment", "Negative Sentiment"]),
+    ("next steps?|action items?|follow ups?", ["Next Steps"]),
+    ("pain points?|problems?|issues?|concerns?|complaints?", ["Pain Points"]),
+    ("competitors?|competition|competitors mentioned", ["Competitors Mentioned"]),
+    ("churn risks?|risk of churn|churn", ["Churn Risk"]),
+    ("esg audit pressure|esg audits?|esg", ["ESG Audit Pressure"]),
+    ("roi justification|roi|return on investment", ["ROI Justification"]),
+    (
+        "decision factors?|decision criteria|decision process|decision making",
+        ["Decision Factors"],
+    ),
+    ("solution fit|product fit", ["Solution Fit"]),
+    ("budgets?", ["Budget"]),
+    ("timelines?|deadlines?", ["Timeline"]),
+    ("results?|outcomes?", ["Result"]),
+]
+
+# Words that don't change the plan of a question
+FILLER_WORDS = set(
+    """
+    a about all an and any anything are as at be been being by can could did
+    do does during for from give had has have how i in is it its list me my
+    of on or our please say said show tell that the their them there these
+    they this those to us was we were what whats when where which who with
+    would you your
+    account accounts client clients customer customers company
+    interaction interactions communication communications conversation
+    conversations exchange exchanges message messages
+    call calls email emails
+    discuss discusses discussed discussing discussion discussions mention
+    mentions mentioned mentioning talk talks talked raised brought up noted
+    shared expressed happen happened happening
+    summarize summarise summary overview recap main key
+    """.split()
+)
+
+_TYPE_WORDS = {"call": "call", "calls": "call", "email": "email", "emails": "email"}
+
+_DAYS_PER_UNIT = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+
+def _month_range(year: int, month: int) -> tuple[str, str]:
+    first = datetime.date(year, month, 1)
+    following = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return first.isoformat(), (following - datetime.timedelta(days=1)).isoformat()
+
+
+class _Parse:
+    """Steps recognized so far in a normalized question."""
+
+    def __init__(self, text: str, dates: list[str]):
+        self.text = f" {text} "
+        self.dates = dates
+        self.topics: list[str] = []
+        self.date_step: ToolCall | None = None
+        self.date_title = ""
+        self.count = False
+        self.latest = False
+        # Set when a construct is recognized but can't be planned
+        self.failed = False
+
+    def consume(self, pattern: str) -> list[re.Match[str]]:
+        """Remove the matches of a pattern from the text and return them."""
+        matches = list(re.finditer(rf"(?<= )(?:{pattern})(?= )", self.text))
+        if matches:
+            self.text = re.sub(rf"(?<= )(?:{pattern})(?= )", " ", self.text)
+        return matches
+
+    def date(self, params: dict[str, str | int | list[str]], title: str) -> None:
+        if self.date_step is not None:
+            # Several date filters: left to the LLM
+            self.failed = True
+            return
+        self.date_step = ToolCall(tool="filter_by_date", params=params)
+        self.date_title = title
+
+    def placeholder(self, index: str) -> str:
+        return self.dates[int(index)]
+
+
+def _parse_dates(parse: _Parse) -> None:
+    date = r"<date(\d+)>"
+    for match in parse.consume(
+        r"(?:(?:in|over|during|within) )?(?:the )?(?:last|past) (\d+) "
+        r"(day|week|month|year)s?"
+    ):
+        days = int(match.group(1)) * _DAYS_PER_UNIT[match.group(2)]
+        parse.date(
+            {"operator": "last_n_days", "days": days}, f" in the Last {days} Days"
+        )
+    for match in parse.consume(r"(?:in |over |during )?the past (week|month|year)"):
+        days = _DAYS_PER_UNIT[match.group(1)]
+        parse.date(
+            {"operator": "last_n_days", "days": days}, f" in the Last {days} Days"
+        )
+    for match in parse.consume(rf"(?:between|from) {date} (?:and|to) {date}"):
+        first, last = (
+            parse.placeholder(match.group(1)),
+            parse.placeholder(match.group(2)),
+        )
+        parse.date(
+            {"operator": "between", "date": first, "end_date": last},
+            f" Between {first} and {last}",
+        )
+    for match in parse.consume(rf"(?:before|prior to) {date}"):
+        value = parse.placeholder(match.group(1))
+        parse.date({"operator": "<", "date": value}, f" Before {value}")
+    for match in parse.consume(rf"after {date}"):
+        value = parse.placeholder(match.group(1))
+        parse.date({"operator": ">", "date": value}, f" After {value}")
+    for match in parse.consume(rf"on {date}"):
+        value = parse.placeholder(match.group(1))
+        parse.date({"operator": "=", "date": value}, f" on {value}")
+    for match in parse.consume(rf"(?:in|during) ({_MONTH_NAMES}) (\d{{4}})"):
+        month, year = MONTHS[match.group(1)], int(match.group(2))
+        first, last = _month_range(year, month)
+        parse.date(
+            {"operator": "between", "date": first, "end_date": last},
+            f" in {datetime.date(year, month, 1):%B %Y}",
+        )
+    for match in parse.consume(r"(?:in|during) q([1-4]) (\d{4})"):
+        quarter, year = int(match.group(1)), int(match.group(2))
+        first = _month_range(year, 3 * quarter - 2)[0]
+        last = _month_range(year, 3 * quarter)[1]
+        parse.date(
+            {"operator": "between", "date": first, "end_date": last},
+            f" in Q{quarter} {year}",
+        )
+    for match in parse.consume(r"(?:in|during) (\d{4})"):
+        year_text = match.group(1)
+        parse.date(
+            {
+                "operator": "between",
+                "date": f"{year_text}-01-01",
+                "end_date": f"{year_text}-12-31",
+            },
+            f" in {year_text}",
+        )
+    if "<date" in parse.text:
+        # A date used some other way
+        parse.failed = True
+
+
+def plan_question(question: str) -> PlannerOutput | None:
+    """Plan a question with the interpretation rules.
+
+    Returns:
+        A single plan, or None if the question is not fully understood and
+        should be planned by the LLM.
+    """
+    text, dates = normalize_question(question)
+    parse = _Parse(text, dates)
+    _parse_dates(parse)
+    if parse.consume(r"how many|how often|number of|count of|count"):
+        parse.count = True
+    if parse.consume(r"(?:the )?(?:latest|most recent|last)"):
+        parse.latest = True
+    for pattern, topics in TOPIC_PHRASES:
+        if parse.consume(pattern):
+            parse.topics.extend(topic for topic in topics if topic not in parse.topics)
+
+    words = parse.text.split()
+    if parse.failed or parse.count and parse.latest:
+        return None
+    if any(word not in FILLER_WORDS for word in words):
+        return None
+    types = {_TYPE_WORDS[word] for word in words if word in _TYPE_WORDS}
+    if len(types) == 1:
+        # Only calls or only emails (counted, latest or listed): no tool
+        # filters by type
+        return None
+
+    steps: list[ToolCall] = []
+    if parse.topics:
+        steps.append(ToolCall(tool="filter_by_topics", params={"topics": parse.topics}))
+    if parse.date_step is not None:
+        steps.append(parse.date_step)
+    if parse.latest:
+        steps.append(ToolCall(tool="take_last_element"))
+    if parse.count:
+        steps.append(ToolCall(tool="compute_len"))
+
+    subject = f"{', '.join(parse.topics) or 'All'} Interactions{parse.date_title}"
+    if parse.count:
+        title = f"Count of {subject}"
+    elif parse.latest:
+        title = f"Latest {subject}"
+    else:
+        title = subject
+    return PlannerOutput(plans=[PlanSeries(steps=steps, title=title)])
@@ -0,0 +1,104 @@
+"""Single-Flight Request Coalescing.
+
+Concurrent callers asking for the same key share one in-flight call instead
+of each issuing it: the first caller (the leader) runs it, the others wait for
+its result. Once the call completes the key is forgotten, so later callers
+run it again (caching results is left to the caller).
+
+Sync (thread) and async callers share the same in-flight calls: the result
+is published through a `concurrent.futures.Future`, which threads wait on and
+coroutines await through `asyncio.wrap_future`.
+"""
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import CancelledError, Future
+
+
+class SingleFlight[K: Hashable, V]:
+    """Coalesces concurrent calls by key.
+
+    Args:
+        name: Name of the coalesced call, used in the stats
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[K, Future[V]] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key: K) -> tuple[Future[V], bool]:
+        """Return the in-flight call of a key and whether the caller leads it."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _done(self, key: K, future: Future[V]) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key: K, func: Callable[[], V]) -> V:
+        """Run `func`, or wait for the in-flight call of the same key.
+
+        The exception raised by the leader's call is raised to every caller.
+        """
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return future.result()
+                except CancelledError:
+                    # The leader was cancelled, not this caller: run it again
+                    continue
+            try:
+                result = func()
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                self._done(key, future)
+            future.set_result(result)
+            return result
+
+    async def ado(self, key: K, func: Callable[[], Awaitable[V]]) -> V:
+        """Async version of `do`, `func` returning the awaitable to run."""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return await asyncio.shield(asyncio.wrap_future(future))
+                except asyncio.CancelledError:
+                    if future.cancelled():
+                        continue
+                    raise
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                self._done(key, future)
+            future.set_result(result)
+            return result
+
+    def stats(self) -> dict[str, int]:
+        """Return how many calls were run and how many joined one in flight."""
+        with self._lock:
+            return {
+                "calls": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
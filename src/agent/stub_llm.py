@@ -0,0 +1,236 @@
+"""Stub LLM Provider.
+
+An offline chat model for benchmarks and load tests of the whole stack,
+without network or API keys (`LLM_PROVIDER=stub`):
+- structured output requests are answered with schema-valid JSON: the
+  planner's `PlannerOutput` comes from the rule-based planner (an empty plan
+  list, i.e. all interactions, when no rule applies), other schemas get the
+  default value of each field;
+- other requests get a filler answer of `answer_tokens` tokens;
+- output is produced after `ttft_seconds`, then at `tokens_per_second`,
+  streamed token by token (4 characters per token);
+- a `failure_rate` fraction of the calls, evenly spread (0.1: every 10th
+  call), raise a RuntimeError after the time to first token;
+- responses carry usage metadata estimated from the text lengths.
+
+The settings are fields of the model, so they can also be changed at runtime.
+"""
+
+import asyncio
+import itertools
+import time
+from collections.abc import AsyncIterator, Iterator
+from typing import Any, get_origin
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel, PrivateAttr
+
+from agent.config import PlannerOutput
+from agent.rule_planner import plan_question
+
+# Characters per token, to split outputs and estimate usage
+CHARS_PER_TOKEN = 4
+
+_FILLER = (
+    "Based on the interaction history of the account, the requested "
+    "information is summarized here for benchmarking purposes only. "
+)
+
+_DEFAULTS: dict[Any, Any] = {str: "", int: 0, float: 0.0, bool: False}
+
+
+def _default_output(schema: type[BaseModel]) -> BaseModel:
+    """An instance of a schema with a default value for each required field."""
+    values: dict[str, Any] = {}
+    for name, info in schema.model_fields.items():
+        if not info.is_required():
+            continue
+        annotation = info.annotation
+        origin = get_origin(annotation) or annotation
+        if origin in (list, dict, set, tuple):
+            values[name] = origin()
+        elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            values[name] = _default_output(annotation)
+        else:
+            values[name] = _DEFAULTS.get(origin)
+    return schema.model_validate(values)
+
+
+def _text(message: BaseMessage) -> str:
+    """Text content of a message.
+
+    `BaseMessage.text` is a method before langchain-core 1.0 and a property
+    after, so the content is read directly.
+    """
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in message.content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+
+def _tokens(text: str) -> list[str]:
+    return [
+        text[start : start + CHARS_PER_TOKEN]
+        for start in range(0, len(text), CHARS_PER_TOKEN)
+    ]
+
+
+class StubChatModel(BaseChatModel):
+    """Offline chat model with configurable latency and failures."""
+
+    model_name: str = "stub"
+    # Whether `invoke` streams, as in the other providers
+    streaming: bool = False
+    # Output speed after the first token
+    tokens_per_second: float = 50.0
+    # Delay before the first token
+    ttft_seconds: float = 0.3
+    # Fraction of the calls that fail
+    failure_rate: float = 0.0
+    # Length of the answers to unstructured requests
+    answer_tokens: int = 60
+
+    _calls: Iterator[int] = PrivateAttr(default_factory=itertools.count)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _output(self, messages: list[BaseMessage], schema: Any) -> str:
+        question = _text(messages[-1]) if messages else ""
+        if schema is PlannerOutput:
+            output = plan_question(question) or PlannerOutput(plans=[])
+            return output.model_dump_json()
+        if schema is not None:
+            return _default_output(schema).model_dump_json()
+        answer = f"Stub answer to: {question.strip()}\n"
+        length = self.answer_tokens * CHARS_PER_TOKEN
+        while len(answer) < length:
+            answer += _FILLER
+        return answer[:length]
+
+    def _usage(self, messages: list[BaseMessage], output: str) -> UsageMetadata:
+        input_tokens = sum(len(_text(message)) for message in messages)
+        input_tokens //= CHARS_PER_TOKEN
+        output_tokens = len(_tokens(output))
+        return UsageMetadata(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+
+    def _check_failure(self) -> None:
+        call = next(self._calls)
+        if int((call + 1) * self.failure_rate) > int(call * self.failure_rate):
+            raise RuntimeError("Stub LLM failure (injected)")
+
+    def _message(self, messages: list[BaseMessage], output: str) -> AIMessage:
+        return AIMessage(
+            content=output,
+            usage_metadata=self._usage(messages, output),
+            response_metadata={"model_name": self.model_name},
+        )
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        output = self._output(messages, kwargs.get("stub_schema"))
+        time.sleep(self.ttft_seconds)
+        self._check_failure()
+        time.sleep(len(_tokens(output)) / self.tokens_per_second)
+        return ChatResult(
+            generations=[ChatGeneration(message=self._message(messages, output))]
+        )
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        output = self._output(messages, kwargs.get("stub_schema"))
+        await asyncio.sleep(self.ttft_seconds)
+        self._check_failure()
+        await asyncio.sleep(len(_tokens(output)) / self.tokens_per_second)
+        return ChatResult(
+            generations=[ChatGeneration(message=self._message(messages, output))]
+        )
+
+    def _chunks(
+        self, messages: list[BaseMessage], output: str
+    ) -> Iterator[ChatGenerationChunk]:
+        """The output token by token, the last chunk carrying the usage.
+
+        Tokens are text content blocks, as streamed by the OpenAI provider.
+        """
+        tokens = _tokens(output)
+        for position, token in enumerate(tokens):
+            last = position == len(tokens) - 1
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content=[{"type": "text", "text": token, "index": 0}],
+                    usage_metadata=self._usage(messages, output) if last else None,
+                    response_metadata={"model_name": self.model_name} if last else {},
+                )
+            )
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        output = self._output(messages, kwargs.get("stub_schema"))
+        time.sleep(self.ttft_seconds)
+        self._check_failure()
+        for position, chunk in enumerate(self._chunks(messages, output)):
+            if position:
+                time.sleep(1 / self.tokens_per_second)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        output = self._output(messages, kwargs.get("stub_schema"))
+        await asyncio.sleep(self.ttft_seconds)
+        self._check_failure()
+        for position, chunk in enumerate(self._chunks(messages, output)):
+            if position:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def with_structured_output(  # type: ignore[override]
+        self, schema: type[BaseModel], **kwargs: Any
+    ) -> Runnable[Any, BaseModel]:
+        """Answer with a schema-valid instance of a Pydantic schema."""
+
+        def parse(message: BaseMessage) -> BaseModel:
+            return schema.model_validate_json(_text(message))
+
+        model: Runnable[Any, BaseMessage] = self.bind(stub_schema=schema)
+        return model | RunnableLambda(parse)
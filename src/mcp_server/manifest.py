@@ -0,0 +1,165 @@
+"""Account Manifest.
+
+Persisted index of the account files so listing accounts doesn't parse every
+file. The manifest is refreshed incrementally: a directory scan compares each
+file's mtime and size with the recorded ones and only re-reads changed files.
+"""
+
+import bisect
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+ACCOUNT_FILE_PATTERN = re.compile(r"account_(\d+)\.json")
+
+MANIFEST_VERSION = 1
+
+
+def summarize_account(account_id: int, data: dict[str, Any]) -> dict[str, Any]:
+    """Build the manifest record of an account from its raw data."""
+    calls = data.get("calls", [])
+    emails = data.get("emails", [])
+    dates = [
+        item["date"]
+        for item in (*calls, *emails)
+        if isinstance(item.get("date"), str) and item["date"]
+    ]
+    return {
+        "id": account_id,
+        "name": data.get("account_name", f"Account {account_id}"),
+        "tenant": data.get("tenant_name"),
+        "calls": len(calls),
+        "emails": len(emails),
+        "last_interaction": max(dates) if dates else None,
+    }
+
+
+class AccountManifest:
+    """Incrementally maintained list of accounts, persisted as JSON.
+
+    Args:
+        data_dir: Directory containing the account_<id>.json files
+        manifest_path: Where the manifest is persisted
+        refresh_interval: Minimum number of seconds between directory scans
+    """
+
+    def __init__(self, data_dir: Path, manifest_path: Path, refresh_interval: float):
+        self.data_dir = data_dir
+        self.manifest_path = manifest_path
+        self.refresh_interval = refresh_interval
+        self._records: dict[int, dict[str, Any]] = {}
+        self._by_id: list[dict[str, Any]] = []
+        self._by_name: list[tuple[str, int]] = []
+        self._last_refresh = float("-inf")
+        self._lock = threading.Lock()
+        self._load()
+
+    def list_accounts(
+        self, offset: int = 0, limit: int | None = None, name_prefix: str | None = None
+    ) -> list[dict[str, Any]]:
+        """List accounts ordered by id, or by name when searching a prefix."""
+        self.refresh()
+        with self._lock:
+            if name_prefix:
+                prefix = name_prefix.casefold()
+                start = bisect.bisect_left(self._by_name, (prefix,))
+                matches = []
+                for name, account_id in self._by_name[start:]:
+                    if not name.startswith(prefix):
+                        break
+                    matches.append(self._records[account_id])
+            else:
+                matches = self._by_id
+            end = None if limit is None else offset + limit
+            return matches[offset:end]
+
+    def get(self, account_id: int) -> dict[str, Any] | None:
+        """Return the manifest record of an account."""
+        self.refresh()
+        with self._lock:
+            return self._records.get(account_id)
+
+    def refresh(self, force: bool = False) -> None:
+        """Rescan the data directory and re-read new or modified files."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return
+            self._last_refresh = now
+
+            seen: set[int] = set()
+            changed = False
+            try:
+                entries = list(os.scandir(self.data_dir))
+            except OSError:
+                entries = []
+            for entry in entries:
+                match = ACCOUNT_FILE_PATTERN.fullmatch(entry.name)
+                if not match:
+                    continue
+                account_id = int(match.group(1))
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                seen.add(account_id)
+                record = self._records.get(account_id)
+                if (
+                    record is not None
+                    and record["mtime_ns"] == stat.st_mtime_ns
+                    and record["size"] == stat.st_size
+                ):
+                    continue
+                try:
+                    with open(entry.path) as f:
+                        data = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    continue
+                self._records[account_id] = {
+                    **summarize_account(account_id, data),
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                }
+                changed = True
+
+            for account_id in set(self._records) - seen:
+                del self._records[account_id]
+                changed = True
+
+            if changed:
+                self._reindex()
+                self._save()
+
+    def _reindex(self) -> None:
+        self._by_id = [self._records[i] for i in sorted(self._records)]
+        self._by_name = sorted(
+            (str(record["name"]).casefold(), account_id)
+            for account_id, record in self._records.items()
+        )
+
+    def _load(self) -> None:
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if manifest.get("version") != MANIFEST_VERSION:
+            return
+        self._records = {int(k): v for k, v in manifest.get("accounts", {}).items()}
+        self._reindex()
+
+    def _save(self) -> None:
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({"version": MANIFEST_VERSION, "accounts": self._records}, f)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            # The data directory may be read-only, keep serving from memory
+            logging.warning(f"Could not persist account manifest: {e}")
@@ -0,0 +1,223 @@
+"""Server-side Plan Execution.
+
+Runs the agent's filter plans next to the data so only the matching
+interactions (or just their count) are sent back to the agent. The tools
+mirror `agent.nodes.plan_executer.TOOL_REGISTRY` and select positions in the
+projected call/email dicts held by the account store, which keeps them sorted
+by date with their date ordinals: date filters binary search the ordinals
+instead of parsing dates.
+"""
+
+import calendar
+import datetime
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Any
+
+from pydantic import BaseModel
+
+from mcp_server.store import date_ordinal
+
+Interaction = dict[str, Any]
+
+
+class PlanStep(BaseModel):
+    """A single tool call in a plan (mirrors `agent.config.ToolCall`)."""
+
+    tool: str
+    params: dict[str, str | int | list[str]] | None = None
+
+
+class Plan(BaseModel):
+    """A series of tool calls (mirrors `agent.config.PlanSeries`)."""
+
+    steps: list[PlanStep]
+    title: str
+
+
+@dataclass(frozen=True, slots=True)
+class Rows:
+    """A selection of an account's calls (or emails).
+
+    `positions` index the store's date-sorted interactions and their date
+    ordinals, in increasing order, so the selection stays sorted by date.
+    """
+
+    items: list[Interaction]
+    ordinals: list[int]
+    positions: Sequence[int]
+
+    @classmethod
+    def all(cls, items: list[Interaction], ordinals: list[int]) -> "Rows":
+        """Select all the interactions."""
+        return cls(items, ordinals, range(len(items)))
+
+    def where(self, positions: Sequence[int]) -> "Rows":
+        """Select the given positions."""
+        return Rows(self.items, self.ordinals, positions)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+
+def filter_by_topics(calls: Rows, emails: Rows, topics: list[str]) -> tuple[Rows, Rows]:
+    """Filter interactions by topics."""
+    topics_set = set(topics)
+
+    def keep(rows: Rows) -> Rows:
+        return rows.where(
+            [
+                position
+                for position in rows.positions
+                if topics_set.intersection(rows.items[position].get("topics") or [])
+            ]
+        )
+
+    return keep(calls), keep(emails)
+
+
+def _period_ordinals(value: str | None) -> tuple[int, int]:
+    """First and last date ordinals of an ISO date, month or year."""
+    value = (value or "").strip()
+    try:
+        if len(value) == 4 and value.isdigit():
+            year = int(value)
+            return (
+                datetime.date(year, 1, 1).toordinal(),
+                datetime.date(year, 12, 31).toordinal(),
+            )
+        if len(value) == 7 and value[4] == "-" and value.replace("-", "").isdigit():
+            year, month = int(value[:4]), int(value[5:])
+            first = datetime.date(year, month, 1)
+            return first.toordinal(), first.toordinal() + (
+                calendar.monthrange(year, month)[1] - 1
+            )
+    except ValueError as e:
+        raise ValueError(f"Invalid date: {value}") from e
+    result = date_ordinal(value)
+    if not result:
+        raise ValueError(f"Invalid date: {value}")
+    return result, result
+
+
+def date_bounds(
+    operator: str,
+    date: str | None = None,
+    end_date: str | None = None,
+    days: str | int | None = None,
+) -> tuple[int, int]:
+    """Resolve a date filter to an inclusive range of date ordinals.
+
+    Mirrors `agent.indexes.date_bounds`, months (YYYY-MM) and years (YYYY)
+    included.
+    """
+    if operator == "=":
+        return _period_ordinals(date)
+    if operator == "<":
+        # Malformed dates are stored as 0, before any valid date
+        return 0, _period_ordinals(date)[0] - 1
+    if operator == ">":
+        return _period_ordinals(date)[1] + 1, datetime.date.max.toordinal()
+    if operator == "between":
+        return _period_ordinals(date)[0], _period_ordinals(end_date)[1]
+    if operator == "last_n_days":
+        last = _period_ordinals(date)[1] if date else datetime.date.today().toordinal()
+        try:
+            n_days = int(days or "")
+        except ValueError as e:
+            raise ValueError(f"Invalid number of days: {days}") from e
+        return last - n_days + 1, last
+    raise ValueError(f"Invalid operator: {operator}")
+
+
+def _date_range(rows: Rows, first: int, last: int) -> Rows:
+    start = bisect_left(rows.positions, first, key=rows.ordinals.__getitem__)
+    stop = bisect_right(rows.positions, last, key=rows.ordinals.__getitem__)
+    return rows.where(rows.positions[start:stop])
+
+
+def filter_by_date(
+    calls: Rows,
+    emails: Rows,
+    operator: str,
+    date: str | None = None,
+    end_date: str | None = None,
+    days: str | int | None = None,
+) -> tuple[Rows, Rows]:
+    """Filter interactions by date with given operator."""
+    first, last = date_bounds(operator, date, end_date, days)
+    return _date_range(calls, first, last), _date_range(emails, first, last)
+
+
+def take_last_element(calls: Rows, emails: Rows) -> tuple[Rows, Rows]:
+    """Take the last interaction."""
+    return calls.where(calls.positions[-1:]), emails.where(emails.positions[-1:])
+
+
+def filter_by_keywords(
+    calls: Rows, emails: Rows, keywords: list[str]
+) -> tuple[Rows, Rows]:
+    """Filter interactions by keywords."""
+    keywords_lower = {keyword.lower() for keyword in keywords}
+
+    def keep(rows: Rows) -> Rows:
+        return rows.where(
+            [
+                position
+                for position in rows.positions
+                if any(
+                    keyword in (rows.items[position].get("content") or "").lower()
+                    for keyword in keywords_lower
+                )
+            ]
+        )
+
+    return keep(calls), keep(emails)
+
+
+TOOL_REGISTRY: dict[str, Callable[..., tuple[Rows, Rows]]] = {
+    "filter_by_topics": filter_by_topics,
+    "filter_by_date": filter_by_date,
+    "take_last_element": take_last_element,
+    "filter_by_keywords": filter_by_keywords,
+}
+
+
+def execute_plan(calls: Rows, emails: Rows, plan: Plan) -> dict[str, Any]:
+    """Execute a plan and return its count or its matching interactions.
+
+    Raises:
+        ValueError: If the plan uses an unsupported tool or invalid parameters.
+    """
+    current_calls, current_emails = calls, emails
+    for step in plan.steps:
+        if step.tool == "compute_len":
+            return {
+                "title": plan.title,
+                "count": len(current_calls) + len(current_emails),
+            }
+        tool_func = TOOL_REGISTRY.get(step.tool)
+        if not tool_func:
+            raise ValueError(f"Tool {step.tool} not supported by the server.")
+        try:
+            current_calls, current_emails = tool_func(
+                current_calls, current_emails, **step.params or {}
+            )
+        except TypeError as e:
+            raise ValueError(f"Invalid parameters for {step.tool}: {e}") from e
+
+    # Chronological, calls before emails of the same day, like the agent
+    matches = sorted(
+        [
+            (
+                rows.ordinals[position],
+                {**rows.items[position], "interaction_type": kind},
+            )
+            for kind, rows in (("call", current_calls), ("email", current_emails))
+            for position in rows.positions
+        ],
+        key=itemgetter(0),
+    )
+    return {"title": plan.title, "interactions": [item for _, item in matches]}
@@ -4,6 +4,8 @@ Provides tools for retrieving account data:
 - calls: Get calls for an account
 - emails: Get emails for an account
 - calls_emails: Get both calls and emails for an account
+- execute_plans: Run filter plans on an account and return only the matches
+- account_version: Get the version of an account's data, to revalidate caches
 
 Uses FastMCP with streamable_http transport.
 """
@@ -17,6 +19,12 @@ from typing import Any
 import uvicorn
 from mcp.server.fastmcp import FastMCP
 from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from mcp_server.manifest import AccountManifest
+from mcp_server.plans import Plan, Rows, execute_plan
+from mcp_server.store import ORDINAL_KEYS, AccountStore
 
 port = int(os.getenv("MCP_SERVER_PORT", 8002))
 host = os.getenv("APP_HOST", "127.0.0.1")
@@ -51,6 +59,18 @@ SERVICE_NAME = "account-data-mcp"
 # Data directory
 DATA_DIR = Path(os.getenv("DATA_DIR", Path(__file__).parent / "data")) / "accounts"
 
+# Cap on the account file bytes kept resident (the parsed data takes several
+# times more memory)
+ACCOUNT_STORE_MAX_BYTES = int(os.getenv("ACCOUNT_STORE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Persisted account manifest, rescanned at most every refresh interval
+ACCOUNT_MANIFEST_PATH = Path(
+    os.getenv("ACCOUNT_MANIFEST_PATH", DATA_DIR.parent / "account_manifest.json")
+)
+ACCOUNT_MANIFEST_REFRESH_SECONDS = float(
+    os.getenv("ACCOUNT_MANIFEST_REFRESH_SECONDS", 2)
+)
+
 # Initialize MCP server
 mcp = FastMCP(
     SERVICE_NAME,
@@ -61,63 +81,51 @@ mcp = FastMCP(
     stateless_http=True,
 )
 
-
-def load_account_data(account_id: int) -> dict[str, Any] | None:
-    """Load account data from JSON file.
-
-    Account files are named account_<id>.json (e.g., account_1.json).
-    """
-    if not DATA_DIR.exists():
-        return None
-
-    # Try to load directly by account_id from filename
-    file_path = DATA_DIR / f"account_{account_id}.json"
-    if file_path.exists():
-        try:
-            with open(file_path) as f:
-                data = json.load(f)
-                data["account_id"] = account_id  # Add account_id to the data
-                return data  # type: ignore[no-any-return]
-        except (OSError, json.JSONDecodeError):
-            return None
-
-    return None
+# Parsed accounts kept in memory between tool calls
+account_store = AccountStore(DATA_DIR, max_bytes=ACCOUNT_STORE_MAX_BYTES)
+account_manifest = AccountManifest(
+    DATA_DIR,
+    manifest_path=ACCOUNT_MANIFEST_PATH,
+    refresh_interval=ACCOUNT_MANIFEST_REFRESH_SECONDS,
+)
 
 
-def list_all_accounts() -> list[dict[str, str | int]]:
-    """List all available accounts from data files.
+def list_all_accounts(
+    offset: int = 0, limit: int | None = None, name_prefix: str | None = None
+) -> list[dict[str, Any]]:
+    """List available accounts from the account manifest.
 
-    Returns a list of {id, name} dicts for each account.
+    Returns a list of {id, name, tenant, calls, emails, last_interaction} dicts.
     """
-    accounts: list[dict[str, str | int]] = []
-    if not DATA_DIR.exists():
-        return accounts
-
-    for file_path in sorted(DATA_DIR.glob("account_*.json")):
-        try:
-            # Extract account_id from filename (e.g., account_1.json -> 1)
-            account_id = int(file_path.stem.replace("account_", ""))
-            with open(file_path) as f:
-                data = json.load(f)
-                accounts.append(
-                    {
-                        "id": account_id,
-                        "name": data.get("account_name", f"Account {account_id}"),
-                    }
-                )
-        except (OSError, json.JSONDecodeError, ValueError):
-            continue
-
-    return accounts
+    return [
+        {
+            "id": record["id"],
+            "name": record["name"],
+            "tenant": record["tenant"],
+            "calls": record["calls"],
+            "emails": record["emails"],
+            "last_interaction": record["last_interaction"],
+        }
+        for record in account_manifest.list_accounts(
+            offset=offset, limit=limit, name_prefix=name_prefix
+        )
+    ]
 
 
 # ----- Tools -----
 
 
-@mcp.tool(name="fetch_accounts", description="Fetch the list of available accounts.")
-async def fetch_accounts() -> str:
+@mcp.tool(
+    name="fetch_accounts",
+    description="Fetch the list of available accounts. Supports pagination with offset/limit and case-insensitive search by name prefix.",
+)
+async def fetch_accounts(
+    offset: int = 0, limit: int | None = None, name_prefix: str | None = None
+) -> str:
     """Fetch the list of available accounts."""
-    return json.dumps(list_all_accounts())
+    return json.dumps(
+        list_all_accounts(offset=offset, limit=limit, name_prefix=name_prefix)
+    )
 
 
 @mcp.tool(
@@ -126,7 +134,7 @@ async def fetch_accounts() -> str:
 )
 async def get_calls_and_emails(account_id: int) -> dict[str, Any]:
     """Get both call and emails for an account."""
-    account_data = load_account_data(account_id)
+    account_data = account_store.get(account_id)
 
     if account_data is None:
         return {
@@ -135,9 +143,7 @@ async def get_calls_and_emails(account_id: int) -> dict[str, Any]:
             "emails": None,
             "error": f"No data found for account_id: {account_id}",
         }
-    calls = account_data.get("calls", [])
-    emails = account_data.get("emails", [])
-    if not calls and not emails:
+    if not account_data["calls"] and not account_data["emails"]:
         return {
             "found": False,
             "calls": None,
@@ -146,28 +152,75 @@ async def get_calls_and_emails(account_id: int) -> dict[str, Any]:
         }
     return {
         "found": True,
-        "account_name": account_data.get("account_name"),
-        "tenant_name": account_data.get("tenant_name"),
-        "calls": [
-            {
-                "date": call.get("date"),
-                "content": call.get("transcript"),
-                "topics": call.get("topics"),
-            }
-            for call in calls
-        ],
-        "emails": [
-            {
-                "date": email.get("date"),
-                "content": email.get("content"),
-                "topics": email.get("topics"),
-            }
-            for email in emails
-        ],
+        **{
+            key: value
+            for key, value in account_data.items()
+            if key not in ORDINAL_KEYS.values()
+        },
+    }
+
+
+@mcp.tool(
+    name="execute_plans",
+    description="Execute filter plans on an account's calls and emails. Each plan is {title, steps: [{tool, params}]} using the agent's tools (filter_by_topics, filter_by_date, take_last_element, filter_by_keywords, compute_len). Returns, for each plan, the matching interactions or their count when the plan ends with compute_len.",
+)
+async def execute_plans(account_id: int, plans: list[Plan]) -> dict[str, Any]:
+    """Execute plans server-side and return only their results."""
+    account_data = account_store.get(account_id)
+
+    if account_data is None:
+        return {
+            "found": False,
+            "results": None,
+            "error": f"No data found for account_id: {account_id}",
+        }
+    calls = account_data["calls"]
+    emails = account_data["emails"]
+    if not calls and not emails:
+        return {
+            "found": False,
+            "results": None,
+            "error": "No calls or emails found for this account",
+        }
+    if not plans:
+        # Only checks the account has data
+        return {"found": True, "results": [], "version": account_data.get("version")}
+    call_rows = Rows.all(calls, account_data[ORDINAL_KEYS["calls"]])
+    email_rows = Rows.all(emails, account_data[ORDINAL_KEYS["emails"]])
+    try:
+        results = [execute_plan(call_rows, email_rows, plan) for plan in plans]
+    except ValueError as e:
+        return {"found": True, "results": None, "error": str(e)}
+    return {
+        "found": True,
+        "results": results,
         "account_id": account_id,
+        "version": account_data.get("version"),
     }
 
 
+@mcp.tool(
+    name="account_version",
+    description="Return the version of an account's data, which changes whenever the data changes. calls_emails returns the same version, so a client can check its copy is current without fetching it again.",
+)
+async def account_version(account_id: int) -> dict[str, Any]:
+    """Get the data version of an account (file mtime and size)."""
+    version = account_store.version(account_id)
+    if version is None:
+        return {
+            "found": False,
+            "version": None,
+            "error": f"No data found for account_id: {account_id}",
+        }
+    return {"found": True, "version": version}
+
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def store_stats(request: Request) -> JSONResponse:
+    """Expose the account store counters."""
+    return JSONResponse(account_store.stats())
+
+
 # ----- App -----
 
 
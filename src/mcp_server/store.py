@@ -0,0 +1,234 @@
+"""Resident Account Store.
+
+Keeps parsed accounts in memory so repeated tool calls don't re-read and
+re-parse the same account files. Each entry holds the already-projected
+call/email dicts, sorted by date, and is refreshed only when the file's mtime
+or size changes. That mtime and size are also exposed as the account's data
+version, so clients can revalidate their own copies without re-fetching them.
+Entries are evicted in LRU order once the configured cap on their file bytes is
+exceeded.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+
+def date_ordinal(value: Any) -> int:
+    """Ordinal of an ISO date (YYYY-MM-DD...), 0 if it is missing or malformed."""
+    if not isinstance(value, str):
+        return 0
+    try:
+        return date.fromisoformat(value[:10]).toordinal()
+    except ValueError:
+        return 0
+
+
+def interaction_ordinal(item: dict[str, Any]) -> int:
+    """Date ordinal of a projected call or email, used as sort/search key."""
+    return date_ordinal(item.get("date"))
+
+
+# Payload keys of the date ordinals of the sorted calls and emails, internal
+# to the server (not returned by the tools)
+ORDINAL_KEYS = {"calls": "call_ordinals", "emails": "email_ordinals"}
+
+
+def _sorted_by_date(
+    interactions: list[dict[str, Any]],
+) -> tuple[list[dict[str, Any]], list[int]]:
+    """Interactions sorted by date (stable), with their date ordinals."""
+    ordinals = [interaction_ordinal(item) for item in interactions]
+    order = sorted(range(len(interactions)), key=ordinals.__getitem__)
+    return [interactions[row] for row in order], [ordinals[row] for row in order]
+
+
+def file_version(stat: os.stat_result) -> str:
+    """Version of an account file, changing whenever the file is rewritten."""
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def content_hash(content: str | None) -> str:
+    """Hash of an interaction's content, keying its precomputed summary."""
+    return hashlib.sha256((content or "").encode()).hexdigest()
+
+
+def _summary_field(item: dict[str, Any], content: str | None) -> dict[str, Any]:
+    """The `summary` field of a projected interaction, if it has a current one.
+
+    Summaries are precomputed by `scripts/fill_summaries.py`, with the hash of
+    the content they summarize; a summary of an older content is left out.
+    """
+    summary = item.get("compact_summary")
+    if summary and item.get("compact_summary_hash") == content_hash(content):
+        return {"summary": summary}
+    return {}
+
+
+def project_account_data(account_id: int, data: dict[str, Any]) -> dict[str, Any]:
+    """Project raw account data to the fields exposed by the MCP tools.
+
+    Calls and emails are sorted by date (stable, malformed dates first), so
+    date filters can binary search them and the last one is the latest. They
+    include their precomputed summary when it is current. Their date ordinals
+    are parsed once, here, and kept under `ORDINAL_KEYS`.
+    """
+    calls = [
+        {
+            "date": call.get("date"),
+            "content": call.get("transcript"),
+            "topics": call.get("topics"),
+            **_summary_field(call, call.get("transcript")),
+        }
+        for call in data.get("calls", [])
+    ]
+    emails = [
+        {
+            "date": email.get("date"),
+            "content": email.get("content"),
+            "topics": email.get("topics"),
+            **_summary_field(email, email.get("content")),
+        }
+        for email in data.get("emails", [])
+    ]
+    calls, call_ordinals = _sorted_by_date(calls)
+    emails, email_ordinals = _sorted_by_date(emails)
+    return {
+        "account_name": data.get("account_name"),
+        "tenant_name": data.get("tenant_name"),
+        "calls": calls,
+        "emails": emails,
+        "account_id": account_id,
+        ORDINAL_KEYS["calls"]: call_ordinals,
+        ORDINAL_KEYS["emails"]: email_ordinals,
+    }
+
+
+@dataclass(slots=True)
+class _Entry:
+    """A cached account with the file signature it was parsed from."""
+
+    mtime_ns: int
+    size: int
+    payload: dict[str, Any]
+
+
+class AccountStore:
+    """In-process LRU store of projected account data.
+
+    The cap is on the total size of the files the resident accounts were
+    parsed from, which costs nothing to compute. It is not a memory cap:
+    parsed dicts, lists and strings take several times the bytes of their
+    JSON, so the cap should be set well below the memory to spare.
+    """
+
+    def __init__(self, data_dir: Path, max_bytes: int):
+        self.data_dir = data_dir
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def file_path(self, account_id: int) -> Path:
+        """Path of the account file (e.g., account_1.json)."""
+        return self.data_dir / f"account_{account_id}.json"
+
+    def get(self, account_id: int) -> dict[str, Any] | None:
+        """Return the projected account data, or None if it can't be loaded.
+
+        The returned dict is shared with the store and must not be mutated.
+        """
+        file_path = self.file_path(account_id)
+        try:
+            stat = file_path.stat()
+        except OSError:
+            self._drop(account_id)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if (
+                entry is not None
+                and entry.mtime_ns == stat.st_mtime_ns
+                and entry.size == stat.st_size
+            ):
+                self._entries.move_to_end(account_id)
+                self.hits += 1
+                return entry.payload
+            self.misses += 1
+
+        try:
+            with open(file_path) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self._drop(account_id)
+            return None
+
+        payload = project_account_data(account_id, data)
+        # The stat preceded the read: a file rewritten in between is seen as
+        # changed again on the next call, never the other way around
+        payload["version"] = file_version(stat)
+        self._put(account_id, _Entry(stat.st_mtime_ns, stat.st_size, payload))
+        return payload
+
+    def version(self, account_id: int) -> str | None:
+        """Return the version of the account's data, None if it has no file.
+
+        Only stats the file: cheap enough to revalidate cached copies.
+        """
+        try:
+            return file_version(self.file_path(account_id).stat())
+        except OSError:
+            return None
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and current memory usage."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """Drop all cached accounts."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _put(self, account_id: int, entry: _Entry) -> None:
+        with self._lock:
+            previous = self._entries.pop(account_id, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            if entry.size > self.max_bytes:
+                # Too big to keep resident, serve it uncached
+                logging.info(
+                    f"Account {account_id} ({entry.size} bytes) exceeds store cap"
+                )
+                return
+            self._entries[account_id] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def _drop(self, account_id: int) -> None:
+        with self._lock:
+            entry = self._entries.pop(account_id, None)
+            if entry is not None:
+                self._bytes -= entry.size
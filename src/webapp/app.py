@@ -5,7 +5,9 @@ Web interface that connects to the Agent API backend.
 
 import asyncio
 import os
+import threading
 from collections.abc import AsyncGenerator
+from contextlib import suppress
 from typing import Any
 
 import httpx
@@ -135,6 +137,13 @@ def fetch_accounts() -> Any:
         return []
 
 
+def warm_account(account_id: int) -> None:
+    """Ask the API to prefetch an account, ignoring failures."""
+    # The query still works without it, only slower
+    with suppress(requests.RequestException):
+        requests.post(f"{API_URL}/api/accounts/{account_id}/warm", timeout=60)
+
+
 def query_agent(account_id: int, user_query: str) -> Any:
     """Query the agent via API (non-streaming)."""
     response = requests.post(
@@ -195,11 +204,22 @@ def main() -> None:
 
     # Account selection
     account_options = {acc["name"]: acc["id"] for acc in accounts}
+
+    def on_account_selected() -> None:
+        # Prefetch while the question is typed, without blocking the page
+        name = st.session_state.get("selected_account")
+        if name in account_options:
+            threading.Thread(
+                target=warm_account, args=(account_options[name],), daemon=True
+            ).start()
+
     selected_account = st.selectbox(
         "Select Account",
         options=list(account_options.keys()),
         index=None,
         placeholder="Choose an account...",
+        key="selected_account",
+        on_change=on_account_selected,
     )
 
     # Query input
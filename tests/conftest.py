@@ -0,0 +1,94 @@
+"""Fixtures shared by the tests."""
+
+import json
+import os
+import socket
+import subprocess  # noqa: S404 - runs the server script
+import sys
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+SERVER_SCRIPT = Path(__file__).parents[1] / "src" / "mcp_server" / "server.py"
+
+
+class Server:
+    """The MCP server script, run in a subprocess so it can be restarted."""
+
+    def __init__(self, data_dir: Path, port: int):
+        self.data_dir = data_dir
+        self.port = port
+        self._process: subprocess.Popen[bytes] | None = None
+
+    @property
+    def url(self) -> str:
+        """URL of the MCP endpoint."""
+        return f"http://127.0.0.1:{self.port}/mcp"
+
+    def start(self) -> None:
+        """Start the server and wait until it accepts connections."""
+        env = {
+            **os.environ,
+            "DATA_DIR": str(self.data_dir),
+            "MCP_SERVER_PORT": str(self.port),
+            "APP_HOST": "127.0.0.1",
+        }
+        self._process = subprocess.Popen(  # noqa: S603 - the repo's own script
+            [sys.executable, str(SERVER_SCRIPT)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), 0.1).close()
+                return
+            except OSError:
+                assert self._process.poll() is None, "MCP server exited"
+                assert time.monotonic() < deadline, "MCP server didn't start"
+                time.sleep(0.05)
+
+    def stop(self) -> None:
+        """Stop the server."""
+        assert self._process is not None
+        self._process.terminate()
+        self._process.wait(10)
+
+
+@pytest.fixture
+def mcp_server(tmp_path: Path) -> Iterator[Server]:
+    """A running MCP server with one account (ID 1, "Acme")."""
+    account = {
+        "account_name": "Acme",
+        "calls": [
+            {
+                "date": "2024-03-01",
+                "transcript": "The CFO approved the budget.",
+                "topics": ["pricing"],
+            },
+            {
+                "date": "2024-03-08",
+                "transcript": "SSO rollout planned for April.",
+                "topics": ["security"],
+            },
+        ],
+        "emails": [
+            {
+                "date": "2024-03-04",
+                "content": "Sending the signed order form.",
+                "topics": ["pricing"],
+            }
+        ],
+    }
+    (tmp_path / "accounts").mkdir()
+    (tmp_path / "accounts" / "account_1.json").write_text(json.dumps(account))
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    running = Server(tmp_path, port)
+    running.start()
+    yield running
+    running.stop()
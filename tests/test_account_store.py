@@ -0,0 +1,96 @@
+"""Tests of the MCP server's resident account store."""
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from mcp_server.store import AccountStore
+
+
+def write_account(data_dir: Path, account_id: int, transcript: str) -> int:
+    """Write an account file with one call, return its size in bytes."""
+    data = {
+        "account_name": f"Account {account_id}",
+        "calls": [{"date": "2024-03-01", "transcript": transcript, "topics": []}],
+        "emails": [],
+    }
+    path = data_dir / f"account_{account_id}.json"
+    path.write_text(json.dumps(data))
+    return path.stat().st_size
+
+
+def content(payload: dict[str, Any] | None) -> str:
+    """Transcript of the account's call."""
+    assert payload is not None
+    return str(payload["calls"][0]["content"])
+
+
+def test_account_is_parsed_once_until_its_file_changes(tmp_path: Path) -> None:
+    """Repeated gets hit the store, a rewritten file is parsed again."""
+    write_account(tmp_path, 1, "first")
+    store = AccountStore(tmp_path, max_bytes=1 << 20)
+    first = store.get(1)
+    assert store.get(1) is first
+    assert store.stats()["hits"] == 1
+
+    path = tmp_path / "account_1.json"
+    write_account(tmp_path, 1, "later")
+    # Same size and a coarse clock would hide the change without a new mtime
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    payload = store.get(1)
+    assert content(payload) == "later"
+    assert payload is not None and payload["version"] == store.version(1)
+    assert store.stats()["misses"] == 2
+
+
+def test_version_changes_with_the_file(tmp_path: Path) -> None:
+    """Revalidation only needs the version, which follows the file."""
+    write_account(tmp_path, 1, "first")
+    store = AccountStore(tmp_path, max_bytes=1 << 20)
+    version = store.version(1)
+    write_account(tmp_path, 1, "a longer transcript")
+    assert store.version(1) != version
+    assert store.version(2) is None
+
+
+def test_least_recently_used_accounts_are_evicted(tmp_path: Path) -> None:
+    """Beyond the cap on file bytes, the least recently used account goes."""
+    size = write_account(tmp_path, 1, "one")
+    write_account(tmp_path, 2, "two")
+    write_account(tmp_path, 3, "six")
+    store = AccountStore(tmp_path, max_bytes=2 * size)
+    store.get(1)
+    store.get(2)
+    store.get(1)
+    store.get(3)
+    assert store.stats()["evictions"] == 1
+    assert store.stats()["bytes"] <= 2 * size
+
+    store.get(1)
+    store.get(3)
+    assert store.stats()["hits"] == 3
+    store.get(2)
+    assert store.stats()["misses"] == 4
+
+
+def test_oversized_accounts_are_served_uncached(tmp_path: Path) -> None:
+    """An account bigger than the cap is parsed on every get."""
+    size = write_account(tmp_path, 1, "one")
+    store = AccountStore(tmp_path, max_bytes=size - 1)
+    assert content(store.get(1)) == "one"
+    assert content(store.get(1)) == "one"
+    assert store.stats()["entries"] == 0
+    assert store.stats()["misses"] == 2
+
+
+def test_removed_accounts_are_dropped(tmp_path: Path) -> None:
+    """A deleted file is not served from the store."""
+    write_account(tmp_path, 1, "one")
+    store = AccountStore(tmp_path, max_bytes=1 << 20)
+    store.get(1)
+    (tmp_path / "account_1.json").unlink()
+    assert store.get(1) is None
+    assert store.stats()["entries"] == 0
+    assert store.stats()["bytes"] == 0
@@ -0,0 +1,49 @@
+"""Tests of the agent API, against a local MCP server and the stub LLM."""
+
+from collections.abc import Iterator
+
+import pytest
+from conftest import Server
+from fastapi.testclient import TestClient
+
+from agent import api, graph
+from agent.nodes import mcp
+from agent.nodes.final_answer import answer_cache
+
+
+@pytest.fixture
+def client(mcp_server: Server, monkeypatch: pytest.MonkeyPatch) -> Iterator[TestClient]:
+    """An API client whose agent reads the test server's data."""
+    mcp_client = mcp.MCPClient(mcp_server.url)
+    monkeypatch.setattr(mcp, "mcp_client", mcp_client)
+    monkeypatch.setattr(api, "mcp_client", mcp_client)
+    monkeypatch.setattr(graph, "LLM_PROVIDER", "stub")
+    mcp.account_cache.clear()
+    answer_cache.clear()
+    with TestClient(api.app) as test_client:
+        yield test_client
+    mcp.account_cache.clear()
+    answer_cache.clear()
+    mcp_client.pool.close()
+
+
+def test_warmed_accounts_are_queried_without_a_fetch(client: TestClient) -> None:
+    """Warming indexes the account, the first query then uses the cache."""
+    response = client.post("/api/accounts/1/warm")
+    assert response.status_code == 200
+    assert response.json() == {"account_id": 1, "interactions": 3}
+    assert 1 in mcp.account_cache
+
+    fetches = mcp.account_fetches.stats()["calls"]
+    response = client.post(
+        "/api/query", json={"account_id": 1, "user_query": "Any news on SSO?"}
+    )
+    assert response.status_code == 200
+    assert mcp.account_fetches.stats()["calls"] == fetches
+
+
+def test_warming_a_missing_account_is_not_found(client: TestClient) -> None:
+    """Accounts without data get a 404 and aren't cached."""
+    response = client.post("/api/accounts/999/warm")
+    assert response.status_code == 404
+    assert 999 not in mcp.account_cache
@@ -0,0 +1,108 @@
+"""Tests of the TTL cache and the client-side account cache built on it."""
+
+import json
+import os
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from conftest import Server
+
+from agent.cache import TTLCache
+from agent.nodes import mcp
+
+
+def test_entries_expire_after_the_ttl() -> None:
+    """Expired entries are not returned but kept for revalidation."""
+    values: TTLCache[str, int] = TTLCache(max_bytes=100, ttl=0.2)
+    values.put("a", 1, version="v1")
+    assert values.get("a") == 1
+    time.sleep(0.3)
+    assert values.get("a") is None
+    entry = values.entry("a")
+    assert entry is not None and entry.version == "v1"
+
+    assert values.touch("a") == 1
+    assert values.get("a") == 1
+    assert values.touch("b") is None
+    assert values.stats()["hits"] == 3
+    assert values.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entries_are_evicted() -> None:
+    """Beyond the cap on summed sizes, the least recently used entries go."""
+    values: TTLCache[str, int] = TTLCache(max_bytes=10, ttl=60)
+    values.put("a", 1, size=4)
+    values.put("b", 2, size=4)
+    assert values.get("a") == 1
+    values.put("c", 3, size=4)
+    assert "b" not in values
+    assert values.get("a") == 1
+    assert values.get("c") == 3
+
+    # Replacing an entry releases its old size
+    values.put("c", 4, size=6)
+    assert values.stats()["bytes"] == 10
+    assert values.stats()["evictions"] == 1
+
+
+def test_values_over_the_cap_are_not_stored() -> None:
+    """Too large a value isn't stored and drops the key's previous value."""
+    values: TTLCache[str, int] = TTLCache(max_bytes=10, ttl=60)
+    values.put("a", 1, size=4)
+    values.put("a", 2, size=11)
+    assert values.get("a") is None
+    assert values.stats()["bytes"] == 0
+
+    disabled: TTLCache[str, int] = TTLCache(max_bytes=0, ttl=60)
+    disabled.put("a", 1)
+    assert disabled.get("a") is None
+    assert disabled.stats()["misses"] == 1
+
+
+@pytest.fixture
+def tool_calls(mcp_server: Server, monkeypatch: pytest.MonkeyPatch) -> Iterator[Any]:
+    """Names of the tools called by a client of the test server."""
+    client = mcp.MCPClient(mcp_server.url)
+    called: list[str] = []
+    call_tool = client.call_tool
+
+    def recording_call_tool(tool_name: str, arguments: dict[str, Any]) -> str:
+        called.append(tool_name)
+        return call_tool(tool_name, arguments)
+
+    monkeypatch.setattr(client, "call_tool", recording_call_tool)
+    monkeypatch.setattr(mcp, "mcp_client", client)
+    mcp.account_cache.clear()
+    yield called
+    mcp.account_cache.clear()
+    client.pool.close()
+
+
+def test_accounts_are_fetched_once(tool_calls: list[str]) -> None:
+    """Fresh cached accounts are used without calling the server."""
+    data = mcp.load_account(1)
+    assert data is not None and len(data.calls) == 2
+    assert mcp.load_account(1) is data
+    assert tool_calls == ["calls_emails"]
+
+
+def test_expired_accounts_are_revalidated(
+    tool_calls: list[str], mcp_server: Server, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """An unchanged account is only checked, a changed one fetched again."""
+    monkeypatch.setattr(mcp.account_cache, "ttl", 0)
+    data = mcp.load_account(1)
+    assert mcp.load_account(1) is data
+    assert tool_calls == ["calls_emails", "account_version"]
+
+    path = mcp_server.data_dir / "accounts" / "account_1.json"
+    account = json.loads(path.read_text())
+    account["calls"].pop()
+    path.write_text(json.dumps(account))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    changed = mcp.load_account(1)
+    assert changed is not None and len(changed.calls) == 1
+    assert tool_calls[2:] == ["account_version", "calls_emails"]
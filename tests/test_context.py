@@ -0,0 +1,129 @@
+"""Tests of the final answer context assembly."""
+
+from agent.config import Call, PlanSeries, ToolCall, ToolName
+from agent.context import ELISION, build_context, estimate_tokens, interaction_id
+
+PLANS = [PlanSeries(steps=[], title="First"), PlanSeries(steps=[], title="Second")]
+
+FILLER = "The team walked through the onboarding checklist together. " * 12
+
+
+def _plan(tool: ToolName, **params: str | list[str]) -> list[PlanSeries]:
+    return [PlanSeries(steps=[ToolCall(tool=tool, params=params)], title="Plan")]
+
+
+def test_interaction_matched_by_several_plans_is_written_once() -> None:
+    """Later plans refer to the shared interaction by its ID."""
+    shared = Call(date="2024-03-01", content="Budget approved by the CFO.", topics=[])
+    other = Call(date="2024-03-02", content="Security review scheduled.", topics=[])
+    context = build_context("budget", PLANS, [[shared], [shared, other]], budget=0)
+    assert context.count(shared.content) == 1
+    assert f"[{interaction_id(shared)}]" in context
+    assert other.content in context
+
+
+def test_distinct_interactions_are_never_merged() -> None:
+    """Deduplication is by content, not by the (shorter) printed ID."""
+    calls = [
+        Call(date="2024-03-01", content=f"Call number {n}.", topics=[])
+        for n in range(8000)
+    ]
+    context = build_context("calls", PLANS, [calls, calls[::-1]], budget=0)
+    assert all(call.content in context for call in calls)
+    assert len({interaction_id(call) for call in calls}) == len(calls)
+
+
+def test_keyword_plan_keeps_the_matching_passages() -> None:
+    """Long interactions are cut to the sentences around the keywords."""
+    call = Call(
+        date="2024-03-01",
+        content=f"{FILLER}Pricing for the renewal was discussed. {FILLER}",
+        topics=[],
+    )
+    plans = _plan("filter_by_keywords", keywords=["pricing"])
+    context = build_context("what about pricing", plans, [[call]], budget=0)
+    assert "Pricing for the renewal was discussed." in context
+    assert ELISION in context
+    assert call.content not in context
+
+
+def test_question_terms_match_whole_words() -> None:
+    """A question term inside a longer word doesn't keep its sentence."""
+    call = Call(
+        date="2024-03-01",
+        content=f"{FILLER}Pricing was discussed. {FILLER}Legal reviewed the renewals.",
+        topics=[],
+    )
+    plans = _plan("filter_by_keywords", keywords=["pricing"])
+    context = build_context("pricing of the renewal", plans, [[call]], budget=0)
+    assert "Pricing was discussed." in context
+    assert "renewals" not in context
+
+
+def test_incidental_question_term_hits_keep_the_full_text() -> None:
+    """Without a keyword hit, the interaction is written whole."""
+    call = Call(
+        date="2024-03-01",
+        content=f"{FILLER}The renewal date moved. {FILLER}",
+        topics=[],
+    )
+    plans = _plan("semantic_search", query="contract extension")
+    context = build_context("when is the renewal", plans, [[call]], budget=0)
+    assert call.content.strip() in context
+
+
+def test_topic_plans_are_not_windowed() -> None:
+    """Interactions matched by topic only are written whole."""
+    call = Call(
+        date="2024-03-01",
+        content=f"{FILLER}Their main pain point is latency. {FILLER}",
+        topics=["pain_points"],
+    )
+    plans = _plan("filter_by_topics", topics=["pain_points"])
+    context = build_context("what are the pain points", plans, [[call]], budget=0)
+    assert call.content.strip() in context
+
+
+def _calls(n_calls: int) -> list[Call]:
+    """Calls on consecutive days, about nothing in particular."""
+    return [
+        Call(date=f"2024-03-{day + 1:02d}", content=f"Call {day}. {FILLER}", topics=[])
+        for day in range(n_calls)
+    ]
+
+
+def test_least_relevant_interactions_are_dropped_over_the_budget() -> None:
+    """The best ranked interactions are kept, the others counted."""
+    calls = _calls(20)
+    calls[3] = Call(date="2024-03-04", content="The SSO rollout slipped.", topics=[])
+    calls[7] = Call(date="2024-03-08", content=f"Call 7. {FILLER}", topics=["Timeline"])
+    plans = [
+        PlanSeries(steps=[], title="All calls"),
+        PlanSeries(steps=[], title="Number of calls"),
+    ]
+    context = build_context(
+        "what is the timeline of the SSO rollout", plans, [calls, 20], budget=600
+    )
+    assert estimate_tokens(context) <= 600
+    assert context.startswith("All calls\n")
+    assert "Number of calls: \n   20" in context
+    assert calls[3].content in context
+    assert calls[7].content.strip() in context
+    # Recency breaks the tie between the other calls
+    assert calls[19].content.strip() in context
+    assert calls[0].content.strip() not in context
+    kept = context.count(FILLER.strip())
+    assert f"({20 - 1 - kept} less relevant interactions omitted)" in context
+    # Kept interactions stay in date order
+    positions = [context.index(calls[n].content.strip()) for n in (3, 7, 19)]
+    assert positions == sorted(positions)
+
+
+def test_interactions_within_the_budget_are_all_kept() -> None:
+    """No interaction is dropped under the budget or without one."""
+    calls = _calls(5)
+    tokens = estimate_tokens(build_context("calls", PLANS[:1], [calls], budget=0))
+    for budget in (0, tokens + 10):
+        context = build_context("calls", PLANS[:1], [calls], budget=budget)
+        assert all(call.content.strip() in context for call in calls)
+        assert "omitted" not in context
@@ -0,0 +1,148 @@
+"""Tests of the agent graph, sync and async, with the stub LLM."""
+
+import asyncio
+import gc
+import os
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from conftest import Server
+
+from agent import graph, llm_utils
+from agent.main import arun_agent, run_agent, stream_agent
+from agent.nodes import mcp
+from agent.nodes.final_answer import answer_cache
+
+# Delay before the stub LLM's first token
+TTFT_SECONDS = 0.2
+
+
+@pytest.fixture
+def agent_graph(mcp_server: Server, monkeypatch: pytest.MonkeyPatch) -> Iterator[Any]:
+    """Build a graph reading the test server's data and answering with the stub."""
+    client = mcp.MCPClient(mcp_server.url)
+    monkeypatch.setattr(mcp, "mcp_client", client)
+    monkeypatch.setattr(graph, "LLM_PROVIDER", "stub")
+    monkeypatch.setattr(llm_utils, "STUB_LLM_TTFT_SECONDS", TTFT_SECONDS)
+    monkeypatch.setattr(llm_utils, "STUB_LLM_TOKENS_PER_SECOND", 10_000)
+    mcp.account_cache.clear()
+    answer_cache.clear()
+    yield graph.create_agent_graph(streaming=False)
+    mcp.account_cache.clear()
+    answer_cache.clear()
+    client.pool.close()
+
+
+def test_async_graph_answers_like_the_sync_graph(agent_graph: Any) -> None:
+    """`ainvoke` runs the same nodes as `invoke`."""
+    question = "What did they say about the budget?"
+    answer = asyncio.run(arun_agent(agent_graph, question, 1))
+    assert answer.startswith("Stub answer to:")
+    answer_cache.clear()
+    assert run_agent(agent_graph, question, 1) == answer
+
+
+def test_missing_accounts_end_the_run(agent_graph: Any) -> None:
+    """An account without data gets the not-found response."""
+    answer = asyncio.run(arun_agent(agent_graph, "Any news?", 999))
+    assert answer == mcp.NOT_FOUND["final_response"]
+
+
+def test_concurrent_queries_dont_block_the_event_loop(agent_graph: Any) -> None:
+    """Queries overlap on one loop, which keeps serving other tasks."""
+    n_queries = 6
+
+    async def run() -> tuple[list[str], float, float]:
+        # Warm-up: regexes compiled on first use, connections opened
+        await arun_agent(agent_graph, "What happened in the first meeting?", 1)
+        # Collections of the long-lived objects would pause the loop too
+        gc.freeze()
+        gaps = []
+
+        async def tick() -> None:
+            while True:
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                gaps.append(time.perf_counter() - start)
+
+        ticker = asyncio.create_task(tick())
+        start = time.perf_counter()
+        try:
+            answers = await asyncio.gather(
+                *(
+                    arun_agent(agent_graph, f"What happened in meeting {n}?", 1)
+                    for n in range(n_queries)
+                )
+            )
+        finally:
+            ticker.cancel()
+            gc.unfreeze()
+        elapsed = time.perf_counter() - start
+        return answers, elapsed, max(gaps)
+
+    answers, elapsed, max_gap = asyncio.run(run())
+    assert all(answer.startswith("Stub answer to:") for answer in answers)
+    # Serially, the planner and answer LLM calls alone would take longer
+    assert elapsed < n_queries * 2 * TTFT_SECONDS
+    assert max_gap < TTFT_SECONDS / 2
+
+
+def test_streamed_tokens_make_up_the_answer(agent_graph: Any) -> None:
+    """`astream` yields the final answer's tokens as they are generated."""
+    streaming_graph = graph.create_agent_graph(streaming=True)
+    question = "What did they say about SSO?"
+
+    async def collect() -> list[str]:
+        return [token async for token in stream_agent(streaming_graph, question, 1)]
+
+    tokens = asyncio.run(collect())
+    assert len(tokens) > 1
+    answer_cache.clear()
+    assert "".join(tokens) == asyncio.run(arun_agent(agent_graph, question, 1))
+
+
+def test_repeated_questions_are_answered_from_the_cache(agent_graph: Any) -> None:
+    """A rephrasing of an answered question skips the answer LLM call."""
+    answer = run_agent(agent_graph, "What did they say about SSO?", 1)
+    hits = answer_cache.stats()["hits"]
+    start = time.perf_counter()
+    assert run_agent(agent_graph, "what did they say about  SSO", 1) == answer
+    assert time.perf_counter() - start < TTFT_SECONDS
+    assert answer_cache.stats()["hits"] == hits + 1
+
+
+def test_cached_answers_are_replayed_as_tokens(agent_graph: Any) -> None:
+    """A streaming graph streams a cached answer like a generated one."""
+    question = "What did they say about the budget?"
+    answer = run_agent(agent_graph, question, 1)
+    hits = answer_cache.stats()["hits"]
+    streaming_graph = graph.create_agent_graph(streaming=True)
+
+    async def collect() -> list[str]:
+        return [token async for token in stream_agent(streaming_graph, question, 1)]
+
+    tokens = asyncio.run(collect())
+    assert len(tokens) > 1
+    assert "".join(tokens) == answer
+    assert answer_cache.stats()["hits"] == hits + 1
+
+
+def test_new_account_data_invalidates_cached_answers(
+    agent_graph: Any, mcp_server: Server, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Answers are cached by data version, changed data is answered again."""
+    monkeypatch.setattr(mcp.account_cache, "ttl", 0)
+    question = "What did they say about SSO?"
+    run_agent(agent_graph, question, 1)
+    hits = answer_cache.stats()["hits"]
+    run_agent(agent_graph, question, 1)
+    assert answer_cache.stats()["hits"] == hits + 1
+
+    path = mcp_server.data_dir / "accounts" / "account_1.json"
+    path.write_text(path.read_text().replace("April", "May"))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    run_agent(agent_graph, question, 1)
+    assert answer_cache.stats()["hits"] == hits + 1
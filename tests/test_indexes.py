@@ -0,0 +1,153 @@
+"""Tests of the columnar account index."""
+
+import math
+import random
+import re
+from collections import Counter
+
+import numpy as np
+import numpy.typing as npt
+
+from agent.config import Call, Email
+from agent.indexes import AccountIndex, KeywordIndex, SemanticIndex, TopicVocabulary
+
+WORDS = ["Budget", "budgets", "re-review", "CFO's", "api", "rapid", "pilot.", "v2.1"]
+
+
+def random_texts(rng: random.Random, n_texts: int) -> list[str]:
+    """Texts of random words, punctuation and line breaks."""
+    separators = [" ", " ", ", ", ".\n", "? "]
+    return [
+        "".join(
+            rng.choice(WORDS) + rng.choice(separators)
+            for _ in range(rng.randint(0, 15))
+        )
+        for _ in range(n_texts)
+    ]
+
+
+def random_keywords(rng: random.Random, texts: list[str]) -> list[str]:
+    """Substrings of the texts (within or across words) and unknown words."""
+    keywords = ["missing", "get re", "-", "..."]
+    for text in rng.sample(texts, 40):
+        start = rng.randrange(len(text) + 1)
+        keywords.append(text[start : start + rng.randint(1, 20)].upper())
+    return [keyword for keyword in keywords if keyword.strip()]
+
+
+def test_keyword_search_matches_substrings() -> None:
+    """The index finds the same documents as a case-insensitive `in`."""
+    rng = random.Random(0)  # noqa: S311 - reproducible test data
+    texts = random_texts(rng, 2000)
+    index = KeywordIndex(texts)
+    for keyword in random_keywords(rng, texts):
+        expected = np.array([keyword.lower() in text.lower() for text in texts])
+        assert np.array_equal(index.search([keyword]), expected), keyword
+
+
+def test_keyword_search_within_a_selection() -> None:
+    """Small selections are scanned, large ones looked up, with equal results."""
+    rng = random.Random(1)  # noqa: S311 - reproducible test data
+    texts = random_texts(rng, 3000)
+    index = KeywordIndex(texts)
+    keywords = random_keywords(rng, texts)
+    for selected in (10, 2500):
+        within = np.zeros(len(texts), dtype=bool)
+        within[rng.sample(range(len(texts)), selected)] = True
+        for start in range(0, len(keywords), 3):
+            group = keywords[start : start + 3]
+            expected = within & np.array(
+                [any(k.lower() in text.lower() for k in group) for text in texts]
+            )
+            assert np.array_equal(index.search(group, within), expected), group
+
+
+def test_topic_masks_span_several_words() -> None:
+    """Topics beyond the 64th use further bitmap words, like the first ones."""
+    rng = random.Random(2)  # noqa: S311 - reproducible test data
+    topics = [f"topic_{n}" for n in range(150)]
+    calls = [
+        Call(date="2024-03-01", content="", topics=rng.sample(topics, 3))
+        for _ in range(200)
+    ]
+    emails = [Email(date="2024-03-02", content="", topics=[]) for _ in range(10)]
+    index = AccountIndex(calls, emails, vocabulary=TopicVocabulary())
+    for _ in range(50):
+        query = {*rng.sample(topics, 4), "unknown"}
+        expected = [
+            bool(query.intersection(item.topics)) for item in index.interactions
+        ]
+        assert index.topic_mask(query).tolist() == expected
+    counts = {topic: sum(topic in call.topics for call in calls) for topic in topics}
+    assert index.topic_frequencies == {t: n for t, n in counts.items() if n}
+
+
+def test_topics_interned_after_an_index_was_built() -> None:
+    """Accounts share the vocabulary, a newer topic matches nothing in older ones."""
+    vocabulary = TopicVocabulary()
+    first = AccountIndex(
+        [Call(date="2024-03-01", content="", topics=["pricing"])], [], vocabulary
+    )
+    second = AccountIndex(
+        [Call(date="2024-03-01", content="", topics=[f"t{n}" for n in range(100)])],
+        [],
+        vocabulary,
+    )
+    assert first.topic_mask(["t99", "pricing"]).tolist() == [True]
+    assert first.topic_mask(["t99"]).tolist() == [False]
+    assert second.topic_mask(["t99"]).tolist() == [True]
+    assert second.topic_counts(np.zeros(1, dtype=bool)) == {}
+
+
+def tfidf_scores(texts: list[str], query: str) -> npt.NDArray[np.float64]:
+    """Cosine similarities of sublinear TF-IDF vectors, computed densely."""
+    documents = [Counter(re.findall(r"\w+", text.lower())) for text in texts]
+    vocabulary = sorted(set().union(*documents))
+    idf = {
+        term: math.log((1 + len(texts)) / (1 + sum(term in d for d in documents))) + 1
+        for term in vocabulary
+    }
+
+    def vector(counts: Counter[str]) -> npt.NDArray[np.float64]:
+        weights = np.array(
+            [
+                (1 + math.log(counts[term])) * idf[term] if counts[term] else 0.0
+                for term in vocabulary
+            ]
+        )
+        norm = np.linalg.norm(weights)
+        return weights / norm if norm else weights
+
+    query_vector = vector(Counter(re.findall(r"\w+", query.lower())))
+    return np.array([vector(counts) @ query_vector for counts in documents])
+
+
+def test_semantic_search_ranks_by_cosine_similarity() -> None:
+    """The top k documents sharing a term with the query, optionally within."""
+    rng = random.Random(3)  # noqa: S311 - reproducible test data
+    texts = random_texts(rng, 300)
+    index = SemanticIndex(texts)
+    within = np.array([rng.random() < 0.5 for _ in texts])
+    for query in ["budget", "rapid pilot api", "CFO's budgets budgets", "unknown"]:
+        expected = tfidf_scores(texts, query)
+        assert np.allclose(index.scores(query), expected), query
+        for k, selection in [(10, None), (1000, None), (10, within)]:
+            scores = expected if selection is None else np.where(selection, expected, 0)
+            mask = index.search(query, k, selection)
+            assert mask.sum() == min(k, np.count_nonzero(scores > 0))
+            assert not mask[scores <= 0].any()
+            if mask.any() and not mask.all():
+                # Ties at the cut-off may go either way
+                assert scores[mask].min() >= scores[~mask].max() - 1e-9
+
+
+def test_semantic_index_is_built_on_the_first_search() -> None:
+    """Accounts that are never searched don't build the TF-IDF index."""
+    calls = [
+        Call(date="2024-03-01", content="SSO rollout planned.", topics=[]),
+        Call(date="2024-03-02", content="Budget approved.", topics=[]),
+    ]
+    index = AccountIndex(calls, [])
+    assert "semantic" not in vars(index)
+    assert index.semantic_mask("sso", k=5).tolist() == [True, False]
+    assert "semantic" in vars(index)
@@ -0,0 +1,82 @@
+"""Tests of the MCP server's account manifest."""
+
+import json
+import os
+from pathlib import Path
+
+from mcp_server.manifest import AccountManifest
+
+
+def write_account(data_dir: Path, account_id: int, name: str, n_calls: int) -> Path:
+    """Write an account file with some dated calls."""
+    data = {
+        "account_name": name,
+        "tenant_name": "Tenant",
+        "calls": [
+            {"date": f"2024-03-{day + 1:02d}", "transcript": "..."}
+            for day in range(n_calls)
+        ],
+        "emails": [],
+    }
+    path = data_dir / f"account_{account_id}.json"
+    path.write_text(json.dumps(data))
+    return path
+
+
+def manifest(data_dir: Path, refresh_interval: float = 0) -> AccountManifest:
+    """A manifest of the directory, persisted in it."""
+    return AccountManifest(
+        data_dir,
+        manifest_path=data_dir / "manifest.json",
+        refresh_interval=refresh_interval,
+    )
+
+
+def test_accounts_are_listed_by_id_or_name_prefix(tmp_path: Path) -> None:
+    """Pages follow the ids, prefix searches the case-folded names."""
+    for account_id, name in [(3, "Globex"), (1, "Acme"), (2, "acme labs")]:
+        write_account(tmp_path, account_id, name, n_calls=account_id)
+    accounts = manifest(tmp_path)
+    assert [a["id"] for a in accounts.list_accounts()] == [1, 2, 3]
+    assert [a["id"] for a in accounts.list_accounts(offset=1, limit=1)] == [2]
+    assert [a["name"] for a in accounts.list_accounts(name_prefix="ACME")] == [
+        "Acme",
+        "acme labs",
+    ]
+    assert accounts.list_accounts(name_prefix="Initech") == []
+    record = accounts.get(3)
+    assert record is not None
+    assert record["calls"] == 3
+    assert record["last_interaction"] == "2024-03-03"
+
+
+def test_refresh_rereads_only_changed_files(tmp_path: Path) -> None:
+    """New, modified and removed files are picked up by a rescan."""
+    write_account(tmp_path, 1, "Acme", n_calls=1)
+    write_account(tmp_path, 2, "Globex", n_calls=1)
+    accounts = manifest(tmp_path, refresh_interval=3600)
+    accounts.refresh(force=True)
+
+    write_account(tmp_path, 1, "Acme", n_calls=2)
+    (tmp_path / "account_2.json").unlink()
+    write_account(tmp_path, 3, "Initech", n_calls=1)
+    # Not rescanned before the refresh interval
+    assert [a["id"] for a in accounts.list_accounts()] == [1, 2]
+
+    accounts.refresh(force=True)
+    assert [a["id"] for a in accounts.list_accounts()] == [1, 3]
+    record = accounts.get(1)
+    assert record is not None and record["calls"] == 2
+
+
+def test_manifest_is_reused_across_restarts(tmp_path: Path) -> None:
+    """Unchanged files are not parsed again by a new manifest."""
+    path = write_account(tmp_path, 1, "Acme", n_calls=1)
+    manifest(tmp_path).refresh(force=True)
+    stat = path.stat()
+
+    # Same size and mtime: the recorded summary is trusted
+    write_account(tmp_path, 1, "Acmf", n_calls=1)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    record = manifest(tmp_path).get(1)
+    assert record is not None and record["name"] == "Acme"
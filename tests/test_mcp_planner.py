@@ -0,0 +1,74 @@
+"""Tests of the node running the mcp and planner nodes concurrently."""
+
+import asyncio
+import threading
+import time
+from typing import Any
+
+from langchain_core.runnables import RunnableLambda
+
+from agent.main import create_initial_state
+from agent.nodes.mcp import NOT_FOUND
+from agent.nodes.mcp_planner import create_mcp_planner_node
+
+PLANS: dict[str, Any] = {"plans": []}
+FOUND: dict[str, Any] = {"calls": [], "emails": [], "end": False}
+
+
+def mcp_node(update: dict[str, Any]) -> RunnableLambda[Any, dict[str, Any]]:
+    """An mcp node returning a fixed update."""
+
+    async def afetch(state: Any) -> dict[str, Any]:
+        return update
+
+    return RunnableLambda(lambda state: update, afunc=afetch)
+
+
+def test_planner_is_cancelled_when_the_account_has_no_data() -> None:
+    """The in-flight planner task is cancelled, not awaited to completion."""
+    events: list[str] = []
+
+    async def aplan(state: Any) -> dict[str, Any]:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        events.append("completed")
+        return PLANS
+
+    planner = RunnableLambda(lambda state: PLANS, afunc=aplan)
+    node = create_mcp_planner_node(mcp_node(NOT_FOUND), planner)
+    start = time.perf_counter()
+    update = asyncio.run(node.ainvoke(create_initial_state("Question", 1)))
+    assert update == NOT_FOUND
+    assert events == ["cancelled"]
+    assert time.perf_counter() - start < 5
+
+
+def test_sync_node_doesnt_wait_for_the_planner_without_data() -> None:
+    """The sync node returns without the planner's result."""
+    release = threading.Event()
+
+    def plan(state: Any) -> dict[str, Any]:
+        release.wait(10)
+        return PLANS
+
+    node = create_mcp_planner_node(mcp_node(NOT_FOUND), RunnableLambda(plan))
+    try:
+        assert node.invoke(create_initial_state("Question", 1)) == NOT_FOUND
+    finally:
+        release.set()
+
+
+def test_updates_are_merged_when_the_account_has_data() -> None:
+    """The data and the plans both update the state."""
+
+    async def aplan(state: Any) -> dict[str, Any]:
+        return PLANS
+
+    planner = RunnableLambda(lambda state: PLANS, afunc=aplan)
+    node = create_mcp_planner_node(mcp_node(FOUND), planner)
+    state = create_initial_state("Question", 1)
+    assert asyncio.run(node.ainvoke(state)) == {**FOUND, **PLANS}
+    assert node.invoke(state) == {**FOUND, **PLANS}
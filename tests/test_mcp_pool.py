@@ -0,0 +1,64 @@
+"""Tests of the pooled MCP client sessions, against a local MCP server."""
+
+import asyncio
+import json
+
+import pytest
+from conftest import Server
+
+from agent.mcp_pool import MCPSessionPool
+
+
+def account_name(pool: MCPSessionPool) -> str:
+    """Fetch account 1 through the pool."""
+    result = pool.run(pool.call_tool("calls_emails", {"account_id": 1}))
+    return str(json.loads(result.content[0].text)["account_name"])  # type: ignore[union-attr]
+
+
+def test_sessions_are_reused_across_calls(mcp_server: Server) -> None:
+    """Sequential calls share one initialized session."""
+    pool = MCPSessionPool(mcp_server.url, size=2)
+    try:
+        assert [account_name(pool) for _ in range(5)] == ["Acme"] * 5
+        assert pool.run(pool.list_tools()) >= {"calls_emails", "execute_plans"}
+        assert pool.stats()["connects"] == 1
+        assert pool.stats()["idle_sessions"] == 1
+    finally:
+        pool.close()
+
+
+def test_concurrent_calls_are_bounded_by_the_pool_size(mcp_server: Server) -> None:
+    """Concurrent callers wait for a free session instead of opening more."""
+    pool = MCPSessionPool(mcp_server.url, size=2)
+
+    async def call_many() -> list[object]:
+        return await asyncio.gather(
+            *(
+                pool.arun(pool.call_tool("account_version", {"account_id": 1}))
+                for _ in range(8)
+            )
+        )
+
+    try:
+        results = asyncio.run(call_many())
+        assert len(results) == 8
+        assert pool.stats()["connects"] <= 2
+    finally:
+        pool.close()
+
+
+def test_calls_reconnect_after_a_server_restart(mcp_server: Server) -> None:
+    """Sessions broken by a restart are replaced, calls succeed again."""
+    pool = MCPSessionPool(mcp_server.url, size=1, timeout=10)
+    try:
+        assert account_name(pool) == "Acme"
+        mcp_server.stop()
+        # The transport's error types vary
+        with pytest.raises(Exception):  # noqa: B017
+            account_name(pool)
+        assert pool.stats()["reconnects"] == 1
+        mcp_server.start()
+        assert account_name(pool) == "Acme"
+        assert pool.stats()["connects"] == 2
+    finally:
+        pool.close()
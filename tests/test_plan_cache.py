@@ -0,0 +1,52 @@
+"""Tests of the planner result cache."""
+
+import asyncio
+from pathlib import Path
+
+from agent.config import PlannerOutput, PlanSeries, ToolCall
+from agent.plan_cache import MemoryPlanStore, PlanCache, SQLitePlanStore
+
+OUTPUT = PlannerOutput(
+    plans=[
+        PlanSeries(
+            steps=[ToolCall(tool="filter_by_keywords", params={"keywords": ["C++"]})],
+            title="C++ mentions",
+        )
+    ]
+)
+
+
+def test_questions_differing_by_a_symbol_have_different_entries() -> None:
+    """ "C++" and "C" are different questions, "?" doesn't make one."""
+    cache = PlanCache(MemoryPlanStore(max_entries=10, ttl=60))
+    cache.put("What did they say about C++?", OUTPUT)
+    assert cache.get("What did they say about C?") is None
+    assert cache.get("What did they say about C#?") is None
+    assert cache.get("what did they say about  C++") == OUTPUT
+
+
+def test_dates_are_instantiated_per_question() -> None:
+    """Questions differing only by their dates share an entry."""
+    cache = PlanCache(MemoryPlanStore(max_entries=10, ttl=60))
+    step = ToolCall(
+        tool="filter_by_date", params={"operator": "<", "date": "2024-03-01"}
+    )
+    cache.put(
+        "Calls before 2024-03-01?",
+        PlannerOutput(plans=[PlanSeries(steps=[step], title="Before")]),
+    )
+    output = cache.get("Calls before March 5, 2024?")
+    assert output is not None
+    assert output.plans[0].steps[0].params == {"operator": "<", "date": "2024-03-05"}
+
+
+def test_sqlite_store_from_async_code(tmp_path: Path) -> None:
+    """The async methods work with the SQLite store, run in a thread."""
+    cache = PlanCache(SQLitePlanStore(tmp_path / "plans.db", max_entries=10, ttl=60))
+
+    async def roundtrip() -> PlannerOutput | None:
+        await cache.aput("What about C++?", OUTPUT)
+        return await cache.aget("what about c++")
+
+    assert asyncio.run(roundtrip()) == OUTPUT
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,326 @@
+"""Tests of plan execution against the original list-based executor.
+
+The reference below is the executor the agent started with: it rescans and
+copies interaction lists on every step. Every optimized executor must return
+the same interactions (in any order) and counts on random accounts and plans.
+"""
+
+import random
+from typing import Any
+
+import numpy as np
+import pytest
+
+from agent import parallel
+from agent.config import Call, Email, PlanSeries, ToolCall, ToolName
+from agent.indexes import AccountIndex, date_bounds, date_ordinal
+from agent.nodes.plan_executer import (
+    evaluate_branch,
+    execute_plan_series,
+    execute_plans,
+)
+from agent.plan_optimizer import PlanNode, optimize_plans, step_key
+from mcp_server.plans import Plan, Rows, execute_plan
+from mcp_server.store import ORDINAL_KEYS, project_account_data
+
+TOPICS = ["pricing", "security", "onboarding", "renewal", "support"]
+WORDS = ["budget", "contract", "CFO", "latency", "rollout", "pilot", "SSO", "api"]
+KEYWORDS = [*WORDS, "budget review", "pilot.", "sso", "ap", "tract", "?"]
+
+type Result = list[Call | Email] | int
+
+
+def reference_tool(
+    calls: list[Call], emails: list[Email], step: ToolCall
+) -> list[Call | Email]:
+    """Run a step of a plan on lists of interactions, like the original tools."""
+    params: dict[str, Any] = step.params or {}
+    interactions: list[Call | Email] = [*calls, *emails]
+    if step.tool == "filter_by_topics":
+        topics = set(params["topics"])
+        return [item for item in interactions if topics.intersection(item.topics)]
+    if step.tool == "filter_by_date":
+        operator, date = params["operator"], params["date"]
+        if operator == "=":
+            return [item for item in interactions if item.date == date]
+        if operator == "<":
+            return [item for item in interactions if item.date < date]
+        return [item for item in interactions if item.date > date]
+    if step.tool == "take_last_element":
+        return [*calls[-1:], *emails[-1:]]
+    if step.tool == "filter_by_keywords":
+        return [
+            item
+            for item in interactions
+            if any(
+                keyword.lower() in item.content.lower()
+                for keyword in params["keywords"]
+            )
+        ]
+    raise ValueError(f"Tool {step.tool} not found in registry.")
+
+
+def reference_execute(
+    calls: list[Call], emails: list[Email], plan: PlanSeries
+) -> Result:
+    """Execute a plan by filtering interaction lists step by step."""
+    for step in plan.steps:
+        if step.tool == "compute_len":
+            return len(calls) + len(emails)
+        result = reference_tool(calls, emails, step)
+        calls = [item for item in result if isinstance(item, Call)]
+        emails = [item for item in result if isinstance(item, Email)]
+    return [*calls, *emails]
+
+
+def random_account(rng: random.Random, size: int) -> dict[str, Any]:
+    """Raw account data, as stored in the account files."""
+
+    def interaction() -> dict[str, Any]:
+        return {
+            "date": f"2024-{rng.randint(1, 3):02d}-{rng.randint(1, 28):02d}",
+            "topics": rng.sample(TOPICS, rng.randint(0, 2)),
+            "content": " ".join(rng.choices([*WORDS, "and", "the"], k=12)) + ".",
+        }
+
+    calls = [interaction() for _ in range(size)]
+    emails = [interaction() for _ in range(size // 2)]
+    for call in calls:
+        call["transcript"] = call.pop("content")
+    return {"account_name": "Random", "calls": calls, "emails": emails}
+
+
+def account_models(data: dict[str, Any]) -> tuple[list[Call], list[Email]]:
+    """The account's calls and emails as the agent parses them, by date."""
+    calls = [
+        Call(date=call["date"], content=call["transcript"], topics=call["topics"])
+        for call in data["calls"]
+    ]
+    emails = [Email(**email) for email in data["emails"]]
+    return (
+        sorted(calls, key=lambda call: call.date),
+        sorted(emails, key=lambda email: email.date),
+    )
+
+
+def random_step(rng: random.Random) -> ToolCall:
+    """A random filtering step, with the parameters the original tools take."""
+    tools: list[ToolName] = [
+        "filter_by_topics",
+        "filter_by_date",
+        "take_last_element",
+        "filter_by_keywords",
+    ]
+    tool = rng.choice(tools)
+    if tool == "filter_by_topics":
+        return ToolCall(tool=tool, params={"topics": rng.sample(TOPICS, 2)})
+    if tool == "filter_by_date":
+        date = f"2024-{rng.randint(1, 3):02d}-{rng.randint(1, 28):02d}"
+        operator = rng.choice(["=", "<", ">"])
+        return ToolCall(tool=tool, params={"operator": operator, "date": date})
+    if tool == "filter_by_keywords":
+        keywords = rng.sample(KEYWORDS, rng.randint(1, 3))
+        return ToolCall(tool=tool, params={"keywords": keywords})
+    return ToolCall(tool="take_last_element")
+
+
+def random_plans(rng: random.Random, n_plans: int) -> list[PlanSeries]:
+    """Random plans, some of them ending with a count."""
+    plans = []
+    for plan_id in range(n_plans):
+        steps = [random_step(rng) for _ in range(rng.randint(0, 4))]
+        if rng.random() < 0.3:
+            steps.append(ToolCall(tool="compute_len"))
+        plans.append(PlanSeries(steps=steps, title=f"Plan {plan_id}"))
+    return plans
+
+
+def comparable(result: Result) -> Any:
+    """A result as a sorted list of (type, date, content), or a count."""
+    if isinstance(result, int):
+        return result
+    return sorted((item.interaction_type, item.date, item.content) for item in result)
+
+
+def server_result(payload: dict[str, Any], plan: PlanSeries) -> Any:
+    """Execute a plan like the MCP server's `execute_plans` tool."""
+    result = execute_plan(
+        Rows.all(payload["calls"], payload[ORDINAL_KEYS["calls"]]),
+        Rows.all(payload["emails"], payload[ORDINAL_KEYS["emails"]]),
+        Plan.model_validate(plan.model_dump()),
+    )
+    if "count" in result:
+        return result["count"]
+    return sorted(
+        (item["interaction_type"], item["date"], item["content"])
+        for item in result["interactions"]
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_server_plans_match_the_reference(seed: int) -> None:
+    """The MCP server's executor agrees with the list-based one."""
+    rng = random.Random(seed)  # noqa: S311 - reproducible test data
+    data = random_account(rng, size=60)
+    payload = project_account_data(1, data)
+    calls, emails = account_models(data)
+    for plan in random_plans(rng, n_plans=100):
+        expected = comparable(reference_execute(calls, emails, plan))
+        assert server_result(payload, plan) == expected, plan
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_columnar_plans_match_the_reference(seed: int) -> None:
+    """Masks over the account index select the same interactions."""
+    rng = random.Random(seed)  # noqa: S311 - reproducible test data
+    calls, emails = account_models(random_account(rng, size=60))
+    index = AccountIndex(calls, emails)
+    for plan in random_plans(rng, n_plans=100):
+        mask = execute_plan_series(index, plan.steps)
+        result = mask if isinstance(mask, int) else index.select(mask)
+        expected = comparable(reference_execute(calls, emails, plan))
+        assert comparable(result) == expected, plan
+
+
+def random_date_step(rng: random.Random) -> ToolCall:
+    """A date filter on a day, month or year, with any operator."""
+
+    def period() -> str:
+        month = f"2024-{rng.randint(1, 3):02d}"
+        return rng.choice(["2023", "2024", month, f"{month}-{rng.randint(1, 28):02d}"])
+
+    operator = rng.choice(["=", "<", ">", "between", "last_n_days"])
+    params: dict[str, str | int | list[str]] = {"operator": operator, "date": period()}
+    if operator == "between":
+        params["end_date"] = period()
+    elif operator == "last_n_days":
+        params["days"] = rng.choice(["1", "7", "30"])
+    return ToolCall(tool="filter_by_date", params=params)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_date_filters_match_a_linear_scan(seed: int) -> None:
+    """Binary searches of the server and the agent agree with a scan.
+
+    Malformed dates are before any valid one.
+    """
+    rng = random.Random(seed)  # noqa: S311 - reproducible test data
+    data = random_account(rng, size=60)
+    for item in rng.sample(data["calls"], 5) + rng.sample(data["emails"], 3):
+        item["date"] = rng.choice(["", "soon", "2024-13-01"])
+    payload = project_account_data(1, data)
+    calls, emails = account_models(data)
+    index = AccountIndex(calls, emails)
+    interactions: list[Call | Email] = [*calls, *emails]
+
+    def ordinal(item: Call | Email) -> int:
+        try:
+            return date_ordinal(item.date)
+        except ValueError:
+            return 0
+
+    for _ in range(200):
+        step = random_date_step(rng)
+        params: dict[str, Any] = step.params or {}
+        first, last = date_bounds(**params)
+        expected = comparable(
+            [item for item in interactions if first <= ordinal(item) <= last]
+        )
+        mask = execute_plan_series(index, [step])
+        assert not isinstance(mask, int)
+        assert comparable(index.select(mask)) == expected, step
+        plan = PlanSeries(steps=[step], title="Dates")
+        assert server_result(payload, plan) == expected, step
+
+
+def test_shared_prefixes_are_evaluated_once() -> None:
+    """Plans sharing filters, in any order, share their tree nodes."""
+    rng = random.Random(0)  # noqa: S311 - reproducible test data
+    calls, emails = account_models(random_account(rng, size=20))
+    topics = ToolCall(tool="filter_by_topics", params={"topics": ["pricing"]})
+    budget = ToolCall(tool="filter_by_keywords", params={"keywords": ["budget"]})
+    pilot = ToolCall(tool="filter_by_keywords", params={"keywords": ["pilot"]})
+    count = ToolCall(tool="compute_len")
+    plans = [
+        PlanSeries(steps=[topics, budget], title="Budget"),
+        PlanSeries(steps=[topics, pilot], title="Pilot"),
+        PlanSeries(steps=[budget, topics, topics, count], title="Count"),
+    ]
+
+    def size(node: PlanNode) -> int:
+        return 1 + sum(size(child) for child in node.children.values())
+
+    root = optimize_plans(plans, AccountIndex(calls, emails))
+    assert list(root.children) == [step_key(topics)]
+    assert size(root) == 5
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_optimized_plans_match_their_separate_execution(seed: int) -> None:
+    """Rewriting and merging the plans doesn't change their results."""
+    rng = random.Random(seed)  # noqa: S311 - reproducible test data
+    calls, emails = account_models(random_account(rng, size=80))
+    index = AccountIndex(calls, emails)
+    pool = [
+        *(random_step(rng) for _ in range(4)),
+        *(random_date_step(rng) for _ in range(3)),
+        ToolCall(tool="semantic_search", params={"query": "budget pilot", "k": 5}),
+    ]
+    for _ in range(20):
+        plans = random_plans(rng, n_plans=8)
+        for plan in plans:
+            plan.steps[:0] = rng.choices(pool, k=rng.randint(0, 4))
+        expected = [execute_plan_series(index, plan.steps) for plan in plans]
+        for plan, result, separate in zip(
+            plans, execute_plans(index, plans), expected, strict=True
+        ):
+            if isinstance(separate, int):
+                assert result == separate, plan
+            else:
+                assert not isinstance(result, int)
+                assert result.tolist() == separate.tolist(), plan
+
+
+@pytest.mark.parametrize("mode", ["threads", "processes"])
+def test_parallel_modes_match_serial_execution(mode: parallel.ExecutionMode) -> None:
+    """Branches run in threads or processes give the serial results."""
+    rng = random.Random(0)  # noqa: S311 - reproducible test data
+    calls, emails = account_models(random_account(rng, size=200))
+    index = AccountIndex(calls, emails)
+    plans = random_plans(rng, n_plans=30)
+    plans.append(
+        PlanSeries(
+            steps=[ToolCall(tool="semantic_search", params={"query": "sso rollout"})],
+            title="Search",
+        )
+    )
+    branches = list(optimize_plans(plans, index).children.values())
+    assert len(branches) > 2
+
+    def results(mode: parallel.ExecutionMode) -> list[Any]:
+        return [
+            {plan_id: np.asarray(result).tolist() for plan_id, result in found.items()}
+            for found, _ in parallel.map_branches(
+                evaluate_branch, index, branches, mode
+            )
+        ]
+
+    assert results(mode) == results("serial")
+
+
+def test_auto_mode_is_serial_until_thresholds_are_set(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Without measured thresholds, "auto" never starts a pool."""
+    monkeypatch.setattr(parallel, "PLAN_EXECUTION_MODE", "auto")
+    monkeypatch.setattr(parallel, "PLAN_WORKERS", 4)
+    monkeypatch.setattr(parallel, "PLAN_THREADS_MIN_INTERACTIONS", 0)
+    monkeypatch.setattr(parallel, "PLAN_PROCESSES_MIN_INTERACTIONS", 0)
+    assert parallel.choose_mode(10**6, n_branches=8) == "serial"
+
+    monkeypatch.setattr(parallel, "PLAN_THREADS_MIN_INTERACTIONS", 1000)
+    monkeypatch.setattr(parallel, "PLAN_PROCESSES_MIN_INTERACTIONS", 10000)
+    assert parallel.choose_mode(999, n_branches=8) == "serial"
+    assert parallel.choose_mode(1000, n_branches=8) == "threads"
+    assert parallel.choose_mode(10000, n_branches=8) == "processes"
+    assert parallel.choose_mode(10000, n_branches=1) == "serial"
@@ -0,0 +1,34 @@
+"""Tests of the rule-based planner."""
+
+import pytest
+
+from agent.rule_planner import plan_question
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "What is the latest email?",
+        "When was the last call?",
+        "How many calls?",
+        "Show me the emails",
+    ],
+)
+def test_single_interaction_type_is_left_to_the_llm(question: str) -> None:
+    """No tool filters by type, so the rules can't answer for one type only."""
+    assert plan_question(question) is None
+
+
+def test_latest_interaction_is_planned() -> None:
+    """A latest question about all interaction types is planned by the rules."""
+    output = plan_question("What is the latest interaction?")
+    assert output is not None
+    [plan] = output.plans
+    assert [step.tool for step in plan.steps] == ["take_last_element"]
+
+
+def test_latest_calls_and_emails_are_planned() -> None:
+    """Naming both interaction types is the same as naming none."""
+    output = plan_question("What are the latest calls and emails?")
+    assert output is not None
+    assert [step.tool for step in output.plans[0].steps] == ["take_last_element"]
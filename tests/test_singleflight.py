@@ -0,0 +1,127 @@
+"""Tests of the single-flight call coalescing."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agent.singleflight import SingleFlight
+
+
+def wait_for_callers(calls: SingleFlight[str, int], n_waiting: int) -> None:
+    """Wait until `n_waiting` callers joined the in-flight call."""
+    deadline = time.monotonic() + 5
+    while calls.stats()["coalesced"] < n_waiting:
+        assert time.monotonic() < deadline, "callers didn't join the call"
+        time.sleep(0.001)
+
+
+def test_concurrent_threads_share_one_call() -> None:
+    """Callers of a key in flight get the leader's result."""
+    calls: SingleFlight[str, int] = SingleFlight("test")
+    release = threading.Event()
+    runs = []
+
+    def fetch() -> int:
+        runs.append(1)
+        release.wait(5)
+        return 42
+
+    with ThreadPoolExecutor(8) as pool:
+        results = [pool.submit(calls.do, "key", fetch) for _ in range(8)]
+        wait_for_callers(calls, 7)
+        release.set()
+        assert [result.result() for result in results] == [42] * 8
+    assert len(runs) == 1
+    assert calls.stats() == {"calls": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_keys_are_forgotten_once_done() -> None:
+    """Later callers and other keys run their own calls."""
+    calls: SingleFlight[str, int] = SingleFlight("test")
+    assert calls.do("a", lambda: 1) == 1
+    assert calls.do("a", lambda: 2) == 2
+    assert calls.do("b", lambda: 3) == 3
+    assert calls.stats() == {"calls": 3, "coalesced": 0, "in_flight": 0}
+
+
+def test_the_leaders_exception_is_raised_to_all_callers() -> None:
+    """A failed call fails every caller waiting for it."""
+    calls: SingleFlight[str, int] = SingleFlight("test")
+    release = threading.Event()
+
+    def fetch() -> int:
+        release.wait(5)
+        raise ConnectionError("down")
+
+    with ThreadPoolExecutor(4) as pool:
+        results = [pool.submit(calls.do, "key", fetch) for _ in range(4)]
+        wait_for_callers(calls, 3)
+        release.set()
+        for result in results:
+            with pytest.raises(ConnectionError, match="down"):
+                result.result()
+    assert calls.stats()["in_flight"] == 0
+
+
+def test_concurrent_coroutines_share_one_call() -> None:
+    """Async callers coalesce like threads."""
+    calls: SingleFlight[str, int] = SingleFlight("test")
+    runs = []
+
+    async def fetch() -> int:
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run() -> list[int]:
+        return await asyncio.gather(*(calls.ado("key", fetch) for _ in range(8)))
+
+    assert asyncio.run(run()) == [42] * 8
+    assert len(runs) == 1
+    assert calls.stats()["coalesced"] == 7
+
+
+def test_waiters_run_the_call_when_the_leader_is_cancelled() -> None:
+    """Cancelling the leader doesn't cancel the callers waiting for it."""
+    calls: SingleFlight[str, int] = SingleFlight("test")
+    runs = []
+
+    async def fetch() -> int:
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run() -> int:
+        leader = asyncio.create_task(calls.ado("key", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(calls.ado("key", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(run()) == 42
+    assert len(runs) == 2
+    assert calls.stats() == {"calls": 2, "coalesced": 1, "in_flight": 0}
+
+
+def test_threads_wait_for_a_coroutine_in_flight() -> None:
+    """Sync and async callers of a key share the same call."""
+    calls: SingleFlight[str, int] = SingleFlight("test")
+
+    async def fetch() -> int:
+        await asyncio.sleep(0.2)
+        return 42
+
+    async def run() -> list[int]:
+        leader = asyncio.create_task(calls.ado("key", fetch))
+        await asyncio.sleep(0)
+        thread = asyncio.to_thread(calls.do, "key", lambda: 0)
+        return await asyncio.gather(leader, thread)
+
+    assert asyncio.run(run()) == [42, 42]
+    assert calls.stats()["coalesced"] == 1
@@ -0,0 +1,84 @@
+"""Tests of the offline stub chat model."""
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+
+from agent.config import PlannerOutput, Response
+from agent.rule_planner import plan_question
+from agent.stub_llm import CHARS_PER_TOKEN, StubChatModel
+
+
+def stub(**settings: float) -> StubChatModel:
+    """A stub without delays, unless set otherwise."""
+    return StubChatModel(**{"ttft_seconds": 0, "tokens_per_second": 1e6, **settings})
+
+
+def test_planner_output_comes_from_the_rules() -> None:
+    """Planner requests get the rule-based plan, or all interactions."""
+    planner = stub().with_structured_output(PlannerOutput)
+    question = "What is the latest interaction?"
+    messages = [SystemMessage("Plan the question."), HumanMessage(question)]
+    assert planner.invoke(messages) == plan_question(question)
+    # Left to the LLM by the rules
+    assert planner.invoke("How many calls?") == PlannerOutput(plans=[])
+    response = stub().with_structured_output(Response).invoke("Anything?")
+    assert response == Response(response="")
+
+
+def test_answers_have_the_configured_length_and_usage() -> None:
+    """Unstructured answers are filler text, with estimated token counts."""
+    message = stub(answer_tokens=20).invoke("How is the account doing?")
+    assert isinstance(message, AIMessage) and isinstance(message.content, str)
+    assert message.content.startswith("Stub answer to: How is the account doing?")
+    assert len(message.content) == 20 * CHARS_PER_TOKEN
+    assert message.usage_metadata is not None
+    assert message.usage_metadata["output_tokens"] == 20
+    assert message.usage_metadata["input_tokens"] == 25 // CHARS_PER_TOKEN
+
+
+def test_streamed_tokens_make_up_the_answer() -> None:
+    """Streaming yields the answer token by token, usage on the last chunk."""
+    model = stub(answer_tokens=10)
+    # Newer langchain-core versions end the stream with an empty chunk
+    tokens = [
+        token for token in (model | StrOutputParser()).stream("Any news?") if token
+    ]
+    assert len(tokens) == 10
+    assert "".join(tokens) == model.invoke("Any news?").content
+    chunks = [chunk for chunk in model.stream("Any news?") if chunk.content]
+    assert [chunk.usage_metadata is not None for chunk in chunks][-2:] == [False, True]
+
+
+def test_latency_follows_the_settings() -> None:
+    """Output starts after the time to first token, then follows the rate."""
+    model = stub(ttft_seconds=0.2, tokens_per_second=100, answer_tokens=10)
+
+    async def first_token_delay() -> float:
+        start = time.perf_counter()
+        async for _ in model.astream("Any news?"):
+            return time.perf_counter() - start
+        raise AssertionError("no tokens streamed")
+
+    assert 0.2 <= asyncio.run(first_token_delay()) < 0.4
+    start = time.perf_counter()
+    model.invoke("Any news?")
+    assert 0.3 <= time.perf_counter() - start < 0.6
+
+
+def test_failures_are_spread_evenly() -> None:
+    """A failure rate of 0.25 fails every 4th call."""
+    model = stub(failure_rate=0.25)
+    failed = []
+    for _ in range(8):
+        try:
+            model.invoke("Any news?")
+            failed.append(False)
+        except RuntimeError:
+            failed.append(True)
+    assert failed == [False, False, False, True] * 2
+    with pytest.raises(RuntimeError, match="injected"):
+        asyncio.run(stub(failure_rate=1).ainvoke("Any news?"))
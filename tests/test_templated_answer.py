@@ -0,0 +1,32 @@
+"""Tests of the answers templated from plan results."""
+
+from agent.config import Call, Email, PlanSeries, ToolCall
+from agent.nodes.templated_answer import template_answer
+
+LATEST = PlanSeries(steps=[ToolCall(tool="take_last_element")], title="Latest")
+COUNT = PlanSeries(steps=[ToolCall(tool="compute_len")], title="Count")
+
+CALL = Call(date="2024-03-01", content="Intro call.", topics=[])
+EMAIL = Email(date="2024-03-02", content="Follow-up email.", topics=[])
+
+
+def test_single_latest_interaction_is_templated() -> None:
+    """The only latest interaction is answered from the template."""
+    answer = template_answer("What is the latest interaction?", [LATEST], [[EMAIL]])
+    assert answer == "Latest:\n- Email on 2024-03-02: Follow-up email."
+
+
+def test_latest_call_and_email_fall_back_to_the_llm() -> None:
+    """Several latest interactions need the LLM to pick the relevant one."""
+    assert template_answer("What happened last?", [LATEST], [[CALL, EMAIL]]) is None
+
+
+def test_questions_naming_a_type_fall_back_to_the_llm() -> None:
+    """No tool filters by type, so the results may be of the other type."""
+    assert template_answer("What is the latest email?", [LATEST], [[CALL]]) is None
+    assert template_answer("How many calls?", [COUNT], [2]) is None
+
+
+def test_counts_are_templated() -> None:
+    """Counts of all interactions are answered from the template."""
+    assert template_answer("How many interactions?", [COUNT], [2]) == "Count: 2"